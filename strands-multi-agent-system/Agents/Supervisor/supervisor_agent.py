@@ -22,6 +22,7 @@ from strands import Agent, tool
 from strands.models import BedrockModel
 
 from shared.config import Config
+from shared.artifact_io import load_artifact, save_artifact
 
 logger = logging.getLogger(__name__)
 
@@ -314,12 +315,13 @@ def aggregate_validation_results(
         # Load context bundle (from Config Collector - NEW: Phase 4)
         logger.info(f"Loading context bundle from: {context_bundle_file}")
         try:
-            with open(context_bundle_file, 'r', encoding='utf-8') as f:
-                context_bundle = json.load(f)
+            from shared.drift_analyzer import open_bundle
+            bundle_reader = open_bundle(context_bundle_file)
+            context_bundle = bundle_reader.sections()
             
-            # Extract data from context_bundle structure
+            # Extract data from context_bundle structure (deltas are only counted, not loaded)
             overview = context_bundle.get("overview", {})
-            deltas = context_bundle.get("deltas", [])
+            total_deltas = bundle_reader.summary()["deltas"]
             file_changes = context_bundle.get("file_changes", {})
             
             files_with_drift = len(file_changes.get("modified", [])) + len(file_changes.get("added", [])) + len(file_changes.get("removed", []))
@@ -337,8 +339,7 @@ def aggregate_validation_results(
         if enhanced_analysis_file:
             logger.info(f"Loading enhanced analysis from: {enhanced_analysis_file}")
             try:
-                with open(enhanced_analysis_file, 'r', encoding='utf-8') as f:
-                    enhanced_data = json.load(f)
+                enhanced_data = load_artifact(enhanced_analysis_file)
                 
                 ai_policy_analysis = enhanced_data.get("ai_policy_analysis", {})
                 analyzed_deltas_with_ai = enhanced_data.get("analyzed_deltas_with_ai", [])
@@ -354,8 +355,7 @@ def aggregate_validation_results(
             # ✅ CRITICAL FIX: Handle case where no enhanced analysis (0 deltas) but LLM output exists
             logger.info(f"Loading LLM output from: {llm_output_file}")
             try:
-                with open(llm_output_file, 'r', encoding='utf-8') as f:
-                    llm_data = json.load(f)
+                llm_data = load_artifact(llm_output_file)
                 
                 # Create empty enhanced analysis structure from LLM output
                 ai_policy_analysis = {
@@ -405,7 +405,7 @@ def aggregate_validation_results(
             "files_analyzed": total_files_compared,
             "files_compared": total_files_compared,
             "files_with_drift": files_with_drift,
-            "total_deltas": len(deltas),
+            "total_deltas": total_deltas,
             "deltas_analyzed": len(analyzed_deltas_with_ai),
             "total_clusters": len(clusters),  # NEW: Clustering feature
             "policy_violations_count": len(policy_violations),
@@ -434,9 +434,7 @@ def aggregate_validation_results(
         aggregated_dir.mkdir(parents=True, exist_ok=True)
         
         aggregated_file = aggregated_dir / f"aggregated_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        import json
-        with open(aggregated_file, 'w') as f:
-            json.dump(aggregated, f, indent=2, default=str)
+        save_artifact(aggregated_file, aggregated)
         
         logger.info(f"Saved full aggregated results to: {aggregated_file}")
         
@@ -564,10 +562,7 @@ def format_validation_report(
         # Load full aggregated data from file if available
         aggregated_file = aggregated_results.get("aggregated_file")
         if aggregated_file:
-            import json
-            from pathlib import Path
-            with open(aggregated_file, 'r') as f:
-                full_aggregated = json.load(f)
+            full_aggregated = load_artifact(aggregated_file)
             logger.info(f"Loaded full aggregated results from: {aggregated_file}")
         else:
             # Fallback to passed data (for backward compatibility)
@@ -1280,8 +1275,7 @@ def run_validation(
         llm_output_pattern = f"config_data/llm_output/{environment}/llm_output_*.json"
         llm_output_files = sorted(glob.glob(llm_output_pattern), reverse=True)
         if llm_output_files:
-            with open(llm_output_files[0], 'r', encoding='utf-8') as f:
-                llm_output_data = json.load(f)
+            llm_output_data = load_artifact(llm_output_files[0])
             logger.info(f"✅ Loaded LLM output for {environment}: {llm_output_files[0]}")
         else:
             logger.warning(f"⚠️ No LLM output found for environment '{environment}' at: {llm_output_pattern}")
@@ -1290,8 +1284,7 @@ def run_validation(
         aggregated_pattern = f"config_data/aggregated_results/{environment}/aggregated_*.json"
         aggregated_files = sorted(glob.glob(aggregated_pattern), reverse=True)
         if aggregated_files:
-            with open(aggregated_files[0], 'r', encoding='utf-8') as f:
-                aggregated_data = json.load(f)
+            aggregated_data = load_artifact(aggregated_files[0])
             logger.info(f"✅ Loaded aggregated results for {environment}: {aggregated_files[0]}")
         else:
             logger.warning(f"⚠️ No aggregated results found for environment '{environment}' at: {aggregated_pattern}")
@@ -17,6 +17,7 @@ import argparse
 import tempfile
 import shutil
 import time
+import uuid
 from typing import Any, Dict, List, Optional
 from pathlib import Path
 
@@ -35,14 +36,14 @@ from shared.drift_analyzer import (
     extract_repo_tree,
     classify_files,
     diff_structural,
-    semantic_config_diff,
-    extract_dependencies,
-    dependency_diff,
-    detector_spring_profiles,
-    detector_jenkinsfile,
-    build_code_hunk_deltas,
-    build_binary_deltas,
+    extract_git_tree,
+    diff_git_trees,
+    changed_paths_by_side,
     emit_context_bundle,
+    run_detectors,
+    get_repo_index,
+    AnalysisSession,
+    mark_tree_source,
 )
 
 # Configure logging
@@ -82,8 +83,15 @@ def configure_git_user():
         except Exception as e:
             print(f"❌ Warning - Could not configure git user: {e}")
 
-def ensure_repo_ready(repo_url: str, repo_path: Path) -> Optional[git.Repo]:
-    """Clone or fetch repository in temporary location."""
+def ensure_repo_ready(repo_url: str, repo_path: Path, strategy: str = "mirror",
+                      config_paths: Optional[List[str]] = None) -> Optional[git.Repo]:
+    """
+    Clone or fetch repository in temporary location.
+
+    strategy "partial" clones with --filter=blob:none and a non-cone sparse
+    checkout of config_paths (only config blobs are fetched, on checkout);
+    "shallow" clones with depth=1; anything else does a full clone.
+    """
     try:
         if repo_path.exists():
             print(f"[INFO] Repository already exists at: {repo_path}")
@@ -95,6 +103,18 @@ def ensure_repo_ready(repo_url: str, repo_path: Path) -> Optional[git.Repo]:
             print(f"[INFO] Cloning repository into temporary location: {repo_path}")
             repo_path.parent.mkdir(parents=True, exist_ok=True)
             authenticated_url = setup_git_auth(repo_url)
+            if strategy == "partial" and config_paths:
+                print("[INFO] Partial clone (blob:none) with config-only sparse checkout")
+                repo = git.Repo.clone_from(authenticated_url, repo_path, filter="blob:none", no_checkout=True)
+                repo.git.sparse_checkout('set', '--no-cone', *config_paths)
+                repo.git.checkout('-f', repo.active_branch.name)
+                print("✅ Repository is ready.")
+                return repo
+            if strategy == "shallow":
+                print("[INFO] Shallow clone (depth=1, all branches)")
+                repo = git.Repo.clone_from(authenticated_url, repo_path, depth=1, no_single_branch=True)
+                print("✅ Repository is ready.")
+                return repo
             repo = git.Repo.clone_from(authenticated_url, repo_path)
             print("[INFO] Fetching origin after clone...")
             repo.remotes.origin.fetch()
@@ -104,6 +124,79 @@ def ensure_repo_ready(repo_url: str, repo_path: Path) -> Optional[git.Repo]:
         print(f"[ERR] Failed to clone or access repository: {e}")
         return None
 
+def materialize_branches_from_cache(repo_url: str, targets: Dict[str, Path], refresh: bool = True) -> bool:
+    """
+    Materialize branch trees from the persistent bare-mirror cache.
+
+    The mirror is fetched incrementally (single-flight) and each branch tree is
+    written into its target directory, avoiding a full clone per branch.
+
+    Args:
+        repo_url: Repository URL
+        targets: Mapping of branch name -> destination directory
+        refresh: Fetch before materializing (False if this run already fetched the mirror)
+
+    Returns:
+        True if every branch was materialized, False otherwise
+    """
+    try:
+        from shared.repo_cache import get_repo_cache
+        print(f"Materializing {', '.join(targets)} from mirror cache...")
+        with get_repo_cache().lease(repo_url, os.getenv('GITLAB_TOKEN'), refresh=refresh) as mirror:
+            for branch_name, dest in targets.items():
+                mirror.materialize(branch_name, dest)
+                print(f"✅ Materialized '{branch_name}' from mirror cache into {dest}")
+        return True
+    except Exception as e:
+        print(f"⚠️ Mirror cache unavailable, falling back to full clones: {e}")
+        for dest in targets.values():
+            shutil.rmtree(dest, ignore_errors=True)
+        return False
+
+def scan_changes_from_cache(repo_url: str, golden_branch: str, drift_branch: str,
+                            golden_dest: Path, drift_dest: Path, refresh: bool = True) -> Optional[tuple]:
+    """
+    Tree-to-tree change detection straight from git objects.
+
+    Computes added/removed/modified/renamed with `git diff-tree` between the
+    golden and drift commits in the cached mirror, builds file records from
+    `git ls-tree` blob OIDs, and only writes the changed blobs to disk.
+
+    Args:
+        repo_url: Repository URL
+        golden_branch: Golden branch name
+        drift_branch: Drift branch name
+        golden_dest: Directory receiving the changed golden-side files
+        drift_dest: Directory receiving the changed drift-side files
+        refresh: Fetch before diffing (False if this run already fetched the mirror)
+
+    Returns:
+        (golden_files, drift_files, file_changes) or None if the mirror is unavailable
+    """
+    try:
+        from shared.repo_cache import get_repo_cache
+        with get_repo_cache().lease(repo_url, os.getenv('GITLAB_TOKEN'), refresh=refresh) as mirror:
+            golden_rev = mirror.resolve(golden_branch)
+            drift_rev = mirror.resolve(drift_branch)
+            # Blob sizes would pull every blob into a partial mirror
+            with_sizes = not mirror.partial
+            golden_files = extract_git_tree(mirror.path, golden_rev, with_sizes)
+            drift_files = extract_git_tree(mirror.path, drift_rev, with_sizes)
+            # Similarity renames read blobs; a partial mirror only gets exact renames
+            file_changes = diff_git_trees(mirror.path, golden_rev, drift_rev,
+                                          "100%" if mirror.partial else None)
+
+            golden_needed, drift_needed = changed_paths_by_side(file_changes)
+            mirror.materialize(golden_rev, golden_dest, golden_needed)
+            mirror.materialize(drift_rev, drift_dest, drift_needed)
+            print(f"✅ Materialized {len(golden_needed)} golden / {len(drift_needed)} drift changed files")
+        return golden_files, drift_files, file_changes
+    except Exception as e:
+        print(f"⚠️ Tree-diff change detection unavailable, falling back to checkout scan: {e}")
+        for dest in (golden_dest, drift_dest):
+            shutil.rmtree(dest, ignore_errors=True)
+        return None
+
 def switch_to_branch(repo: git.Repo, branch_name: str) -> Optional[str]:
     """Switch branches (unchanged logic)."""
     try:
@@ -178,22 +271,23 @@ def get_config_file_paths(repo: git.Repo, target_folder: str = None) -> List[str
         print(f"🔍 Searching for configuration files in: {search_root}")
         print(f"📁 Repository root: {repo_root}")
         
-        # Walk through the directory tree
-        for file_path in search_root.rglob("*"):
-            if file_path.is_file():
-                # Get relative path from repository root
-                relative_path = file_path.relative_to(repo_root)
-                relative_path_str = str(relative_path).replace("\\", "/")  # Normalize path separators
-                
-                # Check if it's a config file by extension
-                if file_path.suffix.lower() in config_extensions:
-                    relative_paths.append(relative_path_str)
-                # Check if it's a config file by name
-                elif file_path.name.lower() in config_filenames:
-                    relative_paths.append(relative_path_str)
-                # Special case for files without extensions that might be config files
-                elif not file_path.suffix and file_path.name.lower() in {'dockerfile', 'makefile', 'jenkinsfile'}:
-                    relative_paths.append(relative_path_str)
+        # Shared single-walk index of the working tree (same index the drift detectors use)
+        prefix = search_root.relative_to(repo_root).as_posix()
+        prefix = "" if prefix == "." else prefix
+        for relative_path_str in get_repo_index(repo_root).all_paths:
+            if prefix and not relative_path_str.startswith(prefix + "/"):
+                continue
+            name = relative_path_str.rsplit("/", 1)[-1].lower()
+            ext = os.path.splitext(name)[1]
+            # Check if it's a config file by extension
+            if ext in config_extensions:
+                relative_paths.append(relative_path_str)
+            # Check if it's a config file by name
+            elif name in config_filenames:
+                relative_paths.append(relative_path_str)
+            # Special case for files without extensions that might be config files
+            elif not ext and name in {'dockerfile', 'makefile', 'jenkinsfile'}:
+                relative_paths.append(relative_path_str)
         print(f"✅ Found {len(relative_paths)} configuration files")
     except Exception as e:
         print(f"❌ Error scanning repository: {e}")
@@ -631,13 +725,17 @@ class ConfigCollectorAgent(Agent):
         # Initialize variables
         golden_branch = None
         drift_branch = None
+        drift_rev = None  # Revision to read the drift side from (snapshot ref or branch name)
+        drift_snapshot = None
+        fetch_strategy = "mirror"
         
         try:
             # Import required modules
             import sys
             sys.path.append(str(Path(__file__).parent.parent.parent.parent))
-            from shared.golden_branch_tracker import validate_golden_exists, get_active_golden_branch, add_drift_branch
-            from shared.git_operations import generate_unique_branch_name, create_config_only_branch
+            from shared.golden_branch_tracker import validate_golden_exists, get_active_golden_branch, add_drift_branch, add_drift_snapshot
+            from shared.git_operations import generate_unique_branch_name, create_config_only_branch, create_config_only_snapshot
+            from shared.repo_cache import choose_fetch_strategy
             
             # 1. Validate golden branch exists
             logger.info(f"Checking for golden branch for {service_id}/{environment}...")
@@ -653,6 +751,10 @@ class ConfigCollectorAgent(Agent):
             golden_branch = get_active_golden_branch(service_id, environment)
             logger.info(f"✅ Golden branch found: {golden_branch}")
             
+            # Mirror, partial (blob:none) mirror, or shallow clones - from repo size/history
+            fetch_strategy = choose_fetch_strategy(repo_url, os.getenv('GITLAB_TOKEN'))
+            logger.info(f"📦 Fetch strategy: {fetch_strategy}")
+            
             # 2. Create unique drift branch from main (CONFIG-ONLY for speed)
             drift_branch = generate_unique_branch_name("drift", environment)
             logger.info(f"Creating config-only drift branch: {drift_branch} from {main_branch}...")
@@ -671,26 +773,47 @@ class ConfigCollectorAgent(Agent):
                 "requirements.txt", "pyproject.toml", "go.mod"
             ]
             
-            success = create_config_only_branch(
-                repo_url=repo_url,
-                main_branch=main_branch,
-                new_branch_name=drift_branch,
-                config_paths=config_paths,
-                gitlab_token=os.getenv('GITLAB_TOKEN')
-            )
-            
-            if not success:
-                error_msg = f"❌ Failed to create drift branch {drift_branch}"
-                logger.error(error_msg)
-                return {
-                    "status": "error",
-                    "error": error_msg,
-                    "timestamp": datetime.now().isoformat()
-                }
+            # Snapshot mode (default): build the drift side locally in the mirror cache and
+            # record it by commit SHA; the remote branch is only pushed on certification.
+            if os.getenv("DRIFT_BRANCH_MODE", "snapshot").lower() == "snapshot" and fetch_strategy != "shallow":
+                drift_snapshot = create_config_only_snapshot(
+                    repo_url=repo_url,
+                    main_branch=main_branch,
+                    snapshot_name=drift_branch,
+                    config_paths=config_paths,
+                    gitlab_token=os.getenv('GITLAB_TOKEN')
+                )
+                if not drift_snapshot:
+                    logger.warning("⚠️ Local snapshot failed, pushing a drift branch instead")
             
-            # 3. Add drift branch to tracker
-            add_drift_branch(service_id, environment, drift_branch)
-            logger.info(f"✅ Config-only drift branch created and tracked: {drift_branch}")
+            if drift_snapshot:
+                drift_rev = drift_snapshot["ref"]
+                
+                # 3. Add drift snapshot to tracker
+                add_drift_snapshot(service_id, environment, drift_snapshot)
+                logger.info(f"✅ Config-only drift snapshot created and tracked: {drift_branch} @ {drift_snapshot['commit'][:12]}")
+            else:
+                drift_rev = drift_branch
+                success = create_config_only_branch(
+                    repo_url=repo_url,
+                    main_branch=main_branch,
+                    new_branch_name=drift_branch,
+                    config_paths=config_paths,
+                    gitlab_token=os.getenv('GITLAB_TOKEN')
+                )
+                
+                if not success:
+                    error_msg = f"❌ Failed to create drift branch {drift_branch}"
+                    logger.error(error_msg)
+                    return {
+                        "status": "error",
+                        "error": error_msg,
+                        "timestamp": datetime.now().isoformat()
+                    }
+                
+                # 3. Add drift branch to tracker
+                add_drift_branch(service_id, environment, drift_branch)
+                logger.info(f"✅ Config-only drift branch created and tracked: {drift_branch}")
             
         except Exception as e:
             error_msg = f"❌ Failed to validate/create branches: {e}"
@@ -710,35 +833,63 @@ class ConfigCollectorAgent(Agent):
         base_temp = Path(tempfile.gettempdir()) / "golden_config_drift"
         base_temp.mkdir(parents=True, exist_ok=True)
     
-        golden_temp = base_temp / f"golden_{timestamp}"
-        drift_temp = base_temp / f"drift_{timestamp}"
+        # Unique per analysis: several analyses may start in the same second
+        run_id = f"{timestamp}_{uuid.uuid4().hex[:8]}"
+        golden_temp = base_temp / f"golden_{run_id}"
+        drift_temp = base_temp / f"drift_{run_id}"
+
+        # Roots, policies and caches for this analysis only; files are read once
+        # per run and served from a bounded in-memory store
+        session = AnalysisSession(golden_temp, drift_temp).begin()
     
         try:
             # ================================================================
-            # PHASE 1: CLONE REPOS (KEEP EXISTING LOGIC)
+            # PHASE 1: MATERIALIZE BRANCHES (MIRROR CACHE, CLONE FALLBACK)
             # ================================================================
-            logger.info("\n📥 Phase 1: Cloning repositories")
+            logger.info("\n📥 Phase 1: Preparing golden and drift trees")
             logger.info("-" * 60)
-        
+
             # Configure Git user
             configure_git_user()
-        
-            # Clone golden branch
-            logger.info(f"Cloning golden branch '{golden_branch}'...")
-            golden_repo = ensure_repo_ready(repo_url, golden_temp)
-            if not golden_repo:
-                raise Exception("Failed to setup golden repository")
-        
-            switch_to_branch(golden_repo, golden_branch)
+
+            # A local snapshot was just built from a freshly fetched mirror (golden branch
+            # included): reuse that fetch instead of paying for a second one
+            refresh_mirror = drift_snapshot is None
+
+            # Tree mode: change detection from git objects, only changed blobs are written to disk
+            change_detection = os.getenv("DRIFT_CHANGE_DETECTION", "tree").lower()
+            tree_scan = None
+            if change_detection == "tree" and fetch_strategy != "shallow":
+                logger.info(f"Diffing '{golden_branch}' -> '{drift_branch}' from git objects...")
+                tree_scan = scan_changes_from_cache(repo_url, golden_branch, drift_rev, golden_temp, drift_temp,
+                                                    refresh=refresh_mirror)
+
+            if tree_scan is None:
+                change_detection = "checkout"
+                if fetch_strategy == "shallow" or not materialize_branches_from_cache(repo_url, {golden_branch: golden_temp, drift_rev: drift_temp},
+                                                                                          refresh=refresh_mirror):
+                    if drift_snapshot:
+                        raise Exception(f"Drift snapshot {drift_branch} is only available in the mirror cache")
+                    if fetch_strategy == "mirror":
+                        fetch_strategy = "clone"  # Mirror unavailable, record the full-clone fallback
+                    # Clone golden branch
+                    logger.info(f"Cloning golden branch '{golden_branch}'...")
+                    golden_repo = ensure_repo_ready(repo_url, golden_temp, fetch_strategy, config_paths)
+                    if not golden_repo:
+                        raise Exception("Failed to setup golden repository")
+
+                    switch_to_branch(golden_repo, golden_branch)
+                    mark_tree_source(golden_temp, golden_repo.head.commit.tree.hexsha)
+
+                    # Clone drift branch
+                    logger.info(f"Cloning drift branch '{drift_branch}'...")
+                    drift_repo = ensure_repo_ready(repo_url, drift_temp, fetch_strategy, config_paths)
+                    if not drift_repo:
+                        raise Exception("Failed to setup drift repository")
+
+                    switch_to_branch(drift_repo, drift_branch)
+                    mark_tree_source(drift_temp, drift_repo.head.commit.tree.hexsha)
             logger.info(f"✅ Golden branch ready at: {golden_temp}")
-        
-            # Clone drift branch
-            logger.info(f"Cloning drift branch '{drift_branch}'...")
-            drift_repo = ensure_repo_ready(repo_url, drift_temp)
-            if not drift_repo:
-                raise Exception("Failed to setup drift repository")
-        
-            switch_to_branch(drift_repo, drift_branch)
             logger.info(f"✅ Drift branch ready at: {drift_temp}")
         
             # ================================================================
@@ -746,86 +897,67 @@ class ConfigCollectorAgent(Agent):
             # ================================================================
             logger.info("\n🔍 Phase 2: Running drift.py Precision Analysis")
             logger.info("-" * 60)
-        
-            # Step 1: Extract file trees
-            logger.info("Extracting repository file trees...")
-            golden_paths = extract_repo_tree(golden_temp)
-            drift_paths = extract_repo_tree(drift_temp)
-            logger.info(f"  Golden: {len(golden_paths)} files")
-            logger.info(f"  Drift: {len(drift_paths)} files")
-            
-            # DEBUG: Always show what files we found (for troubleshooting)
-            logger.info("\n  📂 Golden files found:")
-            for idx, f in enumerate(golden_paths, 1):
-                logger.info(f"    {idx}. {f}")
-            
-            logger.info("\n  📂 Drift files found:")
-            for idx, f in enumerate(drift_paths, 1):
-                logger.info(f"    {idx}. {f}")
-        
-            # Step 2: Classify files
-            logger.info("Classifying files by type...")
-            golden_files = classify_files(golden_temp, golden_paths)
-            drift_files = classify_files(drift_temp, drift_paths)
-        
-            # Step 3: Structural diff
-            logger.info("Computing structural diff...")
-            file_changes = diff_structural(golden_files, drift_files)
+
+            if tree_scan is not None:
+                # Steps 1-3 already done from git objects (no rglob, no hashing)
+                golden_files, drift_files, file_changes = tree_scan
+                golden_paths = [f["path"] for f in golden_files]
+                drift_paths = [f["path"] for f in drift_files]
+                logger.info(f"  Golden: {len(golden_paths)} files (git objects)")
+                logger.info(f"  Drift: {len(drift_paths)} files (git objects)")
+            else:
+                # Step 1: Extract file trees
+                logger.info("Extracting repository file trees...")
+                golden_paths = extract_repo_tree(golden_temp)
+                drift_paths = extract_repo_tree(drift_temp)
+                logger.info(f"  Golden: {len(golden_paths)} files")
+                logger.info(f"  Drift: {len(drift_paths)} files")
+
+                # DEBUG: Always show what files we found (for troubleshooting)
+                logger.info("\n  📂 Golden files found:")
+                for idx, f in enumerate(golden_paths, 1):
+                    logger.info(f"    {idx}. {f}")
+
+                logger.info("\n  📂 Drift files found:")
+                for idx, f in enumerate(drift_paths, 1):
+                    logger.info(f"    {idx}. {f}")
+
+                # Step 2: Classify files
+                logger.info("Classifying files by type...")
+                golden_files = classify_files(golden_temp, golden_paths)
+                drift_files = classify_files(drift_temp, drift_paths)
+
+                # Step 3: Structural diff
+                logger.info("Computing structural diff...")
+                file_changes = diff_structural(golden_files, drift_files, golden_temp, drift_temp)
             logger.info(f"  Added: {len(file_changes['added'])} files")
             logger.info(f"  Removed: {len(file_changes['removed'])} files")
             logger.info(f"  Modified: {len(file_changes['modified'])} files")
             logger.info(f"  Renamed: {len(file_changes['renamed'])} files")
         
-            # Step 4: Configuration diff (semantic, key-level)
-            logger.info("Analyzing configuration changes...")
-            changed_paths = sorted(
-                set(file_changes["modified"]) | set(file_changes["added"])
-            )
-            config_diff = semantic_config_diff(
-                golden_temp, 
-                drift_temp, 
-                changed_paths
-            )
+            # Steps 4-8: semantic config diff, dependencies, specialized detectors,
+            # code hunks and binary deltas (independent; run in the detector process pool)
+            logger.info("Running detectors (config, dependencies, spring, jenkins, hunks, binary)...")
+            detector_results = run_detectors(golden_temp, drift_temp, file_changes, session=session)
+            config_diff = detector_results["config_diff"]
+            dep_diff = detector_results["dep_diff"]
+            spring_deltas = detector_results["spring_deltas"]
+            jenkins_deltas = detector_results["jenkins_deltas"]
+            code_hunks = detector_results["code_hunks"]
+            binary_deltas = detector_results["binary_deltas"]
             logger.info(f"  Config keys added: {len(config_diff.get('added', {}))}")
             logger.info(f"  Config keys removed: {len(config_diff.get('removed', {}))}")
             logger.info(f"  Config keys changed: {len(config_diff.get('changed', {}))}")
-        
-            # Step 5: Dependency analysis
-            logger.info("Analyzing dependency changes...")
-            golden_deps = extract_dependencies(golden_temp)
-            drift_deps = extract_dependencies(drift_temp)
-            dep_diff = dependency_diff(golden_deps, drift_deps)
-        
+
             dep_changes = 0
             for eco, changes in dep_diff.items():
                 dep_changes += len(changes.get('added', {}))
                 dep_changes += len(changes.get('removed', {}))
                 dep_changes += len(changes.get('changed', {}))
             logger.info(f"  Dependency changes: {dep_changes}")
-        
-            # Step 6: Specialized detectors
-            logger.info("Running specialized detectors...")
-            spring_deltas = detector_spring_profiles(golden_temp, drift_temp)
-            jenkins_deltas = detector_jenkinsfile(golden_temp, drift_temp)
             logger.info(f"  Spring profile deltas: {len(spring_deltas)}")
             logger.info(f"  Jenkinsfile deltas: {len(jenkins_deltas)}")
-        
-            # Step 7: Code hunks (line-precise diffs)
-            logger.info("Building code hunks with line numbers...")
-            code_hunks = build_code_hunk_deltas(
-                golden_temp,
-                drift_temp,
-                file_changes.get("modified", [])
-            )
             logger.info(f"  Code hunks: {len(code_hunks)}")
-        
-            # Step 8: Binary file analysis
-            logger.info("Analyzing binary files...")
-            binary_deltas = build_binary_deltas(
-                golden_temp,
-                drift_temp,
-                file_changes.get("modified", [])
-            )
             logger.info(f"  Binary file changes: {len(binary_deltas)}")
         
             # ================================================================
@@ -866,7 +998,11 @@ class ConfigCollectorAgent(Agent):
                 "golden_branch": golden_branch,
                 "drift_branch": drift_branch,
                 "timestamp": timestamp,
-                "environment": environment  # ✅ Fixed: Now uses parameter instead of hardcoded value
+                "environment": environment,  # ✅ Fixed: Now uses parameter instead of hardcoded value
+                "change_detection": change_detection,
+                "fetch_strategy": fetch_strategy,
+                "drift_commit": drift_snapshot["commit"] if drift_snapshot else None,
+                "drift_source_commit": drift_snapshot["source_commit"] if drift_snapshot else None
             }
         
             # Combine all deltas
@@ -886,8 +1022,8 @@ class ConfigCollectorAgent(Agent):
                 logger.info(f"✅ Using policies from: {policies_path}")
         
             # Emit context bundle
-            logger.info("Generating context_bundle.json...")
-            bundle_data = emit_context_bundle(
+            logger.info("Generating context bundle...")
+            bundle = emit_context_bundle(
                 output_dir,
                 golden_temp,
                 drift_temp,
@@ -897,10 +1033,11 @@ class ConfigCollectorAgent(Agent):
                 file_changes,
                 extra_deltas=extra_deltas,
                 policies_path=policies_path,
-                evidence=None  # Can add later
+                evidence=None,  # Can add later
+                session=session
             )
         
-            context_bundle_path = output_dir / "context_bundle.json"
+            context_bundle_path = bundle.path
         
             # ================================================================
             # PHASE 4: PREPARE RESPONSE
@@ -908,18 +1045,14 @@ class ConfigCollectorAgent(Agent):
             logger.info("\n✅ Phase 4: Analysis Complete!")
             logger.info("-" * 60)
         
-            # Count files with drift (from deltas)
-            with open(context_bundle_path, 'r', encoding='utf-8') as f:
-                bundle = json.load(f)
-        
-            deltas = bundle.get("deltas", [])
-            files_with_drift = len(set(d.get("file", "") for d in deltas))
+            # Count files with drift (from the bundle's summary record, deltas are not re-read)
+            bundle_summary = bundle.summary()
         
             # Summary
             summary = {
                 "files_compared": len(golden_paths),
-                "files_with_drift": files_with_drift,
-                "total_deltas": len(deltas),
+                "files_with_drift": bundle_summary["files_with_drift"],
+                "total_deltas": bundle_summary["deltas"],
                 "config_changes": len(config_diff.get("changed", {})),
                 "dependency_changes": dep_changes,
                 "code_hunks": len(code_hunks),
@@ -956,6 +1089,7 @@ class ConfigCollectorAgent(Agent):
             }
         
         finally:
+            session.end()
             # Cleanup temp directories
             logger.info("🧹 Cleaning up temporary directories...")
             if golden_temp.exists():
@@ -43,6 +43,7 @@ from shared.drift_analyzer import (
     build_code_hunk_deltas,
     build_binary_deltas,
     emit_context_bundle,
+    bundle_path,
     detector_dockerfiles,  # NEW: Docker detector
 )
 
@@ -806,16 +807,8 @@ class ConfigCollectorAgent(Agent):
                 logger.info(f"✅ Using policies from: {policies_path}")
         
             # Emit context bundle (with config-filtered data)
-            logger.info("Generating context_bundle.json...")
-            
-            # Set global variables that drift_v1.py expects
-            # These are needed by internal functions like _build_config_deltas and emit_bundle
-            import shared.drift_analyzer.drift_v1 as drift_v1_module
-            drift_v1_module.golden_root = golden_temp
-            drift_v1_module.candidate_root = drift_temp
-            drift_v1_module.g_files = config_golden_files  # Used in emit_bundle for total_files count
-            drift_v1_module.c_files = config_drift_files   # Used in emit_bundle for total_files count
-            
+            logger.info("Generating context bundle...")
+
             bundle_data = emit_context_bundle(
                 output_dir,
                 golden_temp,
@@ -828,7 +821,7 @@ class ConfigCollectorAgent(Agent):
                 policies_path
             )
         
-            context_bundle_path = output_dir / "context_bundle.json"
+            context_bundle_path = bundle_path(output_dir)
         
             # ================================================================
             # PHASE 4: PREPARE RESPONSE
@@ -837,12 +830,14 @@ class ConfigCollectorAgent(Agent):
             logger.info("-" * 60)
         
             # Calculate summary stats (filtered for configuration files only)
-            bundle = bundle_data  # The bundle data returned from emit_context_bundle
-            deltas = bundle.get("deltas", [])
-            
-            # Filter deltas to only include configuration files
-            config_deltas = [d for d in deltas if is_config_file(d.get("file", ""))]
-            files_with_drift = len(set(d.get("file", "") for d in config_deltas if is_config_file(d.get("file", ""))))
+            # Count configuration-file deltas while streaming them from the bundle
+            config_delta_count = 0
+            config_drift_files = set()
+            for d in bundle_data.iter_deltas():
+                if is_config_file(d.get("file", "")):
+                    config_delta_count += 1
+                    config_drift_files.add(d.get("file", ""))
+            files_with_drift = len(config_drift_files)
             
             # Filter file_changes to only include configuration files
             config_added = [f for f in file_changes.get("added", []) if is_config_file(f)]
@@ -857,7 +852,7 @@ class ConfigCollectorAgent(Agent):
                 "removed": len(config_removed),  # Only config files
                 "modified": len(config_modified),  # Only config files
                 "files_with_drift": files_with_drift,  # Only config files
-                "total_deltas": len(config_deltas),  # Only config file deltas
+                "total_deltas": config_delta_count,  # Only config file deltas
                 "config_changes": len(config_diff.get("changed", {})),
                 "dependency_changes": dep_changes,
                 "code_hunks": len(code_hunks),  # Already filtered for config files
@@ -50,6 +50,8 @@ except ImportError:
     class TaskResponse:
         pass
 
+from shared.artifact_io import save_artifact
+
 
 class DiffPolicyEngineAgent(Agent):
     """
@@ -120,8 +122,12 @@ class DiffPolicyEngineAgent(Agent):
             # Load context bundle from file
             logger.info(f"📂 Loading context bundle from: {context_bundle_file}")
             try:
-                with open(context_bundle_file, 'r', encoding='utf-8') as f:
-                    context_bundle = json.load(f)
+                # Segmented bundles are read lazily (git patches are never loaded);
+                # single-document bundles are loaded whole
+                from shared.drift_analyzer import open_bundle
+                bundle_reader = open_bundle(context_bundle_file)
+                context_bundle = dict(bundle_reader.sections())
+                context_bundle['deltas'] = list(bundle_reader.iter_deltas())
             except FileNotFoundError:
                 return TaskResponse(
                     task_id=task.task_id,
@@ -195,8 +201,7 @@ class DiffPolicyEngineAgent(Agent):
                     "message": "No deltas detected - environments are in sync"
                 }
                 
-                with open(llm_output_file, 'w', encoding='utf-8') as f:
-                    json.dump(empty_llm_output, f, indent=2, ensure_ascii=False)
+                save_artifact(llm_output_file, empty_llm_output, ensure_ascii=False)
                 
                 logger.info(f"✅ Created empty LLM output: {llm_output_file}")
                 
@@ -350,8 +355,7 @@ class DiffPolicyEngineAgent(Agent):
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             llm_output_file = llm_output_dir / f"llm_output_{timestamp}.json"
             
-            with open(llm_output_file, 'w', encoding='utf-8') as f:
-                json.dump(merged_llm_output, f, indent=2, ensure_ascii=False)
+            save_artifact(llm_output_file, merged_llm_output, ensure_ascii=False)
             
             logger.info(f"✅ LLM output saved: {llm_output_file}")
             logger.info(f"   Total items: {len(merged_llm_output['high']) + len(merged_llm_output['medium']) + len(merged_llm_output['low']) + len(merged_llm_output['allowed_variance'])}")
@@ -456,8 +460,7 @@ class DiffPolicyEngineAgent(Agent):
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             output_file = ANALYSIS_DIR / f"enhanced_analysis_{timestamp}.json"
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(enhanced_analysis, f, indent=2, ensure_ascii=False)
+            save_artifact(output_file, enhanced_analysis, ensure_ascii=False)
             
             logger.info(f"\n✅ Diff Engine completed!")
             logger.info(f"   Deltas analyzed: {len(analyzed_deltas)}")
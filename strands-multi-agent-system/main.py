@@ -30,6 +30,7 @@ from pydantic import BaseModel, Field, field_validator
 
 # Strands agent system imports
 from shared.config import Config
+from shared.artifact_io import load_artifact, save_artifact
 from Agents.Supervisor.supervisor_agent import run_validation
 
 
@@ -380,8 +381,7 @@ async def validate_configuration(request: ValidationRequest, background_tasks: B
             if "data" in result and "file_paths" in result["data"]:
                 enhanced_file = result["data"]["file_paths"].get("enhanced_analysis")
                 if enhanced_file and Path(enhanced_file).exists():
-                    with open(enhanced_file, 'r', encoding='utf-8') as f:
-                        enhanced_data = json.load(f)
+                    enhanced_data = load_artifact(enhanced_file)
                     print(f"✅ Loaded enhanced analysis data from: {enhanced_file}")
         except Exception as e:
             print(f"⚠️ Could not load enhanced analysis data: {e}")
@@ -561,8 +561,7 @@ async def get_llm_output():
     
     if llm_output_files:
         try:
-            with open(llm_output_files[0], 'r', encoding='utf-8') as f:
-                llm_output = json.load(f)
+            llm_output = load_artifact(llm_output_files[0])
             
             return {
                 "status": "success",
@@ -958,14 +957,13 @@ async def get_service_llm_output(service_id: str, environment: Optional[str] = N
     llm_output_path = result_data.get("llm_output_path")
     if llm_output_path and Path(llm_output_path).exists():
         try:
-            with open(llm_output_path, 'r', encoding='utf-8') as f:
-                llm_data = json.load(f)
-                return {
-                    "status": "success",
-                    "data": llm_data,
-                    "service_id": service_id,
-                    "timestamp": last_result.get("timestamp")
-                }
+            llm_data = load_artifact(llm_output_path)
+            return {
+                "status": "success",
+                "data": llm_data,
+                "service_id": service_id,
+                "timestamp": last_result.get("timestamp")
+            }
         except Exception as e:
             print(f"⚠️ Could not load LLM output file for {service_id}: {e}")
     
@@ -975,14 +973,13 @@ async def get_service_llm_output(service_id: str, environment: Optional[str] = N
         file_path = file_paths.get(key)
         if file_path and Path(file_path).exists():
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    llm_data = json.load(f)
-                    return {
-                        "status": "success",
-                        "data": llm_data,
-                        "service_id": service_id,
-                        "timestamp": last_result.get("timestamp")
-                    }
+                llm_data = load_artifact(file_path)
+                return {
+                    "status": "success",
+                    "data": llm_data,
+                    "service_id": service_id,
+                    "timestamp": last_result.get("timestamp")
+                }
             except Exception as e:
                 print(f"⚠️ Could not load file {file_path}: {e}")
     
@@ -1025,10 +1022,9 @@ def get_last_service_result(service_id: str, environment: Optional[str] = None):
             result_files = sorted(env_dir.glob("validation_*.json"), reverse=True)
             if result_files:
                 try:
-                    with open(result_files[0], 'r', encoding='utf-8') as f:
-                        stored_data = json.load(f)
-                        print(f"✅ Loaded stored result for {service_id}/{environment} from: {result_files[0]}")
-                        return stored_data.get("result")
+                    stored_data = load_artifact(result_files[0])
+                    print(f"✅ Loaded stored result for {service_id}/{environment} from: {result_files[0]}")
+                    return stored_data.get("result")
                 except Exception as e:
                     print(f"⚠️ Could not load stored result for {service_id}/{environment}: {e}")
     else:
@@ -1042,10 +1038,9 @@ def get_last_service_result(service_id: str, environment: Optional[str] = None):
             # Sort by modification time to get the most recent
             most_recent = max(all_result_files, key=lambda p: p.stat().st_mtime)
             try:
-                with open(most_recent, 'r', encoding='utf-8') as f:
-                    stored_data = json.load(f)
-                    print(f"✅ Loaded stored result for {service_id} from: {most_recent}")
-                    return stored_data.get("result")
+                stored_data = load_artifact(most_recent)
+                print(f"✅ Loaded stored result for {service_id} from: {most_recent}")
+                return stored_data.get("result")
             except Exception as e:
                 print(f"⚠️ Could not load stored result for {service_id}: {e}")
     
@@ -1065,13 +1060,12 @@ def store_service_result(service_id: str, environment: str, result: dict):
     result_file = service_results_dir / f"validation_{timestamp}.json"
     
     try:
-        with open(result_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "service_id": service_id,
-                "environment": environment,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "result": result
-            }, f, indent=2, default=str)
+        save_artifact(result_file, {
+            "service_id": service_id,
+            "environment": environment,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "result": result
+        })
         
         print(f"✅ Stored result for {service_id}/{environment} to: {result_file}")
         
@@ -1116,8 +1110,7 @@ def save_run_history(service_id: str, environment: str, run_data: dict):
     history = {"service_id": service_id, "environment": environment, "runs": []}
     if history_file.exists():
         try:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
+            history = load_artifact(history_file)
         except Exception as e:
             print(f"⚠️ Could not load existing history: {e}")
     
@@ -1231,14 +1224,13 @@ async def get_service_results(service_id: str):
         result_files = sorted(service_results_dir.glob("validation_*.json"), reverse=True)
         for result_file in result_files:
             try:
-                with open(result_file, 'r', encoding='utf-8') as f:
-                    stored_data = json.load(f)
-                    results.append({
-                        "file_name": result_file.name,
-                        "timestamp": stored_data.get("timestamp"),
-                        "service_id": stored_data.get("service_id"),
-                        "has_result": "result" in stored_data
-                    })
+                stored_data = load_artifact(result_file)
+                results.append({
+                    "file_name": result_file.name,
+                    "timestamp": stored_data.get("timestamp"),
+                    "service_id": stored_data.get("service_id"),
+                    "has_result": "result" in stored_data
+                })
             except Exception as e:
                 print(f"⚠️ Could not read result file {result_file}: {e}")
     
@@ -1327,10 +1319,17 @@ async def certify_selective_files(service_id: str, environment: str, request: Re
         if not approved_files:
             raise HTTPException(400, "No files selected for certification")
         
-        from shared.golden_branch_tracker import get_active_golden_branch, get_active_drift_branch, add_golden_branch
+        from shared.golden_branch_tracker import (
+            get_active_golden_branch,
+            get_active_drift_branch,
+            add_golden_branch,
+            get_drift_snapshot,
+            mark_snapshot_pushed
+        )
         from shared.git_operations import (
             generate_unique_branch_name,
-            create_selective_golden_branch
+            create_selective_golden_branch,
+            publish_snapshot_branch
         )
         
         # Get current golden and drift branches
@@ -1343,6 +1342,13 @@ async def certify_selective_files(service_id: str, environment: str, request: Re
         if not drift_branch:
             raise HTTPException(404, f"No drift branch found for {service_id}/{environment}")
         
+        # Drift snapshots are local-only until someone certifies from them
+        drift_snapshot = get_drift_snapshot(service_id, environment, drift_branch)
+        if drift_snapshot and not drift_snapshot.get("pushed"):
+            if not publish_snapshot_branch(config["repo_url"], drift_snapshot, os.getenv('GITLAB_TOKEN')):
+                raise HTTPException(500, f"Failed to push drift snapshot {drift_branch}")
+            mark_snapshot_pushed(service_id, environment, drift_branch)
+        
         # Generate new golden branch name
         new_golden_branch = generate_unique_branch_name("golden", environment)
         
@@ -1425,6 +1431,41 @@ async def get_service_branches(service_id: str, environment: str):
         raise HTTPException(status_code=500, detail=f"Failed to get branches: {str(e)}")
 
 
+@app.post("/api/services/{service_id}/branches/gc")
+async def gc_service_branches(service_id: str, dry_run: bool = True, environment: Optional[str] = None):
+    """
+    Delete stale generated golden/drift branches (not tracked anymore) from the remote.
+    Defaults to a dry run that only reports what would be deleted.
+    """
+    if service_id not in SERVICES_CONFIG:
+        raise HTTPException(404, f"Service {service_id} not found")
+    
+    config = SERVICES_CONFIG[service_id]
+    if environment and environment not in config["environments"]:
+        raise HTTPException(400, f"Invalid environment '{environment}'. Must be one of: {config['environments']}")
+    
+    try:
+        from shared.branch_gc import gc_stale_branches
+        
+        # Branches of every service sharing this repository must be kept
+        sharing_services = [sid for sid, cfg in SERVICES_CONFIG.items() if cfg["repo_url"] == config["repo_url"]]
+        report = gc_stale_branches(
+            repo_url=config["repo_url"],
+            service_ids=sharing_services,
+            environments=[environment] if environment else config["environments"],
+            dry_run=dry_run,
+            gitlab_token=os.getenv('GITLAB_TOKEN')
+        )
+        
+        return {
+            "service_id": service_id,
+            **report,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Branch GC failed: {str(e)}")
+
+
 @app.get("/api/services/{service_id}/validate-golden/{environment}")
 async def validate_golden_branch(service_id: str, environment: str):
     """Check if a golden branch exists for a service and environment"""
@@ -1528,8 +1569,7 @@ async def get_run_history(service_id: str, environment: str):
         }
     
     try:
-        with open(history_file, 'r', encoding='utf-8') as f:
-            history = json.load(f)
+        history = load_artifact(history_file)
         return history
     except Exception as e:
         raise HTTPException(500, f"Failed to load run history: {str(e)}")
@@ -1547,8 +1587,7 @@ async def get_run_details(service_id: str, run_id: str):
         
         if history_file.exists():
             try:
-                with open(history_file, 'r', encoding='utf-8') as f:
-                    history = json.load(f)
+                history = load_artifact(history_file)
                 
                 # Find the specific run
                 for run in history["runs"]:
@@ -1556,8 +1595,7 @@ async def get_run_details(service_id: str, run_id: str):
                         # Try to load the detailed result file
                         result_file = run["file_paths"].get("stored_result")
                         if result_file and Path(result_file).exists():
-                            with open(result_file, 'r', encoding='utf-8') as rf:
-                                detailed_result = json.load(rf)
+                            detailed_result = load_artifact(result_file)
                             return detailed_result
                         else:
                             # Return the run metadata at least
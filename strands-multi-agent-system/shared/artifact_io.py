@@ -0,0 +1,185 @@
+"""
+Artifact I/O - one load/save API for pipeline artifacts
+
+Context bundles (single-document format), llm_output_*.json,
+enhanced_analysis_*.json, aggregated_*.json and validation_*.json are written
+with save_artifact() and read with load_artifact(). Readers never need to know
+which encoding a file uses: load_artifact() detects it.
+
+Encodings (ARTIFACT_FORMAT):
+    json     pretty-printed JSON, byte-for-byte what the pipeline always wrote (default;
+             ensure_ascii as at each call site: escaped by default, the diff
+             engine's LLM outputs and enhanced analyses unescaped)
+    compact  a header line with the schema version, codec and compression, then
+             the encoded payload:
+
+                 GCPA<version>\\n{"schema": 1, "codec": "msgpack", "compression": "zstd"}\\n<payload>
+
+             codec: msgpack, else orjson, else json (compact separators)
+             compression: zstd, else zlib
+
+msgpack, orjson and zstandard are optional; whatever is installed is used and
+recorded in the header. File names keep their .json suffix so the existing
+glob patterns (llm_output_*.json, ...) still find them.
+
+Configuration:
+    ARTIFACT_FORMAT             json | compact
+    ARTIFACT_CODEC              auto | msgpack | orjson | json
+    ARTIFACT_COMPRESSION        auto | zstd | zlib | none
+    ARTIFACT_COMPRESSION_LEVEL  compression level (default 3)
+"""
+
+import json
+import os
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARTIFACT_FORMAT = os.getenv("ARTIFACT_FORMAT", "json").lower()
+ARTIFACT_CODEC = os.getenv("ARTIFACT_CODEC", "auto").lower()
+ARTIFACT_COMPRESSION = os.getenv("ARTIFACT_COMPRESSION", "auto").lower()
+ARTIFACT_COMPRESSION_LEVEL = int(os.getenv("ARTIFACT_COMPRESSION_LEVEL", "3"))
+
+# Compact container: magic + container version, then a JSON header line
+MAGIC = b"GCPA"
+CONTAINER_VERSION = 1
+# Version of the payload layout; bump when artifact schemas change incompatibly
+SCHEMA_VERSION = 1
+
+
+class ArtifactFormatError(ValueError):
+    """The file is a compact artifact this process cannot decode."""
+
+
+def _pick_codec(codec: str) -> str:
+    if codec == "auto":
+        return "msgpack" if msgpack else ("orjson" if orjson else "json")
+    if (codec == "msgpack" and not msgpack) or (codec == "orjson" and not orjson):
+        logger.warning(f"Artifact codec {codec} not installed, using json")
+        return "json"
+    return codec
+
+
+def _pick_compression(compression: str) -> str:
+    if compression == "auto":
+        return "zstd" if zstandard else "zlib"
+    if compression == "zstd" and not zstandard:
+        logger.warning("zstandard not installed, compressing artifacts with zlib")
+        return "zlib"
+    return compression
+
+
+def _encode(data: Any, codec: str) -> bytes:
+    if codec == "msgpack":
+        return msgpack.packb(data, default=str, use_bin_type=True)
+    if codec == "orjson":
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(payload: bytes, codec: str) -> Any:
+    if codec == "msgpack":
+        if not msgpack:
+            raise ArtifactFormatError("artifact is msgpack-encoded but msgpack is not installed")
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    if codec == "orjson" and orjson:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _compress(payload: bytes, compression: str, level: int) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(payload)
+    if compression == "zlib":
+        return zlib.compress(payload, level)
+    return payload
+
+
+def _decompress(payload: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        if not zstandard:
+            raise ArtifactFormatError("artifact is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if compression == "zlib":
+        return zlib.decompress(payload)
+    return payload
+
+
+def encode_artifact(data: Any, fmt: Optional[str] = None, codec: Optional[str] = None,
+                    compression: Optional[str] = None, ensure_ascii: bool = True) -> bytes:
+    """Bytes of an artifact in the given (or configured) encoding (ensure_ascii: json only)."""
+    fmt = (fmt or ARTIFACT_FORMAT).lower()
+    if fmt != "compact":
+        return json.dumps(data, indent=2, ensure_ascii=ensure_ascii, default=str).encode("utf-8")
+    codec = _pick_codec(codec or ARTIFACT_CODEC)
+    compression = _pick_compression(compression or ARTIFACT_COMPRESSION)
+    header = {"schema": SCHEMA_VERSION, "codec": codec, "compression": compression}
+    body = _compress(_encode(data, codec), compression, ARTIFACT_COMPRESSION_LEVEL)
+    return b"%s%d\n%s\n%s" % (MAGIC, CONTAINER_VERSION, json.dumps(header).encode("ascii"), body)
+
+
+def read_header(raw: bytes) -> Tuple[Optional[Dict[str, Any]], int]:
+    """(header, payload offset) of a compact artifact; (None, 0) for plain JSON."""
+    if not raw.startswith(MAGIC):
+        return None, 0
+    first = raw.index(b"\n")
+    second = raw.index(b"\n", first + 1)
+    header = json.loads(raw[first + 1:second])
+    header["container"] = int(raw[len(MAGIC):first])
+    if header["container"] > CONTAINER_VERSION or header.get("schema", 1) > SCHEMA_VERSION:
+        raise ArtifactFormatError(f"artifact written by a newer version: {header}")
+    return header, second + 1
+
+
+def decode_artifact(raw: bytes) -> Any:
+    header, offset = read_header(raw)
+    if header is None:
+        # plain JSON (everything written before compact artifacts, and ARTIFACT_FORMAT=json)
+        if orjson:
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                pass  # e.g. NaN, which json.dump writes and orjson rejects
+        return json.loads(raw.decode("utf-8"))
+    return _decode(_decompress(raw[offset:], header["compression"]), header["codec"])
+
+
+def save_artifact(path: Path, data: Any, fmt: Optional[str] = None, ensure_ascii: bool = True) -> Path:
+    """
+    Write an artifact atomically (temporary file + rename), so readers that
+    pick the newest file never see a partial one. Returns the path.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # unique per writer: threads saving the same artifact never share a temporary file
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp.write_bytes(encode_artifact(data, fmt, ensure_ascii=ensure_ascii))
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return path
+
+
+def load_artifact(path: Path) -> Any:
+    """Read an artifact in any supported encoding."""
+    return decode_artifact(Path(path).read_bytes())
@@ -0,0 +1,121 @@
+"""
+Branch GC Module - Removes stale golden/drift branches from the remote
+
+golden_branch_tracker keeps only the last MAX_BRANCHES_PER_ENV branches per
+service/environment, but the remote keeps every generated branch forever,
+which slows down every ref advertisement and fetch. This module finds the
+generated branches the tracker no longer references and deletes them in
+batched atomic pushes.
+
+Only names produced by generate_unique_branch_name
+("<golden|drift>_<env>_<YYYYMMDD>_<HHMMSS>_<hex6>") are ever candidates, and
+branches younger than BRANCH_GC_MIN_AGE_HOURS are kept so runs still in
+flight are never affected.
+"""
+
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import logging
+
+from shared.git_operations import get_ref_cache, delete_remote_branches, log_and_print
+from shared.golden_branch_tracker import get_tracked_branch_names
+
+logger = logging.getLogger(__name__)
+
+# Generated branches younger than this are never collected
+BRANCH_GC_MIN_AGE_HOURS = float(os.getenv("BRANCH_GC_MIN_AGE_HOURS", "24"))
+
+GENERATED_BRANCH_RE = re.compile(
+    r"^(?P<kind>golden|drift)_(?P<env>.+)_(?P<ts>\d{8}_\d{6})_[0-9a-f]{6}$"
+)
+
+
+def find_stale_branches(
+    repo_url: str,
+    service_ids: List[str],
+    environments: List[str],
+    gitlab_token: Optional[str] = None,
+    min_age_hours: float = BRANCH_GC_MIN_AGE_HOURS,
+    now: Optional[datetime] = None
+) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Work out which generated branches on the remote are stale.
+
+    A branch is stale if it was generated for one of the environments, is
+    not tracked by any of the services sharing the repository, and is older
+    than min_age_hours.
+
+    Args:
+        repo_url: Repository URL
+        service_ids: All services using this repository
+        environments: Environments to collect
+        gitlab_token: Optional GitLab token for authentication
+        min_age_hours: Grace period for recently generated branches
+        now: Reference time (defaults to the current time)
+
+    Returns:
+        {environment: {"golden": [...], "drift": [...]}} of stale branch names
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(hours=min_age_hours)
+    tracked = get_tracked_branch_names(service_ids)
+    heads = get_ref_cache().heads(repo_url, gitlab_token, refresh=True)
+
+    stale: Dict[str, Dict[str, List[str]]] = {env: {"golden": [], "drift": []} for env in environments}
+    for name in sorted(heads):
+        match = GENERATED_BRANCH_RE.match(name)
+        if not match or match.group("env") not in stale or name in tracked:
+            continue
+        try:
+            created = datetime.strptime(match.group("ts"), "%Y%m%d_%H%M%S")
+        except ValueError:
+            continue
+        if created > cutoff:
+            continue
+        stale[match.group("env")][match.group("kind")].append(name)
+    return stale
+
+
+def gc_stale_branches(
+    repo_url: str,
+    service_ids: List[str],
+    environments: List[str],
+    dry_run: bool = True,
+    gitlab_token: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Delete stale generated branches from the remote (or only report them).
+
+    Args:
+        repo_url: Repository URL
+        service_ids: All services using this repository
+        environments: Environments to collect
+        dry_run: Only report what would be deleted
+        gitlab_token: Optional GitLab token for authentication
+
+    Returns:
+        Report with the stale branches per environment, totals and, unless
+        dry_run, the deleted/failed branch names
+    """
+    stale = find_stale_branches(repo_url, service_ids, environments, gitlab_token)
+    to_delete = [name for env in stale.values() for names in env.values() for name in names]
+
+    report: Dict[str, Any] = {
+        "repo_url": repo_url,
+        "dry_run": dry_run,
+        "stale": stale,
+        "total_stale": len(to_delete),
+        "deleted": [],
+        "failed": [],
+    }
+    if dry_run or not to_delete:
+        log_and_print(f"🧹 Branch GC{' (dry run)' if dry_run else ''}: {len(to_delete)} stale branches")
+        return report
+
+    log_and_print(f"🧹 Branch GC: deleting {len(to_delete)} stale branches")
+    result = delete_remote_branches(repo_url, to_delete, gitlab_token)
+    report.update(result)
+    log_and_print(f"✅ Branch GC: deleted {len(result['deleted'])}, failed {len(result['failed'])}")
+    return report
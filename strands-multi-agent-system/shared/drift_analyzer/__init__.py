@@ -24,8 +24,25 @@ from .drift_v1 import (
     binary_deltas,
     emit_bundle,
     _hunks_for_file,
+    _is_text,
+    _git_tree,
+    _git_structural,
+    _changed_paths_by_side,
 )
 
+# Per-run file buffering (each file is read once per analysis run); git tree marker
+# that lets file digests carry over between runs' checkout directories
+from .caches import begin_file_blob_run, end_file_blob_run, mark_tree_source
+
+# Single-walk repository index shared by the scan, detectors and collector
+from .repo_index import RepoIndex, get_repo_index
+
+# Segmented (NDJSON) context bundles and the reader for both bundle formats
+from .bundle_io import BundleWriter, BundleReader, bundle_path, open_bundle
+
+# Per-analysis state (roots, policies, caches, options) for concurrent analyses
+from .session import AnalysisSession
+
 # Compatibility wrappers for renamed functions
 def extract_repo_tree(root: Path) -> List[str]:
     """Wrapper for _tree"""
@@ -35,17 +52,31 @@ def classify_files(root: Path, relpaths: List[str]) -> List[Dict[str, Any]]:
     """Wrapper for _classify"""
     return _classify(root, relpaths)
 
-def diff_structural(g_files: List[Dict[str, Any]], c_files: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Wrapper for _structural"""
-    return _structural(g_files, c_files)
+def diff_structural(g_files: List[Dict[str, Any]], c_files: List[Dict[str, Any]],
+                    g_root: Optional[Path] = None, c_root: Optional[Path] = None) -> Dict[str, Any]:
+    """Wrapper for _structural (pass the roots to also detect moved-and-edited files)"""
+    return _structural(g_files, c_files, g_root, c_root)
+
+def extract_git_tree(git_dir: Path, rev: str, with_sizes: bool = True) -> List[Dict[str, Any]]:
+    """Wrapper for _git_tree (file records from git objects, no checkout)"""
+    return _git_tree(git_dir, rev, with_sizes)
+
+def diff_git_trees(git_dir: Path, g_rev: str, c_rev: str, rename_threshold: Optional[str] = None) -> Dict[str, Any]:
+    """Wrapper for _git_structural (tree-to-tree diff, same shape as diff_structural)"""
+    return _git_structural(git_dir, g_rev, c_rev, rename_threshold)
 
-def semantic_config_diff(g_root: Path, c_root: Path, changed_paths: List[str]) -> Dict[str, Dict[str, Any]]:
+def changed_paths_by_side(file_changes: Dict[str, Any]):
+    """Wrapper for _changed_paths_by_side -> (golden_paths, candidate_paths) to materialize"""
+    return _changed_paths_by_side(file_changes)
+
+def semantic_config_diff(g_root: Path, c_root: Path, changed_paths: List[str],
+                         renames: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, Any]]:
     """Wrapper for _semantic_config_diff"""
-    return _semantic_config_diff(g_root, c_root, changed_paths)
+    return _semantic_config_diff(g_root, c_root, changed_paths, renames)
 
-def detector_jenkinsfile(g_root: Path, c_root: Path) -> List[Dict[str, Any]]:
-    """Wrapper for detector_jenkinsfiles (singular -> plural)"""
-    return detector_jenkinsfiles(g_root, c_root)
+def detector_jenkinsfile(g_root: Path, c_root: Path, changed: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Wrapper for detector_jenkinsfiles (singular -> plural); changed=None scans the whole tree"""
+    return detector_jenkinsfiles(g_root, c_root, changed)
 
 def build_code_hunk_deltas(g_root: Path, c_root: Path, modified_paths: List[str]) -> List[Dict[str, Any]]:
     """Build code hunks for modified files"""
@@ -55,7 +86,6 @@ def build_code_hunk_deltas(g_root: Path, c_root: Path, modified_paths: List[str]
         if not gp.exists() or not cp.exists():
             continue
         # Check if it's a text file using drift_v1's _is_text
-        from .drift_v1 import _is_text
         if not _is_text(cp):
             continue
         hunks, _ = _hunks_for_file(gp, cp, rel)
@@ -75,9 +105,11 @@ def emit_context_bundle(out_dir: Path,
                         file_changes: Dict[str, Any],
                         extra_deltas: Optional[List[Dict[str, Any]]] = None,
                         policies_path: Optional[Path] = None,
-                        evidence: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+                        evidence: Optional[List[Dict[str, Any]]] = None,
+                        session: Optional[AnalysisSession] = None) -> BundleReader:
     """
     Wrapper for emit_bundle with compatibility for old signature.
+    Returns a BundleReader over the written bundle (sections, summary, lazy deltas).
     Note: drift_v1 uses per_file_patches instead of evidence parameter.
     The g_files bug has been fixed in drift_v1.py line 780.
     """
@@ -96,14 +128,21 @@ def emit_context_bundle(out_dir: Path,
         file_changes=file_changes,
         extra_deltas=extra_deltas or [],
         per_file_patches=per_file_patches,
-        policies_path=policies_path
+        policies_path=policies_path,
+        session=session
     )
 
+# Imported last: the executor resolves build_code_hunk_deltas from this package
+from .detector_executor import run_detectors
+
 __all__ = [
     # Core analysis functions
     'extract_repo_tree',
     'classify_files',
     'diff_structural',
+    'extract_git_tree',
+    'diff_git_trees',
+    'changed_paths_by_side',
     'semantic_config_diff',
     'extract_dependencies',
     'dependency_diff',
@@ -115,6 +154,23 @@ __all__ = [
     'build_code_hunk_deltas',
     'build_binary_deltas',
     
-    # Bundle generation
+    # Repository index
+    'RepoIndex',
+    'get_repo_index',
+
+    # Parallel detector execution
+    'run_detectors',
+
+    # Bundle generation and reading
     'emit_context_bundle',
+    'BundleWriter',
+    'BundleReader',
+    'bundle_path',
+    'open_bundle',
+
+    # Run scoping
+    'AnalysisSession',
+    'begin_file_blob_run',
+    'end_file_blob_run',
+    'mark_tree_source',
 ]
@@ -0,0 +1,228 @@
+"""
+Context Bundle I/O
+
+Segmented context bundle (context_bundle.ndjson): one JSON record per line,
+small sections first, then one record per delta and per git patch, then a
+summary record:
+
+    {"kind": "header", "format": "drift-bundle", "version": 1}
+    {"kind": "section", "name": "meta", "data": {...}}       (meta, overview, file_changes, dependencies, configs)
+    {"kind": "delta", "data": {...}}                          (one per delta, streamed as written)
+    {"kind": "patch", "file": "<rel>", "data": "<patch>"}    (one per file)
+    {"kind": "summary", "deltas": N, "files_with_drift": F, "patches": P, "categories": {...}}
+
+Readers get the sections without touching the deltas, iterate deltas lazily
+and read the summary from the last line. open_bundle() also reads the
+single-document context_bundle.json written before this format existed.
+
+Configuration:
+    DRIFT_BUNDLE_FORMAT  "ndjson" (default) or "json" (single document)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+try:
+    from ..artifact_io import load_artifact, save_artifact
+except ImportError:  # executed as a script
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from shared.artifact_io import load_artifact, save_artifact
+
+BUNDLE_FORMAT = os.getenv("DRIFT_BUNDLE_FORMAT", "ndjson").lower()
+BUNDLE_NDJSON = "context_bundle.ndjson"
+BUNDLE_JSON = "context_bundle.json"
+
+_FORMAT_NAME = "drift-bundle"
+_FORMAT_VERSION = 1
+SECTIONS = ("meta", "overview", "file_changes", "dependencies", "configs")
+
+
+def bundle_path(out_dir: Path) -> Path:
+    """The context bundle in out_dir: segmented if present, else the single document."""
+    out_dir = Path(out_dir)
+    seg = out_dir / BUNDLE_NDJSON
+    return seg if seg.exists() or not (out_dir / BUNDLE_JSON).exists() else out_dir / BUNDLE_JSON
+
+
+class BundleWriter:
+    """
+    Streams a segmented bundle to disk. Sections must be written before the
+    first delta. The file is written under a temporary name and moved into
+    place on close(), so readers never see a partial bundle.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._f = self._tmp.open("w", encoding="utf-8")
+        self._deltas = 0
+        self._patches = 0
+        self._files: Set[str] = set()
+        self._categories: Counter = Counter()
+        self._write({"kind": "header", "format": _FORMAT_NAME, "version": _FORMAT_VERSION})
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        self._f.write("\n")
+
+    def write_section(self, name: str, data: Any) -> None:
+        if self._deltas or self._patches:
+            raise ValueError(f"section {name!r} written after deltas")
+        self._write({"kind": "section", "name": name, "data": data})
+
+    def write_delta(self, delta: Dict[str, Any]) -> None:
+        self._write({"kind": "delta", "data": delta})
+        self._deltas += 1
+        self._files.add(delta.get("file", ""))
+        self._categories[delta.get("category", "unknown")] += 1
+
+    def write_patch(self, rel: str, patch: str) -> None:
+        self._write({"kind": "patch", "file": rel, "data": patch})
+        self._patches += 1
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self._write({"kind": "summary", "deltas": self._deltas, "files_with_drift": len(self._files),
+                     "patches": self._patches, "categories": dict(self._categories)})
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        self._f.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "BundleWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_bundle_json(path: Path, bundle: Dict[str, Any]) -> None:
+    """Single-document bundle (the format before segmented bundles), in the configured artifact encoding."""
+    save_artifact(path, bundle)
+
+
+def _last_line(f, block: int = 1 << 16) -> bytes:
+    f.seek(0, os.SEEK_END)
+    end = pos = f.tell()
+    buf = b""
+    while pos > 0:
+        step = min(block, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+        # the file ends with "\n": look for the one before it
+        nl = buf.rfind(b"\n", 0, len(buf) - 1)
+        if nl >= 0:
+            return buf[nl + 1:]
+    f.seek(0)
+    return f.read(end)
+
+
+class BundleReader:
+    """Lazy access to a segmented bundle, or to a single-document bundle (loaded whole)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            first = f.readline()
+        try:
+            head = json.loads(first)
+        except ValueError:
+            head = None
+        self.segmented = isinstance(head, dict) and head.get("kind") == "header" and head.get("format") == _FORMAT_NAME
+        self._doc: Optional[Dict[str, Any]] = None
+        self._sections: Optional[Dict[str, Any]] = None
+        if not self.segmented:
+            self._doc = load_artifact(self.path)
+
+    def _records(self) -> Iterator[Dict[str, Any]]:
+        with self.path.open("r", encoding="utf-8") as f:
+            next(f, None)  # header
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def sections(self) -> Dict[str, Any]:
+        """meta, overview, file_changes, dependencies and configs (deltas are not read)."""
+        if self._sections is None:
+            if self._doc is not None:
+                self._sections = {k: self._doc[k] for k in SECTIONS if k in self._doc}
+            else:
+                out: Dict[str, Any] = {}
+                for rec in self._records():
+                    if rec.get("kind") != "section":
+                        break
+                    out[rec["name"]] = rec["data"]
+                self._sections = out
+        return self._sections
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name == "deltas":
+            return list(self.iter_deltas())
+        if name == "git_patches":
+            return dict(self.iter_patches())
+        return self.sections().get(name, default)
+
+    def iter_deltas(self) -> Iterator[Dict[str, Any]]:
+        if self._doc is not None:
+            yield from self._doc.get("deltas", [])
+            return
+        for rec in self._records():
+            kind = rec.get("kind")
+            if kind == "delta":
+                yield rec["data"]
+            elif kind in ("patch", "summary"):
+                return
+
+    def iter_patches(self) -> Iterator[Tuple[str, str]]:
+        if self._doc is not None:
+            yield from (self._doc.get("git_patches") or {}).items()
+            return
+        for rec in self._records():
+            if rec.get("kind") == "patch":
+                yield rec["file"], rec["data"]
+
+    def summary(self) -> Dict[str, Any]:
+        """Delta/patch counts, files with drift and per-category counts."""
+        if self._doc is None:
+            with self.path.open("rb") as f:
+                rec = json.loads(_last_line(f))
+            if rec.get("kind") == "summary":
+                return {k: v for k, v in rec.items() if k != "kind"}
+            deltas = self.iter_deltas()
+            patches = sum(1 for _ in self.iter_patches())
+        else:
+            deltas = self._doc.get("deltas", [])
+            patches = len(self._doc.get("git_patches") or {})
+        n, files, cats = 0, set(), Counter()
+        for d in deltas:
+            n += 1
+            files.add(d.get("file", ""))
+            cats[d.get("category", "unknown")] += 1
+        return {"deltas": n, "files_with_drift": len(files), "patches": patches, "categories": dict(cats)}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The whole bundle in the single-document shape."""
+        if self._doc is not None:
+            return self._doc
+        return {**self.sections(), "deltas": list(self.iter_deltas()), "git_patches": dict(self.iter_patches())}
+
+
+def open_bundle(path: Path) -> BundleReader:
+    """Reader for a bundle file, or for the bundle inside an output directory."""
+    path = Path(path)
+    if path.is_dir():
+        path = bundle_path(path)
+    return BundleReader(path)
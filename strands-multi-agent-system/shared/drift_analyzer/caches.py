@@ -0,0 +1,503 @@
+"""
+Drift Analyzer Caches
+
+FingerprintCache - persistent (sqlite) file digest cache used by _classify and
+binary_deltas. Entries are keyed by (tree identity, relpath, size, mtime_ns,
+inode, algorithm), so a file that has not changed since the last run is never
+re-read or re-hashed. Trees written from git carry their git tree SHA in a
+marker file (mark_tree_source); such trees are identified by that SHA and their
+files by (relpath, size) only, so per-run checkout directories still hit.
+
+FileBlobStore - bounded LRU of file contents for one analysis run. Sniffing,
+hashing, decoding and parsing of a file are all served from a single read.
+The run's store also counts the fingerprint and parse cache hits and misses
+of that run (FileBlobStore.counter), so concurrent analyses never see each
+other's counts.
+
+ParseCache - parsed + flattened config files keyed by content hash, file type
+and parser version; an LRU in memory, optionally persisted in sqlite so an
+unchanged (golden) file is never parsed twice.
+
+Configuration:
+    DRIFT_FINGERPRINT_CACHE    sqlite file path ("off" keeps the cache in memory only)
+    DRIFT_FINGERPRINT_MODE     "sha256" (default) or "fast" (xxh3-128 if xxhash is
+                               installed, else blake2b-128; non-cryptographic use only)
+    DRIFT_BLOB_CACHE_BYTES     memory budget of the per-run file blob store
+    DRIFT_BLOB_MAX_FILE_BYTES  larger files are streamed / sniffed, never buffered
+    DRIFT_PARSE_CACHE          sqlite file path ("off" keeps parses in memory only)
+    DRIFT_PARSE_CACHE_ENTRIES  in-memory LRU size (parsed files)
+"""
+
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import xxhash
+    _HAVE_XXHASH = True
+except Exception:
+    _HAVE_XXHASH = False
+
+DEFAULT_FINGERPRINT_CACHE = str(Path(tempfile.gettempdir()) / "golden_config_drift" / "fingerprints.sqlite3")
+DEFAULT_PARSE_CACHE = str(Path(tempfile.gettempdir()) / "golden_config_drift" / "parsed.sqlite3")
+
+# Rows older than this are dropped when a cache is opened
+FINGERPRINT_MAX_AGE_DAYS = 30
+
+# Files modified this recently may change again without a visible mtime change
+RACY_WINDOW_NS = 2 * 10 ** 9
+
+_CHUNK = 1 << 16
+
+# Written at the top of a tree materialized from git (hidden, so never scanned)
+TREE_SOURCE_FILE = ".drift-source"
+
+
+def mark_tree_source(root: Path, tree_sha: str) -> None:
+    """Record that root holds (a subset of) git tree tree_sha, unmodified."""
+    (Path(root) / TREE_SOURCE_FILE).write_text(tree_sha + "\n")
+
+
+def tree_source(root: Path) -> Optional[str]:
+    """Git tree SHA recorded by mark_tree_source, or None."""
+    try:
+        return (Path(root) / TREE_SOURCE_FILE).read_text().strip() or None
+    except OSError:
+        return None
+
+
+def sha256_file(p: Path) -> str:
+    h = hashlib.sha256()
+    with p.open("rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fast_digest_file(p: Path) -> str:
+    h = xxhash.xxh3_128() if _HAVE_XXHASH else hashlib.blake2b(digest_size=16)
+    with p.open("rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+FAST_ALGO = "xxh3_128" if _HAVE_XXHASH else "blake2b_128"
+_HASHERS = {"sha256": sha256_file, FAST_ALGO: fast_digest_file}
+
+
+def _hash_file(algo: str, p: Path, size: int) -> str:
+    """Hash p, going through the blob store so later reads of p are free."""
+    blobs = get_file_blobs()
+    if size > blobs.max_file_bytes:
+        return _HASHERS[algo](p)
+    h = hashlib.sha256() if algo == "sha256" else (
+        xxhash.xxh3_128() if _HAVE_XXHASH else hashlib.blake2b(digest_size=16))
+    h.update(blobs.read(p))
+    return h.hexdigest()
+
+
+class FingerprintCache:
+    """File digest cache; thread-safe. Call flush() to persist new digests."""
+
+    def __init__(self, db_path: Optional[str] = DEFAULT_FINGERPRINT_CACHE, mode: str = "sha256"):
+        self.algo = FAST_ALGO if mode == "fast" else "sha256"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._mem: Dict[Tuple, str] = {}
+        self._pending: List[Tuple] = []
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            try:
+                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS fingerprints ("
+                    " tree_id TEXT, rel TEXT, size INTEGER, mtime_ns INTEGER, inode INTEGER,"
+                    " algo TEXT, digest TEXT, created_at REAL,"
+                    " PRIMARY KEY (tree_id, rel, size, mtime_ns, inode, algo))"
+                )
+                self._db.execute("DELETE FROM fingerprints WHERE created_at < ?",
+                                 (time.time() - FINGERPRINT_MAX_AGE_DAYS * 86400,))
+                self._db.commit()
+            except sqlite3.Error:
+                self._db = None
+
+    @staticmethod
+    def tree_id(root: Path) -> str:
+        """Identity of a scanned tree: its git tree SHA if marked, else device + resolved root path."""
+        source = tree_source(root)
+        if source:
+            return f"git:{source}"
+        st = os.stat(root)
+        return f"{st.st_dev}:{os.path.realpath(root)}"
+
+    def digest(self, tree_id: str, root: Path, rel: str, st: os.stat_result, algo: Optional[str] = None) -> str:
+        """Digest of root/rel, from the cache when (size, mtime_ns, inode) are unchanged."""
+        algo = algo or self.algo
+        # A git tree's content is fixed by its SHA: the file's location on disk does not matter
+        immutable = tree_id.startswith("git:")
+        key = (tree_id, rel, st.st_size, 0, 0, algo) if immutable else (
+            tree_id, rel, st.st_size, st.st_mtime_ns, st.st_ino, algo)
+        with self._lock:
+            cached = self._mem.get(key)
+            if cached is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT digest FROM fingerprints WHERE tree_id=? AND rel=? AND size=? AND mtime_ns=? AND inode=? AND algo=?",
+                    key).fetchone()
+                if row:
+                    cached = self._mem[key] = row[0]
+            if cached is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        get_file_blobs().count("fingerprint_cache", cached is not None)
+        if cached is not None:
+            return cached
+        value = _hash_file(algo, root / rel, st.st_size)
+        # "Racy" files (modified within the mtime granularity window) are not cached
+        if immutable or time.time_ns() - st.st_mtime_ns > RACY_WINDOW_NS:
+            with self._lock:
+                self._mem[key] = value
+                self._pending.append(key + (value, time.time()))
+        return value
+
+    def flush(self) -> None:
+        """Persist digests computed since the last flush."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending or self._db is None:
+                return
+            try:
+                self._db.executemany("INSERT OR REPLACE INTO fingerprints VALUES (?,?,?,?,?,?,?,?)", pending)
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def stats(self, reset: bool = False) -> Dict[str, Any]:
+        """Hit/miss counters (optionally reset after reading)."""
+        with self._lock:
+            out = {"algo": self.algo, "hits": self.hits, "misses": self.misses,
+                   "persistent": self._db is not None}
+            if reset:
+                self.hits = self.misses = 0
+        return out
+
+
+_fingerprint_cache: Optional[FingerprintCache] = None
+_fingerprint_cache_lock = threading.Lock()
+
+
+def get_fingerprint_cache() -> FingerprintCache:
+    """Process-wide fingerprint cache configured from the environment."""
+    global _fingerprint_cache
+    with _fingerprint_cache_lock:
+        if _fingerprint_cache is None:
+            db_path = os.getenv("DRIFT_FINGERPRINT_CACHE", DEFAULT_FINGERPRINT_CACHE)
+            _fingerprint_cache = FingerprintCache(
+                None if db_path.lower() in ("", "off", "none") else db_path,
+                os.getenv("DRIFT_FINGERPRINT_MODE", "sha256").lower(),
+            )
+        return _fingerprint_cache
+
+
+# ---------------------------------------------------------------------------
+# Per-run file blobs
+# ---------------------------------------------------------------------------
+
+DEFAULT_BLOB_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_BLOB_MAX_FILE_BYTES = 16 * 1024 * 1024
+
+
+class FileBlobStore:
+    """
+    Bounded LRU of file contents keyed by path and validated by (size, mtime_ns).
+
+    Decoded text is memoized alongside the bytes and counts against the budget.
+    Files above max_file_bytes are never buffered: head() reads only the
+    requested prefix and hashing streams them.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_BLOB_CACHE_BYTES,
+                 max_file_bytes: int = DEFAULT_BLOB_MAX_FILE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = min(max_file_bytes, max_bytes)
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # path -> [(size, mtime_ns), data, text]
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        # derived per-run data (repository indexes), dropped with the run
+        self.memo: Dict[Any, Any] = {}
+        # hits/misses of the shared caches during this run, by cache name
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _cost(entry: list) -> int:
+        return len(entry[1]) + (len(entry[2]) if entry[2] is not None else 0)
+
+    def _lookup(self, key: str, sig: Tuple[int, int]) -> Optional[list]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] != sig:
+            self.bytes_used -= self._cost(self._entries.pop(key))
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def _evict(self) -> None:
+        while self.bytes_used > self.max_bytes and self._entries:
+            _, old = self._entries.popitem(last=False)
+            self.bytes_used -= self._cost(old)
+            self.evictions += 1
+
+    def _entry(self, p: Path) -> Tuple[Optional[list], bytes]:
+        key = os.fspath(p)
+        st = os.stat(key)
+        sig = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            entry = self._lookup(key, sig)
+            if entry is not None:
+                return entry, entry[1]
+            self.misses += 1
+        with open(key, "rb") as f:
+            data = f.read()
+        if len(data) > self.max_file_bytes:
+            return None, data
+        entry = [sig, data, None]
+        with self._lock:
+            prev = self._entries.pop(key, None)
+            if prev is not None:
+                self.bytes_used -= self._cost(prev)
+            self._entries[key] = entry
+            self.bytes_used += len(data)
+            self._evict()
+        return entry, data
+
+    def read(self, p: Path) -> bytes:
+        """Whole file contents (read at most once while unchanged and resident)."""
+        return self._entry(p)[1]
+
+    def head(self, p: Path, n: int) -> bytes:
+        """First n bytes; large files are not read past the prefix."""
+        key = os.fspath(p)
+        st = os.stat(key)
+        if st.st_size > self.max_file_bytes:
+            with open(key, "rb") as f:
+                return f.read(n)
+        return self.read(p)[:n]
+
+    def text(self, p: Path) -> str:
+        """UTF-8 text with universal newlines (same result as read_text(errors="ignore"))."""
+        entry, data = self._entry(p)
+        if entry is not None and entry[2] is not None:
+            return entry[2]
+        txt = data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+        if entry is not None:
+            with self._lock:
+                if self._entries.get(os.fspath(p)) is entry and entry[2] is None:
+                    entry[2] = txt
+                    self.bytes_used += len(txt)
+                    self._evict()
+        return txt
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.memo.clear()
+            self.bytes_used = 0
+
+    def stats(self, reset: bool = False) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current residency."""
+        with self._lock:
+            out = {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                   "bytes_used": self.bytes_used, "files": len(self._entries)}
+            if reset:
+                self.hits = self.misses = self.evictions = 0
+        return out
+
+    def count(self, cache: str, hit: bool) -> None:
+        """Record a hit or miss of a shared cache (fingerprint_cache, parse_cache) in this run."""
+        with self._lock:
+            c = self.counters.setdefault(cache, {"hits": 0, "misses": 0})
+            c["hits" if hit else "misses"] += 1
+
+    def counter(self, cache: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters.get(cache, {"hits": 0, "misses": 0}))
+
+
+def _new_file_blob_store() -> FileBlobStore:
+    return FileBlobStore(
+        int(os.getenv("DRIFT_BLOB_CACHE_BYTES", str(DEFAULT_BLOB_CACHE_BYTES))),
+        int(os.getenv("DRIFT_BLOB_MAX_FILE_BYTES", str(DEFAULT_BLOB_MAX_FILE_BYTES))),
+    )
+
+
+_file_blobs: contextvars.ContextVar[Optional[FileBlobStore]] = contextvars.ContextVar("drift_file_blobs", default=None)
+_default_file_blobs: Optional[FileBlobStore] = None
+
+
+def get_file_blobs() -> FileBlobStore:
+    """Blob store of the current analysis run (process-wide fallback outside a run)."""
+    global _default_file_blobs
+    store = _file_blobs.get()
+    if store is not None:
+        return store
+    with _fingerprint_cache_lock:
+        if _default_file_blobs is None:
+            _default_file_blobs = _new_file_blob_store()
+        return _default_file_blobs
+
+
+def run_memo() -> Optional[Dict[Any, Any]]:
+    """Memo dict of the current analysis run, or None outside a run."""
+    store = _file_blobs.get()
+    return store.memo if store is not None else None
+
+
+def run_cache_stats(store: Optional[FileBlobStore] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Cache counters of one run (default: the current one): the run's blob store,
+    and the fingerprint/parse cache hits and misses recorded in it. Shared
+    settings (algo, persistent, entries) come from the process-wide caches.
+    """
+    store = store if store is not None else get_file_blobs()
+    return {
+        "fingerprint_cache": {**get_fingerprint_cache().stats(), **store.counter("fingerprint_cache")},
+        "file_blobs": store.stats(),
+        "parse_cache": {**get_parse_cache().stats(), **store.counter("parse_cache")},
+    }
+
+
+def begin_file_blob_run() -> contextvars.Token:
+    """Start a run with a fresh blob store; pass the token to end_file_blob_run()."""
+    return _file_blobs.set(_new_file_blob_store())
+
+
+def end_file_blob_run(token: contextvars.Token) -> None:
+    """Drop the run's buffered files and restore the previous store."""
+    store = _file_blobs.get()
+    if store is not None:
+        store.clear()
+    _file_blobs.reset(token)
+
+
+# ---------------------------------------------------------------------------
+# Parsed config files
+# ---------------------------------------------------------------------------
+
+DEFAULT_PARSE_CACHE_ENTRIES = 4096
+
+
+class ParseCache:
+    """
+    Parse results keyed by content. Entries are plain dicts owned by the cache;
+    callers must not mutate them. Entries that are not JSON-serializable stay
+    in memory only.
+    """
+
+    def __init__(self, db_path: Optional[str] = DEFAULT_PARSE_CACHE,
+                 max_entries: int = DEFAULT_PARSE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            try:
+                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                self._db.execute("CREATE TABLE IF NOT EXISTS parsed (key TEXT PRIMARY KEY, payload TEXT, created_at REAL)")
+                self._db.execute("DELETE FROM parsed WHERE created_at < ?",
+                                 (time.time() - FINGERPRINT_MAX_AGE_DAYS * 86400,))
+                self._db.commit()
+            except sqlite3.Error:
+                self._db = None
+
+    @staticmethod
+    def key(data: bytes, *parts: str) -> str:
+        """Content hash of data plus discriminators (file type, parser version)."""
+        return ":".join((hashlib.blake2b(data, digest_size=16).hexdigest(),) + parts)
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is None and self._db is not None:
+                try:
+                    row = self._db.execute("SELECT payload FROM parsed WHERE key=?", (key,)).fetchone()
+                except sqlite3.Error:
+                    row = None
+                if row:
+                    entry = json.loads(row[0])
+            if entry is None:
+                self.misses += 1
+            else:
+                self._remember(key, entry)
+                self.hits += 1
+        get_file_blobs().count("parse_cache", entry is not None)
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is None:
+                return
+            try:
+                payload = json.dumps(entry)
+            except (TypeError, ValueError):
+                return
+            try:
+                self._db.execute("INSERT OR REPLACE INTO parsed VALUES (?,?,?)", (key, payload, time.time()))
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def stats(self, reset: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            out = {"hits": self.hits, "misses": self.misses, "entries": len(self._mem),
+                   "persistent": self._db is not None}
+            if reset:
+                self.hits = self.misses = 0
+        return out
+
+
+_parse_cache: Optional[ParseCache] = None
+
+
+def get_parse_cache() -> ParseCache:
+    """Process-wide parse cache configured from the environment."""
+    global _parse_cache
+    with _fingerprint_cache_lock:
+        if _parse_cache is None:
+            db_path = os.getenv("DRIFT_PARSE_CACHE", DEFAULT_PARSE_CACHE)
+            _parse_cache = ParseCache(
+                None if db_path.lower() in ("", "off", "none") else db_path,
+                int(os.getenv("DRIFT_PARSE_CACHE_ENTRIES", str(DEFAULT_PARSE_CACHE_ENTRIES))),
+            )
+        return _parse_cache
@@ -0,0 +1,168 @@
+"""
+Drift Detector Executor
+
+Runs the independent drift detectors of one analysis (semantic config diff,
+dependency extraction, Spring profile and Jenkinsfile detectors, code hunks,
+binary deltas) in a reusable process pool. Per-file detectors are split into
+chunks of changed files. Results are merged in submission order, so the output
+is identical to running everything sequentially.
+
+Each unit run in a worker gets its own file-blob run (caches.begin_file_blob_run),
+so buffered files are dropped when the unit finishes; the unit's cache counters
+are sent back and added to the analysis session.
+
+Configuration:
+    DRIFT_DETECTOR_WORKERS  worker processes (1 = run in-process, sequentially)
+    DRIFT_DETECTOR_CHUNK    changed files per per-file work unit
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .caches import begin_file_blob_run, end_file_blob_run, get_fingerprint_cache, run_cache_stats
+from .drift_v1 import (
+    _changed_set,
+    _edited_renames,
+    _semantic_config_diff,
+    binary_deltas,
+    dependency_diff,
+    detector_jenkinsfiles,
+    detector_spring_profiles,
+    extract_dependencies,
+)
+from .session import AnalysisSession
+
+logger = logging.getLogger(__name__)
+
+DETECTOR_WORKERS = int(os.getenv("DRIFT_DETECTOR_WORKERS", str(min(8, os.cpu_count() or 1))))
+DETECTOR_CHUNK = int(os.getenv("DRIFT_DETECTOR_CHUNK", "8"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _code_hunks(g_root: Path, c_root: Path, rels: List[str]) -> List[Dict[str, Any]]:
+    from . import build_code_hunk_deltas
+    return build_code_hunk_deltas(g_root, c_root, rels)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """The shared pool, replaced when a different worker count is asked for."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            # units already submitted to the old pool still run to completion
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            # spawn: the API server is multi-threaded, fork would copy held locks
+            _pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_detector_pool() -> None:
+    """Stop the worker processes (they are started again on next use)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+            _pool_workers = 0
+
+
+atexit.register(shutdown_detector_pool)
+
+
+def _run_unit(fn: Callable, args: tuple) -> Tuple[Any, Dict[str, Dict[str, Any]]]:
+    """Run one work unit in a worker: (result, cache counters of this unit)."""
+    token = begin_file_blob_run()
+    try:
+        result = fn(*args)
+        stats = run_cache_stats()
+    finally:
+        end_file_blob_run(token)
+    get_fingerprint_cache().flush()
+    return result, stats
+
+
+def _chunks(rels: List[str]) -> List[List[str]]:
+    return [rels[i:i + DETECTOR_CHUNK] for i in range(0, len(rels), DETECTOR_CHUNK)]
+
+
+def _plan(g_root: Path, c_root: Path, file_changes: Dict[str, Any]) -> List[Tuple[str, Callable, tuple]]:
+    """Work units as (result key, function, args), in sequential order."""
+    # moved-and-edited files are diffed against their golden path
+    renames = _edited_renames(file_changes)
+    changed_paths = sorted(set(file_changes["modified"]) | set(file_changes["added"]) | set(renames))
+    modified = list(file_changes.get("modified", []))
+    # detectors only look at files touched by the structural diff
+    changed = _changed_set(file_changes)
+    units: List[Tuple[str, Callable, tuple]] = []
+    units += [("config", _semantic_config_diff, (g_root, c_root, c, renames)) for c in _chunks(changed_paths)]
+    units += [("deps_golden", extract_dependencies, (g_root,)),
+              ("deps_drift", extract_dependencies, (c_root,)),
+              ("spring", detector_spring_profiles, (g_root, c_root, changed)),
+              ("jenkins", detector_jenkinsfiles, (g_root, c_root, changed))]
+    units += [("hunks", _code_hunks, (g_root, c_root, c)) for c in _chunks(modified)]
+    units += [("binary", binary_deltas, (g_root, c_root, c)) for c in _chunks(modified)]
+    return units
+
+
+def _merge(units: List[Tuple[str, Callable, tuple]], results: List[Any]) -> Dict[str, Any]:
+    config_diff: Dict[str, Dict[str, Any]] = {"added": {}, "removed": {}, "changed": {}}
+    lists: Dict[str, List[Dict[str, Any]]] = {"spring": [], "jenkins": [], "hunks": [], "binary": []}
+    deps: Dict[str, Any] = {}
+    for (key, _, _), res in zip(units, results):
+        if key == "config":
+            for k in ("added", "removed", "changed"):
+                config_diff[k].update(res[k])
+        elif key.startswith("deps_"):
+            deps[key] = res
+        else:
+            lists[key].extend(res)
+    return {
+        "config_diff": config_diff,
+        "dep_diff": dependency_diff(deps["deps_golden"], deps["deps_drift"]),
+        "spring_deltas": lists["spring"],
+        "jenkins_deltas": lists["jenkins"],
+        "code_hunks": lists["hunks"],
+        "binary_deltas": lists["binary"],
+    }
+
+
+def run_detectors(g_root: Path, c_root: Path, file_changes: Dict[str, Any],
+                  workers: Optional[int] = None, session: Optional[AnalysisSession] = None) -> Dict[str, Any]:
+    """
+    Run all drift detectors for one golden/drift pair.
+
+    Returns config_diff, dep_diff, spring_deltas, jenkins_deltas, code_hunks
+    and binary_deltas. Cache counters of pooled units are added to session.
+    Falls back to in-process execution when the pool is disabled or breaks.
+    """
+    units = _plan(g_root, c_root, file_changes)
+    workers = DETECTOR_WORKERS if workers is None else workers
+    if workers > 1 and len(units) > 1:
+        try:
+            pool = _get_pool(workers)
+            futures = [pool.submit(_run_unit, fn, args) for _, fn, args in units]
+            done = [f.result() for f in futures]
+            if session is not None:
+                for _, stats in done:
+                    session.add_worker_stats(stats)
+            return _merge(units, [res for res, _ in done])
+        except BrokenProcessPool as e:
+            logger.warning(f"Detector pool failed ({e}), running detectors in-process")
+            shutdown_detector_pool()
+    return _merge(units, [fn(*args) for _, fn, args in units])
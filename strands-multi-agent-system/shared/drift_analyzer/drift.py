@@ -4,12 +4,17 @@ from pathlib import Path
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
-# -------- Optional exact YAML line numbers (falls back if missing) --------
 try:
-    from ruamel.yaml import YAML  # precise line/col for YAML
-    _HAVE_RUAMEL = True
-except Exception:
-    _HAVE_RUAMEL = False
+    from .patch_engine import diff_summary, line_opcodes, split_lines
+    from .yaml_values import load_values
+except ImportError:  # executed as a script
+    from patch_engine import diff_summary, line_opcodes, split_lines
+    from yaml_values import load_values
+
+try:
+    from .renames import exact_renames, similar_renames
+except ImportError:  # executed as a script
+    from renames import exact_renames, similar_renames
 
 # ----------------- Generic helpers -----------------
 def _sha256_file(p: Path) -> str:
@@ -97,31 +102,22 @@ def classify_files(root: Path, relpaths: List[str]) -> List[Dict[str, Any]]:
     return out
 
 # ----------------- Structural diff -----------------
-def diff_structural(g_files: List[Dict[str, Any]], c_files: List[Dict[str, Any]]) -> Dict[str, Any]:
+def diff_structural(g_files: List[Dict[str, Any]], c_files: List[Dict[str, Any]],
+                    g_root: Optional[Path] = None, c_root: Optional[Path] = None) -> Dict[str, Any]:
     gmap = {f["path"]: f for f in g_files}
     cmap = {f["path"]: f for f in c_files}
-    added, removed, modified, renamed = [], [], [], []
-
-    for path in cmap.keys() - gmap.keys():
-        added.append(path)
-    for path in gmap.keys() - cmap.keys():
-        removed.append(path)
-    for path in cmap.keys() & gmap.keys():
-        if gmap[path]["sha256"] != cmap[path]["sha256"]:
-            modified.append(path)
-
-    gh, ch = {}, {}
-    for f in g_files:
-        gh.setdefault(f["sha256"], []).append(f["path"])
-    for f in c_files:
-        ch.setdefault(f["sha256"], []).append(f["path"])
-    for h, g_paths in gh.items():
-        c_paths = ch.get(h, [])
-        for gp in g_paths:
-            for cp in c_paths:
-                if gp != cp and gp in removed and cp in added:
-                    renamed.append({"from": gp, "to": cp})
-                    removed.remove(gp); added.remove(cp)
+    added = cmap.keys() - gmap.keys()
+    removed = gmap.keys() - cmap.keys()
+    modified = [path for path in cmap.keys() & gmap.keys() if gmap[path]["sha256"] != cmap[path]["sha256"]]
+    renamed: List[Dict[str, Any]] = []
+
+    for gp, cp in exact_renames(g_files, c_files, removed, added, lambda f: f["sha256"]):
+        renamed.append({"from": gp, "to": cp})
+        removed.discard(gp); added.discard(cp)
+    if g_root is not None and c_root is not None:
+        for gp, cp, score in similar_renames(g_root, c_root, removed, added):
+            renamed.append({"from": gp, "to": cp, "similarity": score})
+            removed.discard(gp); added.discard(cp)
     return {"added": sorted(added), "removed": sorted(removed), "modified": sorted(modified), "renamed": renamed}
 
 # ----------------- Config parsing & diff -----------------
@@ -146,13 +142,9 @@ def _parse_props_text(txt: str) -> Dict[str, Any]:
 
 def _parse_yaml_json_text(txt: str, ext: str) -> Optional[Dict[str, Any]]:
     try:
-        import json, yaml  # type: ignore
         if ext == ".json":
             return json.loads(txt)
-        if _HAVE_RUAMEL:
-            y = YAML(typ="rt")  # keeps line numbers
-            return y.load(txt)
-        return yaml.safe_load(txt)  # best-effort
+        return load_values(txt)  # C loader, same values as ruamel round-trip
     except Exception:
         return None
 
@@ -312,12 +304,19 @@ def detector_jenkinsfile(g_root: Path, c_root: Path) -> List[Dict[str, Any]]:
 
 # ----------------- Code hunk diff (line-precise) -----------------
 def _hunks_for_file(g_path: Path, c_path: Path, rel: str, max_hunks: int = 200) -> List[Dict[str, Any]]:
-    a = (_load_text(g_path) or "").splitlines()
-    b = (_load_text(c_path) or "").splitlines()
-    sm = difflib.SequenceMatcher(a=a, b=b, autojunk=False)
+    summary = diff_summary(g_path, c_path)
+    if summary:
+        # too large for a line diff: counts and changed regions only
+        return [{"id": f"hunk:{rel}:summary", "category": "code_hunk", "file": rel,
+                 "locator": {"type": "diff_summary", "value": f"{rel}#summary", **summary},
+                 "summary_only": True, "old": "", "new": "",
+                 "snippet": f"{rel}: {summary['old_total']} -> {summary['new_total']} lines, "
+                            f"{summary['changed_regions']} changed region(s)"}]
+    a = split_lines(_load_text(g_path) or "")
+    b = split_lines(_load_text(c_path) or "")
     hunks: List[Dict[str, Any]] = []
     count = 0
-    for tag, i1, i2, j1, j2 in sm.get_opcodes():
+    for tag, i1, i2, j1, j2 in line_opcodes(a, b):
         if tag == "equal": continue
         if count >= max_hunks: break
         snippet = "\n".join(difflib.unified_diff(a[i1-2 if i1>=2 else 0:i2+2],
@@ -1,16 +1,31 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-import argparse, json, os, re, subprocess, sys, hashlib, difflib, mimetypes, zipfile, tarfile, xml.etree.ElementTree as ET
+import argparse, json, os, re, subprocess, sys, hashlib, mimetypes, zipfile, tarfile, xml.etree.ElementTree as ET
+import xml.parsers.expat
+import bisect, contextvars
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 # -------- Optional parsers --------
 try:
-    from ruamel.yaml import YAML
-    _HAVE_RUAMEL = True
-except Exception:
-    _HAVE_RUAMEL = False
+    from .caches import get_fingerprint_cache, get_file_blobs, get_parse_cache
+    from .repo_index import SCAN_WORKERS, get_repo_index
+    from .renames import RENAME_THRESHOLD, exact_renames, similar_renames
+    from .patch_engine import diff_summary, unified_patch
+    from .yaml_values import _HAVE_RUAMEL, LOADER_NAME as _YAML_LOADER, load_roundtrip, load_values
+    from .bundle_io import BUNDLE_JSON, BUNDLE_NDJSON, BundleReader, BundleWriter, open_bundle, write_bundle_json
+    from .session import AnalysisSession
+except ImportError:  # executed as a script
+    from caches import get_fingerprint_cache, get_file_blobs, get_parse_cache
+    from repo_index import SCAN_WORKERS, get_repo_index
+    from renames import RENAME_THRESHOLD, exact_renames, similar_renames
+    from patch_engine import diff_summary, unified_patch
+    from yaml_values import _HAVE_RUAMEL, LOADER_NAME as _YAML_LOADER, load_roundtrip, load_values
+    from bundle_io import BUNDLE_JSON, BUNDLE_NDJSON, BundleReader, BundleWriter, open_bundle, write_bundle_json
+    from session import AnalysisSession
 
 try:
     import tomllib as _toml  # py311+
@@ -29,14 +44,15 @@ def _sha256_file(p: Path) -> str:
     return h.hexdigest()
 
 def _load_text(p: Path) -> Optional[str]:
+    # served from the run's blob store: each file is read (and decoded) once
     try:
-        return p.read_text(encoding="utf-8", errors="ignore")
+        return get_file_blobs().text(p)
     except Exception:
         return None
 
 def _is_text(p: Path, sniff: int = 8192) -> bool:
     try:
-        b = p.read_bytes()[:sniff]
+        b = get_file_blobs().head(p, sniff)
     except Exception:
         return False
     if b"\x00" in b:
@@ -47,13 +63,6 @@ def _is_text(p: Path, sniff: int = 8192) -> bool:
         mt, _ = mimetypes.guess_type(str(p))
         return bool(mt and mt.startswith("text/"))
 
-def _have_git() -> bool:
-    try:
-        subprocess.run(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        return True
-    except Exception:
-        return False
-
 def _file_type(p: Path) -> str:
     name = p.name.lower(); ext = p.suffix.lower()
     parts = [s.lower() for s in p.parts]
@@ -76,17 +85,13 @@ def _env_tag(rel: str) -> Optional[str]:
     return None
 
 # -------- Repo scan & structural diff --------
-def _tree(root: Path) -> List[str]:
-    out: List[str] = []
-    for p in root.rglob("*"):
-        if p.is_file():
-            rel_path = str(p.relative_to(root)).replace("\\","/")
-            # Skip .git directory and hidden files
-            if not rel_path.startswith('.git/') and not rel_path.startswith('.'):
-                out.append(rel_path)
-    return sorted(out)
-
-def _classify(root: Path, rels: List[str]) -> List[Dict[str, Any]]:
+_SCAN_CHUNK = 256
+
+def _tree(root: Path, workers: Optional[int] = None) -> List[str]:
+    # one concurrent os.scandir walk per tree and run, shared with the detectors (RepoIndex)
+    return list(get_repo_index(root, workers).paths)
+
+def _classify_chunk(fc, tree_id: str, digest_key: str, root: Path, rels: List[str]) -> List[Dict[str, Any]]:
     out = []
     for rel in rels:
         p = root / rel
@@ -97,35 +102,134 @@ def _classify(root: Path, rels: List[str]) -> List[Dict[str, Any]]:
             "ext": p.suffix.lower(),
             "size": st.st_size,
             "mtime": st.st_mtime,
-            "sha256": _sha256_file(p),
+            digest_key: fc.digest(tree_id, root, rel, st),
             "file_type": _file_type(p),
             "env_tag": _env_tag(rel),
         })
     return out
 
-def _structural(g_files: List[Dict[str,Any]], c_files: List[Dict[str,Any]]) -> Dict[str, Any]:
+def _classify(root: Path, rels: List[str], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    # digests come from the fingerprint cache: unchanged files are not re-read
+    fc = get_fingerprint_cache(); tree_id = fc.tree_id(root)
+    digest_key = "sha256" if fc.algo == "sha256" else "digest"
+    workers = workers or SCAN_WORKERS
+    chunks = [rels[i:i + _SCAN_CHUNK] for i in range(0, len(rels), _SCAN_CHUNK)]
+    if workers <= 1 or len(chunks) <= 1:
+        out = _classify_chunk(fc, tree_id, digest_key, root, rels)
+    else:
+        # chunks keep input order; each runs in a copy of the caller's context (per-run blob store)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futs = [pool.submit(contextvars.copy_context().run, _classify_chunk, fc, tree_id, digest_key, root, c)
+                    for c in chunks]
+            out = [rec for f in futs for rec in f.result()]
+    fc.flush()
+    return out
+
+def _content_id(f: Dict[str, Any]) -> Optional[str]:
+    # checkout scans carry a sha256 (or fast digest), git-object scans carry the blob OID
+    return f.get("sha256") or f.get("digest") or f.get("oid")
+
+def _structural(g_files: List[Dict[str,Any]], c_files: List[Dict[str,Any]],
+                g_root: Optional[Path] = None, c_root: Optional[Path] = None) -> Dict[str, Any]:
     gmap = {f["path"]: f for f in g_files}; cmap = {f["path"]: f for f in c_files}
-    added, removed, modified, renamed = [], [], [], []
+    added = cmap.keys() - gmap.keys(); removed = gmap.keys() - cmap.keys()
+    modified = [p for p in cmap.keys() & gmap.keys() if _content_id(gmap[p]) != _content_id(cmap[p])]
+    renamed: List[Dict[str, Any]] = []
+
+    # exact renames: same content, different path
+    for gp, cp in exact_renames(g_files, c_files, removed, added, _content_id):
+        renamed.append({"from": gp, "to": cp}); removed.discard(gp); added.discard(cp)
+    # moved-and-edited files (needs the trees on disk)
+    if g_root is not None and c_root is not None:
+        for gp, cp, score in similar_renames(g_root, c_root, removed, added):
+            renamed.append({"from": gp, "to": cp, "similarity": score}); removed.discard(gp); added.discard(cp)
 
-    for p in cmap.keys() - gmap.keys(): added.append(p)
-    for p in gmap.keys() - cmap.keys(): removed.append(p)
-    for p in cmap.keys() & gmap.keys():
-        if gmap[p]["sha256"] != cmap[p]["sha256"]:
-            modified.append(p)
-
-    # rename heuristic: same hash, different path
-    gh, ch = {}, {}
-    for f in g_files: gh.setdefault(f["sha256"], []).append(f["path"])
-    for f in c_files: ch.setdefault(f["sha256"], []).append(f["path"])
-    for h, g_paths in gh.items():
-        for gp in g_paths:
-            for cp in ch.get(h, []):
-                if gp != cp and gp in removed and cp in added:
-                    renamed.append({"from": gp, "to": cp})
-                    removed.remove(gp); added.remove(cp)
+    return {"added": sorted(added), "removed": sorted(removed), "modified": sorted(modified), "renamed": renamed}
+
+# -------- Git-object scan & structural diff (no checkout, no hashing) --------
+def _git_out(git_dir: Path, *args: str) -> str:
+    proc = subprocess.run(["git", "--git-dir", str(git_dir), *args],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {proc.stderr.decode('utf-8', 'ignore').strip()}")
+    return proc.stdout.decode("utf-8", "surrogateescape")
+
+def _is_hidden_rel(rel: str) -> bool:
+    # same exclusion rule as _tree: .git/ and top-level hidden entries
+    return rel.startswith(".git/") or rel.startswith(".")
+
+def _git_tree(git_dir: Path, rev: str, with_sizes: bool = True) -> List[Dict[str, Any]]:
+    """File records for a commit straight from `git ls-tree` (blob OIDs instead of SHA-256).
+       with_sizes=False skips `-l`, which would fetch every blob in a partial (blob:none) clone."""
+    out = []
+    args = ["ls-tree", "-r", "-l", "-z", rev] if with_sizes else ["ls-tree", "-r", "-z", rev]
+    for entry in _git_out(git_dir, *args).split("\0"):
+        if not entry: continue
+        meta, rel = entry.split("\t", 1)
+        mode, otype, oid, *rest = meta.split()
+        size = rest[0] if rest else ""
+        if otype != "blob" or _is_hidden_rel(rel): continue
+        p = Path(rel)
+        out.append({
+            "path": rel,
+            "name": p.name,
+            "ext": p.suffix.lower(),
+            "size": int(size) if size.isdigit() else 0,
+            "mtime": None,
+            "oid": oid,
+            "mode": mode,
+            "file_type": _file_type(p),
+            "env_tag": _env_tag(rel),
+        })
+    return sorted(out, key=lambda f: f["path"])
 
+def _git_structural(git_dir: Path, g_rev: str, c_rev: str, rename_threshold: Optional[str] = None) -> Dict[str, Any]:
+    """added/removed/modified/renamed between two commits via `git diff-tree -r -M`.
+       The default threshold is DRIFT_RENAME_THRESHOLD, as in _structural; "100%" reports only
+       exact renames (no blob reads, required for partial mirrors)."""
+    rename_threshold = rename_threshold or f"{RENAME_THRESHOLD}%"
+    added, removed, modified, renamed = [], [], [], []
+    fields = _git_out(git_dir, "diff-tree", "-r", "-z", "--no-commit-id", f"-M{rename_threshold}", g_rev, c_rev).split("\0")
+    i = 0
+    while i < len(fields):
+        meta = fields[i]
+        if not meta.startswith(":"):
+            i += 1; continue
+        parts = meta[1:].split()
+        old_mode, new_mode, status = parts[0], parts[1], parts[4]
+        if status[0] in "RC":
+            src, dst = fields[i+1], fields[i+2]; i += 3
+        else:
+            src = dst = fields[i+1]; i += 2
+        if "160000" in (old_mode, new_mode):  # submodules are not files
+            continue
+        code = status[0]
+        if code == "A":
+            if not _is_hidden_rel(dst): added.append(dst)
+        elif code == "D":
+            if not _is_hidden_rel(src): removed.append(src)
+        elif code in "MT":
+            # mode-only changes keep the blob OID; a checkout scan would not see them either
+            if parts[2] != parts[3] and not _is_hidden_rel(dst): modified.append(dst)
+        elif code == "R":
+            if _is_hidden_rel(src) and not _is_hidden_rel(dst): added.append(dst)
+            elif _is_hidden_rel(dst) and not _is_hidden_rel(src): removed.append(src)
+            elif not _is_hidden_rel(src):
+                score = int(status[1:] or 100)
+                renamed.append({"from": src, "to": dst, **({"similarity": score} if score < 100 else {})})
+        elif code == "C":
+            if not _is_hidden_rel(dst): added.append(dst)
     return {"added": sorted(added), "removed": sorted(removed), "modified": sorted(modified), "renamed": renamed}
 
+def _changed_paths_by_side(file_changes: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """Paths that must exist on disk (golden side, candidate side) for the detectors to
+       produce the same deltas as a full checkout; unchanged files never yield deltas."""
+    g = set(file_changes.get("modified", [])) | set(file_changes.get("removed", []))
+    c = set(file_changes.get("modified", [])) | set(file_changes.get("added", []))
+    for rn in file_changes.get("renamed", []):
+        g.add(rn["from"]); c.add(rn["to"])
+    return sorted(g), sorted(c)
+
 # -------- Config parsing (for key-level diffs + line hints) --------
 def _flatten(d: Dict[str, Any], prefix="") -> Dict[str, Any]:
     out: Dict[str, Any] = {}
@@ -151,12 +255,10 @@ def _parse_props(txt: str) -> Dict[str, Any]:
     return out
 
 def _parse_yaml_json(txt: str, ext: str) -> Optional[Dict[str, Any]]:
+    # values only (C loader); positions come from _line_index, for drifted files only
     try:
-        import json, yaml  # type: ignore
         if ext == ".json": return json.loads(txt)
-        if _HAVE_RUAMEL:
-            y = YAML(typ="rt"); return y.load(txt)
-        return yaml.safe_load(txt)
+        return load_values(txt)
     except Exception:
         return None
 
@@ -189,6 +291,159 @@ def _parse_config(p: Path) -> Optional[Dict[str, Any]]:
     if ext == ".xml": return _parse_xml(txt)
     return None
 
+# -------- Key -> line-range index (built once per parsed file) --------
+def _yaml_end(v: Any, line: int) -> int:
+    # last line covered by a ruamel round-trip node (collections carry .lc)
+    lc = getattr(v, "lc", None)
+    if lc is None: return line
+    if isinstance(v, dict):
+        for k, x in v.items():
+            pos = lc.data.get(k)
+            if pos: line = max(line, _yaml_end(x, max(pos[0], pos[2]) + 1))
+    elif isinstance(v, list):
+        for i, x in enumerate(v):
+            pos = lc.data.get(i)
+            if pos: line = max(line, _yaml_end(x, pos[0] + 1))
+    return line
+
+def _yaml_lines(node: Any, prefix: str, out: Dict[str, List[int]]) -> None:
+    lc = getattr(node, "lc", None)
+    if lc is None or not isinstance(node, dict): return
+    for k, v in node.items():
+        pos = lc.data.get(k)
+        if not pos: continue
+        nk = f"{prefix}.{k}" if prefix else str(k)
+        out[nk] = [pos[0] + 1, _yaml_end(v, max(pos[0], pos[2]) + 1)]
+        if isinstance(v, dict): _yaml_lines(v, nk, out)
+
+def _props_lines(txt: str) -> Dict[str, List[int]]:
+    # same tokenization as _parse_props (last assignment wins)
+    out: Dict[str, List[int]] = {}
+    for i, ln in enumerate(txt.splitlines(), 1):
+        s = ln.strip()
+        if not s or s.startswith("#"): continue
+        if "=" in s: out[s.split("=", 1)[0].strip()] = [i, i]
+    return out
+
+_TOML_TABLE_RE = re.compile(r"^\[\[?\s*([^\]]+?)\s*\]\]?\s*(#.*)?$")
+_TOML_KEY_RE = re.compile(r"^([A-Za-z0-9_\-.\"' ]+?)\s*=")
+
+def _toml_lines(txt: str) -> Dict[str, List[int]]:
+    out: Dict[str, List[int]] = {}
+    table = ""; cur = None; depth = 0
+    dotted = lambda s: ".".join(part.strip().strip("\"'") for part in s.split("."))
+    for i, ln in enumerate(txt.splitlines(), 1):
+        s = ln.strip()
+        if cur and depth > 0:  # inside a multi-line array / inline table
+            depth += s.count("[") + s.count("{") - s.count("]") - s.count("}")
+            out[cur][1] = i
+            if table: out[table][1] = i
+            continue
+        if not s or s.startswith("#"): continue
+        m = _TOML_TABLE_RE.match(s)
+        if m:
+            table = dotted(m.group(1)); out[table] = [i, i]; cur = None; continue
+        m = _TOML_KEY_RE.match(s)
+        if m:
+            cur = f"{table}.{dotted(m.group(1))}" if table else dotted(m.group(1))
+            out[cur] = [i, i]
+            if table: out[table][1] = i
+            val = s[m.end():]
+            depth = val.count("[") + val.count("{") - val.count("]") - val.count("}")
+    return out
+
+def _xml_lines(txt: str) -> Dict[str, List[int]]:
+    # same key paths as _parse_xml (local tag names, [@attr]); last occurrence wins
+    out: Dict[str, List[int]] = {}
+    stack: List[Tuple[str, int]] = []
+    parser = xml.parsers.expat.ParserCreate(namespace_separator="}")
+    def start(name, attrs):
+        tag = name.split("}")[-1]
+        path = f"{stack[-1][0]}.{tag}" if stack else tag
+        line = parser.CurrentLineNumber
+        stack.append((path, line))
+        for k in attrs:
+            ak = "{" + k if "}" in k else k
+            out[f"{path}[@{ak}]"] = [line, line]
+    def end(name):
+        path, line = stack.pop()
+        out[path] = [line, parser.CurrentLineNumber]
+    parser.StartElementHandler = start; parser.EndElementHandler = end
+    try: parser.Parse(txt, True)
+    except Exception: return {}
+    return out
+
+def _line_index(p: Path) -> Dict[str, List[int]]:
+    """Full key path -> [line_start, line_end] (1-based) for a config file."""
+    ext = p.suffix.lower()
+    out: Dict[str, List[int]] = {}
+    txt = _load_text(p)
+    if txt is None: return out
+    if ext in (".yml", ".yaml", ".json"):  # JSON is YAML: the round-trip loader gives positions
+        try: _yaml_lines(load_roundtrip(txt), "", out)
+        except Exception: pass
+        return out
+    if ext == ".xml": return _xml_lines(txt)
+    if ext == ".toml" and _toml: return _toml_lines(txt)
+    if ext in (".properties",".ini",".cfg",".conf",".toml",".config"): return _props_lines(txt)
+    return out
+
+# Bump when parsing/flattening/line indexing changes: invalidates persisted parse-cache entries
+PARSER_VERSION = f"3-{_YAML_LOADER}-{'ruamel' if _HAVE_RUAMEL else 'nort'}-{'toml' if _toml else 'props'}"
+
+def _parsed(p: Path) -> Dict[str, Any]:
+    """Parse-cache entry of a config file: {"flat": key/value map}. Do not mutate."""
+    try:
+        data = get_file_blobs().read(p)
+    except Exception:
+        return {"flat": {}}
+    pc = get_parse_cache()
+    key = pc.key(data, p.suffix.lower(), PARSER_VERSION)
+    entry = pc.get(key)
+    if entry is None:
+        entry = {"flat": _flatten(_parse_config(p) or {})}
+        pc.put(key, entry)
+    return entry
+
+def _key_index(p: Path) -> Dict[str, List[int]]:
+    """Key path -> [start, end] of a config file; built on first lookup (only drifted files get here). Do not mutate."""
+    try:
+        data = get_file_blobs().read(p)
+    except Exception:
+        return {}
+    pc = get_parse_cache()
+    key = pc.key(data, p.suffix.lower(), PARSER_VERSION, "lines")
+    entry = pc.get(key)
+    if entry is None:
+        entry = {"lines": _line_index(p)}
+        pc.put(key, entry)
+    return entry["lines"]
+
+def _key_lines(roots: Tuple[Path, ...], rel: str, key: str) -> Optional[List[int]]:
+    """[line_start, line_end] of a full key path in the first root that has it (O(1) per file)."""
+    indexed = False
+    for root in roots:
+        p = Path(root)/rel
+        if not p.is_file(): continue
+        lines = _key_index(p)
+        if key in lines: return lines[key]
+        indexed = indexed or bool(lines)
+    if not indexed:  # no positional index for this file type (e.g. PyYAML fallback)
+        for root in roots:
+            ls = _first_line_for_key(Path(root)/rel, key)
+            if ls: return [ls, ls]
+    return None
+
+def _split_file_key(k: str, session: AnalysisSession) -> Tuple[str, str]:
+    # conf_diff keys are f"{rel}.{key}" and rel usually contains dots itself
+    i = k.find(".")
+    while i >= 0:
+        fn = k[:i]
+        if (session.candidate_root/fn).is_file() or (session.golden_root/fn).is_file():
+            return fn, k[i+1:]
+        i = k.find(".", i + 1)
+    return tuple(k.split(".",1)) if "." in k else (k, "")
+
 def _key_locator(filename: str, key: str) -> Dict[str, Any]:
     ext = Path(filename).suffix.lower()
     if ext in (".yml",".yaml"): t="yamlpath"
@@ -197,9 +452,8 @@ def _key_locator(filename: str, key: str) -> Dict[str, Any]:
     return {"type": t, "value": f"{filename}.{key}" if key else filename}
 
 def _first_line_for_key(file_path: Path, key_tail: str) -> Optional[int]:
-    try:
-        text = file_path.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
+    text = _load_text(file_path)
+    if text is None:
         return None
     key = key_tail.split(".")[-1]
     for i, ln in enumerate(text.splitlines()):
@@ -210,15 +464,16 @@ def _first_line_for_key(file_path: Path, key_tail: str) -> Optional[int]:
             return i + 1
     return None
 
-def _semantic_config_diff(g_root: Path, c_root: Path, changed_paths: List[str]) -> Dict[str, Dict[str, Any]]:
+def _semantic_config_diff(g_root: Path, c_root: Path, changed_paths: List[str],
+                          renames: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, Any]]:
+    # renames: candidate path -> golden path of moved-and-edited files (keys reported under the new path)
     added, removed, changed = {}, {}, {}
     for rel in changed_paths:
-        pg, pc = g_root/rel, c_root/rel
+        pg, pc = g_root/(renames or {}).get(rel, rel), c_root/rel
         if pc.suffix.lower() not in (".yml",".yaml",".json",".properties",".toml",".ini",".cfg",".conf",".config",".xml"):
             continue
-        go = _parse_config(pg) if pg.exists() else None
-        co = _parse_config(pc) if pc.exists() else None
-        gf, cf = _flatten(go or {}), _flatten(co or {})
+        gf = _parsed(pg)["flat"] if pg.exists() else {}
+        cf = _parsed(pc)["flat"] if pc.exists() else {}
         gk, ck = set(gf), set(cf)
         for k in sorted(ck - gk): added[f"{rel}.{k}"] = cf[k]
         for k in sorted(gk - ck): removed[f"{rel}.{k}"] = gf[k]
@@ -244,31 +499,7 @@ def _looks_comment_only(lines: List[str], ext: str) -> bool:
     return total > 0 and commenty == total
 
 # -------- Git-ready patch builders --------
-def _git_diff_no_index(a: Path, b: Path, rel: str) -> Optional[str]:
-    """Produce a git-apply-ready patch (candidate->golden) using `git diff --no-index`.
-       We rewrite paths to `a/<rel>` and `b/<rel>` so it applies at -p0 from candidate root."""
-    try:
-        proc = subprocess.run(
-            ["git", "diff", "--no-index", "--binary", "-U3", "--", str(a), str(b)],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=False
-        )
-        if proc.returncode not in (0,1):  # 0 = no diff, 1 = diff found
-            return None
-        patch = proc.stdout
-        patch = re.sub(r"^diff --git a/.* b/.*$", f"diff --git a/{rel} b/{rel}", patch, flags=re.M)
-        patch = re.sub(r"^--- a/.*$", f"--- a/{rel}", patch, flags=re.M)
-        patch = re.sub(r"^\+\+\+ b/.*$", f"+++ b/{rel}", patch, flags=re.M)
-        return patch.strip() if patch.strip() else None
-    except Exception:
-        return None
-
-def _difflib_gitlike_patch(a_text: List[str], b_text: List[str], rel: str) -> str:
-    ud = list(difflib.unified_diff(a_text, b_text, fromfile=f"a/{rel}", tofile=f"b/{rel}", n=3, lineterm="\n"))
-    body = "".join(ud)
-    if not body.strip():
-        return ""
-    header = f"diff --git a/{rel} b/{rel}\n"
-    return header + body
+# Patches come from the in-process engine (patch_engine.unified_patch)
 
 HUNK_RE = re.compile(r'^@@\s*-(\d+),?(\d*)\s+\+(\d+),?(\d*)\s*@@')
 
@@ -299,13 +530,21 @@ def _parse_git_patch_hunks(patch_text: str) -> List[Dict[str, Any]]:
     return hunks
 
 def _hunks_for_file(g_path: Path, c_path: Path, rel: str, max_hunks: int = 400) -> Tuple[List[Dict[str, Any]], str]:
-    patch = None
-    if _have_git():
-        patch = _git_diff_no_index(c_path, g_path, rel)
-    if not patch:
-        a = (_load_text(g_path) or "").splitlines()
-        b = (_load_text(c_path) or "").splitlines()
-        patch = _difflib_gitlike_patch(b, a, rel)
+    summary = diff_summary(c_path, g_path)
+    if summary:
+        # too large for hunks: line counts and changed regions only (candidate = old side)
+        return [{
+            "id": f"hunk:{rel}:summary",
+            "category": "code_hunk",
+            "file": rel,
+            "locator": {"type": "diff_summary", "value": f"{rel}#summary", **summary},
+            "summary_only": True,
+            "old": "", "new": "",
+            "snippet": f"{rel}: {summary['old_total']} -> {summary['new_total']} lines, "
+                       f"{summary['changed_regions']} changed region(s); too large for a line diff"
+        }], ""
+    # candidate -> golden, paths rewritten to a/<rel> and b/<rel> (applies at -p1 from candidate root)
+    patch = unified_patch(c_path, g_path, rel)
 
     hunks: List[Dict[str, Any]] = []
     used = 0
@@ -399,29 +638,43 @@ def dependency_diff(g: Dict[str, Dict[str, Any]], c: Dict[str, Dict[str, Any]])
     return diff
 
 # -------- Detectors (Spring/Jenkins/Docker) --------
-def detector_spring_profiles(g_root: Path, c_root: Path) -> List[Dict[str, Any]]:
+def _edited_renames(file_changes: Dict[str, Any]) -> Dict[str, str]:
+    """candidate path -> golden path for renames whose content also changed."""
+    return {r["to"]: r["from"] for r in file_changes.get("renamed", []) if r.get("similarity", 100) < 100}
+
+def _changed_set(file_changes: Dict[str, Any]) -> List[str]:
+    """Every path touched by a structural diff: added, removed, modified, both sides of renames."""
+    s = set(file_changes.get("added", [])) | set(file_changes.get("removed", [])) | set(file_changes.get("modified", []))
+    for r in file_changes.get("renamed", []): s.add(r["from"]); s.add(r["to"])
+    return sorted(s)
+
+def _select(root: Path, patterns: Tuple[str, ...], changed: Optional[List[str]]) -> List[str]:
+    # changed=None -> every match in the tree's index; otherwise only the changed paths whose file name matches
+    if changed is None:
+        return get_repo_index(root).select(patterns)
+    return [rel for rel in changed
+            if any(fnmatchcase(rel.rsplit("/",1)[-1], patt) for patt in patterns) and (root/rel).is_file()]
+
+def detector_spring_profiles(g_root: Path, c_root: Path, changed: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     out = []
     def collect(root: Path) -> Dict[str, Dict[str, Any]]:
-        m: Dict[str, Dict[str, Any]] = {}
-        for patt in ("**/application*.yml","**/application*.yaml","**/application*.properties"):
-            for p in root.rglob(patt):
-                rel = str(p.relative_to(root)).replace("\\","/")
-                m[rel] = _parse_config(p) or {}
-        return m
+        # flattened maps come from the parse cache (shared with _semantic_config_diff)
+        return {rel: _parsed(root/rel)["flat"]
+                for rel in _select(root, ("application*.yml","application*.yaml","application*.properties"), changed)}
     g = collect(g_root); c = collect(c_root)
     for rel in sorted(set(g)|set(c)):
-        gf = _flatten(g.get(rel, {}) or {}); cf = _flatten(c.get(rel,{}) or {})
+        gf = g.get(rel, {}); cf = c.get(rel, {})
         gk, ck = set(gf), set(cf)
         for k in sorted(ck - gk): out.append({"id": f"spring+{rel}.{k}","category":"spring_profile","file": rel,"locator": _key_locator(rel,k),"old": None,"new": cf[k]})
         for k in sorted(gk - ck): out.append({"id": f"spring-{rel}.{k}","category":"spring_profile","file": rel,"locator": _key_locator(rel,k),"old": gf[k],"new": None})
         for k in sorted(ck & gk):
             if gf[k] != cf[k]:
                 out.append({"id": f"spring~{rel}.{k}","category":"spring_profile","file": rel,"locator": _key_locator(rel,k),"old": gf[k],"new": cf[k]})
-    # line hints
+    # line hints from the per-file key index
     for d in out:
-        fname, tail = d["locator"]["value"].split(".",1) if "." in d["locator"]["value"] else (d["file"], "")
-        ls = _first_line_for_key(c_root/fname, tail) or _first_line_for_key(g_root/fname, tail)
-        if ls: d["locator"]["line_start"] = ls
+        key = d["locator"]["value"][len(d["file"])+1:]
+        lr = _key_lines((c_root, g_root), d["file"], key) if key else None
+        if lr: d["locator"]["line_start"], d["locator"]["line_end"] = lr
     return out
 
 def _summarize_jenkinsfile(p: Path) -> Dict[str, Any]:
@@ -436,14 +689,9 @@ def _summarize_jenkinsfile(p: Path) -> Dict[str, Any]:
     stages = re.findall(r"stage\s*\(\s*['\"]([^'\"]+)['\"]\s*\)", txt);    out["stages"] = stages or None
     return {k:v for k,v in out.items() if v is not None}
 
-def detector_jenkinsfiles(g_root: Path, c_root: Path) -> List[Dict[str, Any]]:
+def detector_jenkinsfiles(g_root: Path, c_root: Path, changed: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     out = []
-    def find_all(root: Path) -> List[str]:
-        hits = []
-        for p in root.rglob("Jenkinsfile*"):
-            if p.is_file(): hits.append(str(p.relative_to(root)).replace("\\","/"))
-        return hits
-    names = sorted(set(find_all(g_root)) | set(find_all(c_root)))
+    names = sorted(set(_select(g_root, ("Jenkinsfile*",), changed)) | set(_select(c_root, ("Jenkinsfile*",), changed)))
     for rel in names:
         g = _summarize_jenkinsfile(g_root/rel) if (g_root/rel).exists() else {}
         c = _summarize_jenkinsfile(c_root/rel) if (c_root/rel).exists() else {}
@@ -456,19 +704,17 @@ def detector_jenkinsfiles(g_root: Path, c_root: Path) -> List[Dict[str, Any]]:
                 out.append({"id": f"jenkins~{rel}.{k}","category":"jenkins","file": rel,"locator": loc,"old": gv,"new": cv})
     return out
 
-def detector_dockerfiles(g_root: Path, c_root: Path) -> List[Dict[str, Any]]:
+def detector_dockerfiles(g_root: Path, c_root: Path, changed: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     out = []
     def collect(root: Path) -> Dict[str, List[str]]:
         m: Dict[str, List[str]] = {}
-        for p in root.rglob("Dockerfile*"):
-            if p.is_file():
-                rel = str(p.relative_to(root)).replace("\\","/")
-                bases = []
-                for ln in (_load_text(p) or "").splitlines():
-                    s = ln.strip()
-                    if s.upper().startswith("FROM "):
-                        bases.append(s.split(None, 1)[1])
-                m[rel] = bases
+        for rel in _select(root, ("Dockerfile*",), changed):
+            bases = []
+            for ln in (_load_text(root/rel) or "").splitlines():
+                s = ln.strip()
+                if s.upper().startswith("FROM "):
+                    bases.append(s.split(None, 1)[1])
+            m[rel] = bases
         return m
     g = collect(g_root); c = collect(c_root)
     for rel in sorted(set(g)|set(c)):
@@ -484,12 +730,15 @@ def detector_dockerfiles(g_root: Path, c_root: Path) -> List[Dict[str, Any]]:
 # -------- Binary / Archive deltas --------
 def binary_deltas(g_root: Path, c_root: Path, modified: List[str]) -> List[Dict[str, Any]]:
     out: List[Dict[str, Any]] = []
+    fc = get_fingerprint_cache(); g_id, c_id = fc.tree_id(g_root), fc.tree_id(c_root)
     for rel in modified:
         gp, cp = g_root/rel, c_root/rel
         if not gp.exists() or not cp.exists(): continue
         if _is_text(cp): continue
+        gst, cst = gp.stat(), cp.stat()
         d_meta = {"id": f"bin~{rel}","category":"binary_meta","file": rel,"locator":{"type":"path","value": rel},
-                  "old":{"size": gp.stat().st_size,"sha256": _sha256_file(gp)}, "new":{"size": cp.stat().st_size,"sha256": _sha256_file(cp)}}
+                  "old":{"size": gst.st_size,"sha256": fc.digest(g_id, g_root, rel, gst, "sha256")},
+                  "new":{"size": cst.st_size,"sha256": fc.digest(c_id, c_root, rel, cst, "sha256")}}
         out.append(d_meta)
         if zipfile.is_zipfile(gp) and zipfile.is_zipfile(cp):
             def entries(p: Path) -> Dict[str, int]:
@@ -595,31 +844,25 @@ def _tag_with_policy(d: Dict[str, Any], policies: Dict[str, Any]) -> Dict[str, A
     return d
 
 # -------- Build deltas & bundle --------
-def _build_config_deltas(conf: Dict[str, Any]) -> List[Dict[str, Any]]:
-    global golden_root, candidate_root  # ✅ Fixed: Access global variables
+def _build_config_deltas(conf: Dict[str, Any], session: AnalysisSession) -> List[Dict[str, Any]]:
     deltas = []
-    for k, v in (conf.get("added") or {}).items():
-        fn, tail = k.split(".",1) if "." in k else (k,"")
+    roots = session.roots
+    def locate(k: str) -> Tuple[str, Dict[str, Any]]:
+        fn, tail = _split_file_key(k, session)
         loc = _key_locator(fn, tail)
-        ls = None
-        if tail: ls = _first_line_for_key(Path(candidate_root)/fn, tail) or _first_line_for_key(Path(golden_root)/fn, tail)
-        if ls: loc["line_start"] = ls
+        lr = _key_lines(roots, fn, tail) if tail else None
+        if lr: loc["line_start"], loc["line_end"] = lr
+        return fn, loc
+    for k, v in (conf.get("added") or {}).items():
+        fn, loc = locate(k)
         d = {"id": f"cfg+{k}","category":"config","file": fn,"locator": loc,"old": None,"new": v}
         d["risk_hint"] = _risk_hint(d); deltas.append(d)
     for k, v in (conf.get("removed") or {}).items():
-        fn, tail = k.split(".",1) if "." in k else (k,"")
-        loc = _key_locator(fn, tail)
-        ls = None
-        if tail: ls = _first_line_for_key(Path(candidate_root)/fn, tail) or _first_line_for_key(Path(golden_root)/fn, tail)
-        if ls: loc["line_start"] = ls
+        fn, loc = locate(k)
         d = {"id": f"cfg-{k}","category":"config","file": fn,"locator": loc,"old": v,"new": None}
         d["risk_hint"] = _risk_hint(d); deltas.append(d)
     for k, ch in (conf.get("changed") or {}).items():
-        fn, tail = k.split(".",1) if "." in k else (k,"")
-        loc = _key_locator(fn, tail)
-        ls = None
-        if tail: ls = _first_line_for_key(Path(candidate_root)/fn, tail) or _first_line_for_key(Path(golden_root)/fn, tail)
-        if ls: loc["line_start"] = ls
+        fn, loc = locate(k)
         d = {"id": f"cfg~{k}","category":"config","file": fn,"locator": loc,"old": ch.get("from"),"new": ch.get("to")}
         d["risk_hint"] = _risk_hint(d); deltas.append(d)
     return deltas
@@ -721,40 +964,61 @@ def _merge_deltas(deltas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
                 existing["locator"] = delta["locator"]
                 existing["id"] = delta["id"]
     
-    # Third pass: Add code hunk information to matching config deltas
+    # Third pass: Add code hunk information to matching config deltas.
+    # Hunks of a file never overlap on either side, so per side they are sorted by start
+    # and end alike: the first hunk overlapping a key's line range is one bisect away.
+    # Patches run candidate -> golden: "old" lines are candidate lines, "new" lines golden.
+    hunk_index: Dict[str, Dict[str, Tuple[List[int], List[int], List[Dict[str, Any]]]]] = {}
+    for file, hunks in code_hunks.items():
+        sides = {}
+        for side in ("old", "new"):
+            spans = []
+            for h in hunks:
+                hl = h.get("locator", {})
+                start, count = hl.get(f"{side}_start") or 0, hl.get(f"{side}_lines") or 0
+                if count: spans.append((start, start + count - 1, h))  # pure insertions cover no lines on this side
+            spans.sort(key=lambda t: t[0])
+            sides[side] = ([t[0] for t in spans], [t[1] for t in spans], [t[2] for t in spans])
+        hunk_index[file] = sides
+    matched_snippets = set()
     for merge_key, merged_delta in merged.items():
         file = merged_delta.get("file", "")
         config_key = merge_key.split("::")[1]  # Extract config key from merge key
-        
-        # Look for matching code hunks
-        if file in code_hunks:
-            for hunk in code_hunks[file]:
-                # Check if this hunk contains the config key
-                snippet = hunk.get("snippet", "")
-                if config_key and any(part in snippet for part in config_key.split(".")):
-                    # Add code hunk information to the merged delta
-                    merged_delta["detection_sources"].append("code_hunk")
-                    merged_delta["code_snippet"] = snippet
-                    merged_delta["hunk_info"] = {
-                        "old_start": hunk.get("locator", {}).get("old_start"),
-                        "old_lines": hunk.get("locator", {}).get("old_lines"),
-                        "new_start": hunk.get("locator", {}).get("new_start"),
-                        "new_lines": hunk.get("locator", {}).get("new_lines"),
-                        "hunk_header": hunk.get("locator", {}).get("hunk_header")
-                    }
-                    break
+        if file not in code_hunks:
+            continue
+        loc = merged_delta.get("locator", {})
+        hunk = None
+        if loc.get("line_start"):
+            # key lines come from the candidate unless the key was removed (golden only)
+            side = "new" if merged_delta.get("id", "").startswith(("cfg-", "spring-")) else "old"
+            starts, ends, hs = hunk_index[file][side]
+            a, b = loc["line_start"], loc.get("line_end") or loc["line_start"]
+            i = bisect.bisect_left(ends, a)
+            if i < len(hs) and starts[i] <= b:
+                hunk = hs[i]
+        elif config_key:
+            # no line range: substring match against the file's hunks, as before
+            parts = config_key.split(".")
+            hunk = next((h for h in code_hunks[file] if any(part in h.get("snippet", "") for part in parts)), None)
+        if hunk is not None:
+            snippet = hunk.get("snippet", "")
+            # Add code hunk information to the merged delta
+            merged_delta["detection_sources"].append("code_hunk")
+            merged_delta["code_snippet"] = snippet
+            merged_delta["hunk_info"] = {
+                "old_start": hunk.get("locator", {}).get("old_start"),
+                "old_lines": hunk.get("locator", {}).get("old_lines"),
+                "new_start": hunk.get("locator", {}).get("new_start"),
+                "new_lines": hunk.get("locator", {}).get("new_lines"),
+                "hunk_header": hunk.get("locator", {}).get("hunk_header")
+            }
+            matched_snippets.add(snippet)
     
     # Add any unmatched code hunks as separate deltas
     for file, hunks in code_hunks.items():
         for hunk in hunks:
-            # Check if this hunk was already merged
-            hunk_merged = False
-            for merged_delta in merged.values():
-                if "code_snippet" in merged_delta and merged_delta["code_snippet"] == hunk.get("snippet"):
-                    hunk_merged = True
-                    break
-            
-            if not hunk_merged:
+            # Already merged into a config delta (same snippet)?
+            if hunk.get("snippet") not in matched_snippets:
                 # Add as separate delta
                 hunk_key = f"unmatched_hunk_{file}_{hunk.get('id', '')}"
                 merged[hunk_key] = hunk.copy()
@@ -771,18 +1035,19 @@ def emit_bundle(out_dir: Path,
                 file_changes: Dict[str, Any],
                 extra_deltas: List[Dict[str, Any]],
                 per_file_patches: Dict[str, str],
-                policies_path: Optional[Path]) -> Dict[str, Any]:
-    # ✅ Fixed: Initialize global variables needed by helper functions
-    global golden_root, candidate_root
-    golden_root = golden
-    candidate_root = candidate
-    
-    policies = _policy_load(policies_path)
-    all_deltas = _build_config_deltas(conf_diff) + _build_dep_deltas(dep_diff) + _build_file_presence_deltas(file_changes) + extra_deltas
+                policies_path: Optional[Path],
+                session: Optional[AnalysisSession] = None) -> BundleReader:
+    """Write the context bundle; returns a reader (deltas are streamed to disk, not kept)."""
+    # roots, policies and options travel with the session, never through module state
+    if session is None:
+        session = AnalysisSession(golden, candidate, policies_path)
+    elif policies_path is not None and session.policies_path is None:
+        session.set_policies_path(policies_path)
+    policies = session.policies
+    all_deltas = _build_config_deltas(conf_diff, session) + _build_dep_deltas(dep_diff) + _build_file_presence_deltas(file_changes) + extra_deltas
     
-    # Merge duplicate deltas
+    # Merge duplicate deltas (merging needs every delta; tagging and writing are per delta)
     merged_deltas = _merge_deltas(all_deltas)
-    tagged = [_tag_with_policy(d, policies) for d in merged_deltas]
 
     # ---- enrich overview/meta for UI header ----
     drifted_files_count = len(file_changes.get("added", [])) + len(file_changes.get("removed", [])) + len(file_changes.get("modified", []))
@@ -793,6 +1058,7 @@ def emit_bundle(out_dir: Path,
         "golden_name": golden.name,
         "candidate_name": candidate.name,
         "generated_at": datetime.utcnow().isoformat() + "Z",
+        **session.cache_stats(),
     }
 
     # overview already contains total_files (calculated by config_collector_agent.py)
@@ -810,11 +1076,22 @@ def emit_bundle(out_dir: Path,
         "file_changes": file_changes,
         "dependencies": dep_diff,
         "configs": {"diff": conf_diff, "environment_keys": [], "possible_secrets": []},
-        "deltas": tagged,
+        "deltas": [],
         "git_patches": per_file_patches
     }
-    (out_dir/"context_bundle.json").write_text(json.dumps(bundle, indent=2), encoding="utf-8")
-    return bundle
+    if session.bundle_format == "json":
+        bundle["deltas"] = [_tag_with_policy(d, policies) for d in merged_deltas]
+        write_bundle_json(out_dir/BUNDLE_JSON, bundle)
+        return open_bundle(out_dir/BUNDLE_JSON)
+    # segmented bundle: sections first, then each delta as it is tagged
+    with BundleWriter(out_dir/BUNDLE_NDJSON) as w:
+        for name in ("meta", "overview", "file_changes", "dependencies", "configs"):
+            w.write_section(name, bundle[name])
+        for d in merged_deltas:
+            w.write_delta(_tag_with_policy(d, policies))
+        for rel, patch in per_file_patches.items():
+            w.write_patch(rel, patch)
+    return open_bundle(out_dir/BUNDLE_NDJSON)
 
 # -------- Main --------
 # Default paths for arguments
@@ -835,7 +1112,6 @@ def parse_args():
 def main():
     args = parse_args()
 
-    global golden_root, candidate_root, g_files, c_files
     golden_root = Path(args.golden).resolve()
     candidate_root = Path(args.candidate).resolve()
     out_dir = Path(args.out).resolve(); out_dir.mkdir(parents=True, exist_ok=True)
@@ -855,21 +1131,23 @@ def main():
     }
     (out_dir/"repo_overview.json").write_text(json.dumps(overview, indent=2), encoding="utf-8")
 
-    file_changes = _structural(g_files, c_files)
+    file_changes = _structural(g_files, c_files, golden_root, candidate_root)
     (out_dir/"file_changes.json").write_text(json.dumps(file_changes, indent=2), encoding="utf-8")
 
     g_deps = extract_dependencies(golden_root); c_deps = extract_dependencies(candidate_root)
     dep_diff = dependency_diff(g_deps, c_deps)
     (out_dir/"dependency_diff.json").write_text(json.dumps(dep_diff, indent=2), encoding="utf-8")
 
-    changed_paths = sorted(set(file_changes["modified"]) | set(file_changes["added"]))
-    conf_diff = _semantic_config_diff(golden_root, candidate_root, changed_paths)
+    renames = _edited_renames(file_changes)
+    changed_paths = sorted(set(file_changes["modified"]) | set(file_changes["added"]) | set(renames))
+    conf_diff = _semantic_config_diff(golden_root, candidate_root, changed_paths, renames)
     (out_dir/"config_diff.json").write_text(json.dumps(conf_diff, indent=2), encoding="utf-8")
 
-    # Detectors
-    spring = detector_spring_profiles(golden_root, candidate_root)
-    jenkins = detector_jenkinsfiles(golden_root, candidate_root)
-    docker = detector_dockerfiles(golden_root, candidate_root)
+    # Detectors (only files touched by the structural diff)
+    changed = _changed_set(file_changes)
+    spring = detector_spring_profiles(golden_root, candidate_root, changed)
+    jenkins = detector_jenkinsfiles(golden_root, candidate_root, changed)
+    docker = detector_dockerfiles(golden_root, candidate_root, changed)
 
     # Code hunks + per-file git-ready patches (EVERY modified text file)
     code_hunks: List[Dict[str, Any]] = []
@@ -903,8 +1181,8 @@ def main():
         "out_dir": str(out_dir),
         "meta": bundle.get("meta", {}),
         "stats": {
-            "total_files": bundle["overview"]["total_files"],
-            "drifted_files": bundle["overview"]["drifted_files"],
+            "total_files": bundle.get("overview")["total_files"],
+            "drifted_files": bundle.get("overview")["drifted_files"],
             "added": len(fc.get("added", [])),
             "removed": len(fc.get("removed", [])),
             "modified": len(fc.get("modified", [])),
@@ -0,0 +1,394 @@
+"""
+Patch Engine
+
+In-process replacement for `git diff --no-index`: a patience diff over lines
+that emits git-apply compatible unified patches. Patches are cached by the
+content hashes of both sides, so an unchanged pair of files is never diffed
+twice.
+
+Regions without unique anchor lines fall back to a linear-space Myers diff
+(middle-snake bisection) whose edit distance is budgeted per region; past the
+budget a region is reported as replaced. Files above the size thresholds get a
+summary (line counts and changed-region ranges) instead of a patch.
+
+Configuration:
+    DRIFT_DIFF_ALGORITHM  "patience" (default) or "myers"
+    DRIFT_DIFF_MAX_BYTES  larger files (either side) get a summary-only diff
+    DRIFT_DIFF_MAX_LINES  files with more lines (either side) get a summary-only diff
+    DRIFT_DIFF_MAX_EDITS  Myers edit-distance budget per region
+"""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+import os
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, AnyStr, Dict, List, Optional, Tuple
+
+try:
+    from .caches import get_file_blobs
+except ImportError:  # executed as a script
+    from caches import get_file_blobs
+
+DIFF_ALGORITHM = os.getenv("DRIFT_DIFF_ALGORITHM", "patience")
+DIFF_MAX_BYTES = int(os.getenv("DRIFT_DIFF_MAX_BYTES", str(8 * 1024 * 1024)))
+DIFF_MAX_LINES = int(os.getenv("DRIFT_DIFF_MAX_LINES", "200000"))
+DIFF_MAX_EDITS = int(os.getenv("DRIFT_DIFF_MAX_EDITS", "2048"))
+# Number of cached patch bodies (keyed by the two content hashes)
+PATCH_CACHE_ENTRIES = 2048
+# Changed regions listed in a summary-only diff
+SUMMARY_MAX_REGIONS = 100
+
+_NO_EOL = "\\ No newline at end of file\n"
+
+_cache: "OrderedDict[Tuple[str, str, int], str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _lis(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Longest run of pairs increasing in both coordinates (pairs are sorted by the first)."""
+    tails: List[int] = []       # smallest j ending a run of each length
+    tail_idx: List[int] = []    # index into pairs of that j
+    prev = [-1] * len(pairs)
+    for n, (_, j) in enumerate(pairs):
+        k = bisect.bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_idx.append(n)
+        else:
+            tails[k] = j
+            tail_idx[k] = n
+        prev[n] = tail_idx[k - 1] if k else -1
+    out: List[Tuple[int, int]] = []
+    n = tail_idx[-1] if tail_idx else -1
+    while n >= 0:
+        out.append(pairs[n])
+        n = prev[n]
+    return out[::-1]
+
+
+def _intern(a: List[str], b: List[str]) -> Tuple[List[int], List[int]]:
+    """Lines as small ints: equal lines get equal ids, so comparisons are int compares."""
+    ids: Dict[str, int] = {}
+    return ([ids.setdefault(ln, len(ids)) for ln in a], [ids.setdefault(ln, len(ids)) for ln in b])
+
+
+def _unique_anchors(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int) -> List[Tuple[int, int]]:
+    """Patience anchors: lines occurring once on each side, longest common order."""
+    ca = Counter(a[alo:ahi])
+    cb = Counter(b[blo:bhi])
+    b_unique = {b[j]: j for j in range(blo, bhi) if cb[b[j]] == 1}
+    return _lis([(i, b_unique[a[i]]) for i in range(alo, ahi) if ca[a[i]] == 1 and a[i] in b_unique])
+
+
+def _myers_split(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                 max_edits: int) -> Optional[Tuple[int, int]]:
+    """
+    Split point of a shortest edit script (middle snake, linear space).
+    Both ranges are non-empty and differ at their first and last lines.
+    None when the edit distance exceeds about 2 * max_edits.
+    """
+    n, m = ahi - alo, bhi - blo
+    max_d = (n + m + 1) // 2
+    off = max_d
+    size = 2 * max_d + 2
+    v1 = [-1] * size
+    v2 = [-1] * size
+    v1[off + 1] = 0
+    v2[off + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0
+    # diagonals that ran off the grid are skipped from then on
+    k1start = k1end = k2start = k2end = 0
+    for d in range(min(max_d, max_edits)):
+        # forward paths from the top-left corner
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1o = off + k1
+            if k1 == -d or (k1 != d and v1[k1o - 1] < v1[k1o + 1]):
+                x1 = v1[k1o + 1]
+            else:
+                x1 = v1[k1o - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[alo + x1] == b[blo + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1o] = x1
+            if x1 > n:
+                k1end += 2
+            elif y1 > m:
+                k1start += 2
+            elif front:
+                k2o = off + delta - k1
+                if 0 <= k2o < size and v2[k2o] != -1 and x1 >= n - v2[k2o]:
+                    return alo + x1, blo + y1
+        # reverse paths from the bottom-right corner
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2o = off + k2
+            if k2 == -d or (k2 != d and v2[k2o - 1] < v2[k2o + 1]):
+                x2 = v2[k2o + 1]
+            else:
+                x2 = v2[k2o - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[ahi - 1 - x2] == b[bhi - 1 - y2]:
+                x2 += 1
+                y2 += 1
+            v2[k2o] = x2
+            if x2 > n:
+                k2end += 2
+            elif y2 > m:
+                k2start += 2
+            elif not front:
+                k1o = off + delta - k2
+                if 0 <= k1o < size and v1[k1o] != -1:
+                    x1 = v1[k1o]
+                    if x1 >= n - x2:
+                        return alo + x1, blo + x1 - (k1o - off)
+    return None
+
+
+def line_matches(a: List[int], b: List[int], algorithm: Optional[str] = None,
+                 max_edits: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Matching line pairs (i, j) of a and b in increasing order."""
+    patience = (algorithm or DIFF_ALGORITHM) != "myers"
+    max_edits = DIFF_MAX_EDITS if max_edits is None else max_edits
+    out: List[Tuple[int, int]] = []
+    # explicit stack (LIFO): ("range", alo, ahi, blo, bhi) or ("match", i, j)
+    stack: List[tuple] = [("range", 0, len(a), 0, len(b))]
+    while stack:
+        task = stack.pop()
+        if task[0] == "match":
+            out.append((task[1], task[2]))
+            continue
+        _, alo, ahi, blo, bhi = task
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            out.append((alo, blo))
+            alo += 1
+            blo += 1
+        suffix = []
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            suffix.append(("match", ahi, bhi))
+        # pushed in reverse: the middle range is processed before the common suffix
+        stack.extend(suffix)
+        if alo == ahi or blo == bhi:
+            continue
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi) if patience else None
+        if anchors:
+            tasks = []
+            pi, pj = alo, blo
+            for i, j in anchors:
+                tasks.append(("range", pi, i, pj, j))
+                tasks.append(("match", i, j))
+                pi, pj = i + 1, j + 1
+            tasks.append(("range", pi, ahi, pj, bhi))
+            stack.extend(reversed(tasks))
+            continue
+        split = _myers_split(a, b, alo, ahi, blo, bhi, max_edits)
+        if split is None or split in ((alo, blo), (ahi, bhi)):
+            continue  # over budget: the whole region is replaced
+        x, y = split
+        stack.append(("range", x, ahi, y, bhi))
+        stack.append(("range", alo, x, blo, y))
+    return out
+
+
+def line_opcodes(a: List[str], b: List[str], algorithm: Optional[str] = None) -> List[Tuple[str, int, int, int, int]]:
+    """("equal" | "change", i1, i2, j1, j2) runs covering both line lists, like SequenceMatcher.get_opcodes()."""
+    ia, ib = _intern(a, b)
+    matches = line_matches(ia, ib, algorithm)
+    ops: List[Tuple[str, int, int, int, int]] = []
+    i = j = 0
+    for mi, mj in matches + [(len(a), len(b))]:
+        if i < mi or j < mj:
+            ops.append(("change", i, mi, j, mj))
+        if mi < len(a):
+            if ops and ops[-1][0] == "equal" and ops[-1][2] == mi:
+                ops[-1] = ("equal", ops[-1][1], mi + 1, ops[-1][3], mj + 1)
+            else:
+                ops.append(("equal", mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    return ops
+
+
+def split_lines(data: AnyStr, keepends: bool = False) -> List[AnyStr]:
+    """
+    Lines as git counts them: split on "\n" only (str/bytes.splitlines() also
+    splits on "\r", "\f", "\x1c"-"\x1e", "\x85", U+2028/U+2029). With keepends
+    every line but possibly the last ends in "\n".
+    """
+    nl = "\n" if isinstance(data, str) else b"\n"
+    parts = data.split(nl)
+    last = parts.pop()
+    if keepends:
+        parts = [p + nl for p in parts]
+    if last:
+        parts.append(last)
+    return parts
+
+
+def _range(start: int, length: int) -> str:
+    # unified-diff range: 1-based start; an empty range names the line before it
+    if length == 1:
+        return str(start + 1)
+    if not length:
+        return f"{start},0"
+    return f"{start + 1},{length}"
+
+
+def _emit(prefix: str, line: str, out: List[str]) -> None:
+    out.append(prefix + line)
+    if not line.endswith("\n"):
+        out.append("\n" + _NO_EOL)
+
+
+def diff_hunks_text(a: List[str], b: List[str], context: int = 3) -> str:
+    """Hunks ("@@ ... @@" + body) turning line list a into b; lines keep their endings."""
+    ops = line_opcodes(a, b)
+    if not any(op[0] == "change" for op in ops):
+        return ""
+    # group changes, keeping up to `context` equal lines around them (merged when closer than 2*context)
+    groups: List[List[Tuple[str, int, int, int, int]]] = []
+    group: List[Tuple[str, int, int, int, int]] = []
+    for n, (tag, i1, i2, j1, j2) in enumerate(ops):
+        if tag == "equal":
+            if n == 0:
+                i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+            elif n == len(ops) - 1:
+                i2, j2 = min(i2, i1 + context), min(j2, j1 + context)
+            elif i2 - i1 > 2 * context:
+                group.append((tag, i1, i1 + context, j1, j1 + context))
+                groups.append(group)
+                group = []
+                i1, j1 = i2 - context, j2 - context
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+
+    out: List[str] = []
+    for g in groups:
+        i1, i2, j1, j2 = g[0][1], g[-1][2], g[0][3], g[-1][4]
+        out.append(f"@@ -{_range(i1, i2 - i1)} +{_range(j1, j2 - j1)} @@\n")
+        for tag, a1, a2, b1, b2 in g:
+            if tag == "equal":
+                for line in a[a1:a2]:
+                    _emit(" ", line, out)
+            else:
+                for line in a[a1:a2]:
+                    _emit("-", line, out)
+                for line in b[b1:b2]:
+                    _emit("+", line, out)
+    return "".join(out)
+
+
+def _changed_regions(a: List[int], b: List[int]) -> List[Tuple[int, int, int, int]]:
+    """
+    Changed (i1, i2, j1, j2) regions in near-linear time: common prefix/suffix,
+    then one level of unique-line anchors grown over their equal neighbours.
+    Coarser than a real diff (repeated lines between anchors count as changed).
+    """
+    n, m = len(a), len(b)
+    lo = 0
+    while lo < n and lo < m and a[lo] == b[lo]:
+        lo += 1
+    hi = 0
+    while hi < n - lo and hi < m - lo and a[n - 1 - hi] == b[m - 1 - hi]:
+        hi += 1
+    if lo == n - hi and lo == m - hi:
+        return []
+    regions: List[Tuple[int, int, int, int]] = []
+    i, j = lo, lo
+    for ai, bj in _unique_anchors(a, b, lo, n - hi, lo, m - hi):
+        if ai < i or bj < j:
+            continue  # already covered by the previous anchor's run
+        # grow the anchor backwards, then forwards over equal lines
+        s_i, s_j = ai, bj
+        while s_i > i and s_j > j and a[s_i - 1] == b[s_j - 1]:
+            s_i -= 1
+            s_j -= 1
+        if s_i > i or s_j > j:
+            regions.append((i, s_i, j, s_j))
+        i, j = ai + 1, bj + 1
+        while i < n - hi and j < m - hi and a[i] == b[j]:
+            i += 1
+            j += 1
+    if i < n - hi or j < m - hi:
+        regions.append((i, n - hi, j, m - hi))
+    return regions
+
+
+def _oversized(a_path: Path, b_path: Path) -> bool:
+    try:
+        sizes = (a_path.stat().st_size, b_path.stat().st_size)
+    except OSError:
+        return False
+    if max(sizes) > DIFF_MAX_BYTES:
+        return True
+    if max(sizes) <= DIFF_MAX_LINES:
+        return False  # cannot hold more lines than bytes
+    blobs = get_file_blobs()
+    return any(blobs.read(p).count(b"\n") + 1 > DIFF_MAX_LINES for p in (a_path, b_path))
+
+
+def diff_summary(a_path: Path, b_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Summary-only diff (line counts and changed-region ranges, 1-based like hunk
+    headers) for files above the size thresholds; None when the files should
+    get a full patch, or are binary.
+    """
+    if not _oversized(a_path, b_path):
+        return None
+    blobs = get_file_blobs()
+    try:
+        a_data, b_data = blobs.read(a_path), blobs.read(b_path)
+    except OSError:
+        return None
+    if b"\x00" in a_data[:8192] or b"\x00" in b_data[:8192]:
+        return None
+    ia, ib = _intern(split_lines(a_data), split_lines(b_data))
+    regions = _changed_regions(ia, ib)
+    return {
+        "old_total": len(ia),
+        "new_total": len(ib),
+        "changed_regions": len(regions),
+        "regions": [{"old_start": i1 + 1, "old_lines": i2 - i1, "new_start": j1 + 1, "new_lines": j2 - j1}
+                    for i1, i2, j1, j2 in regions[:SUMMARY_MAX_REGIONS]],
+        "truncated": len(regions) > SUMMARY_MAX_REGIONS,
+    }
+
+
+def unified_patch(a_path: Path, b_path: Path, rel: str, context: int = 3) -> Optional[str]:
+    """
+    git-apply compatible patch turning a_path into b_path, with both sides named rel.
+    Returns None for binary content, identical files and files above the size
+    thresholds (see diff_summary).
+    """
+    if _oversized(a_path, b_path):
+        return None
+    blobs = get_file_blobs()
+    try:
+        a_data, b_data = blobs.read(a_path), blobs.read(b_path)
+    except OSError:
+        return None
+    if b"\x00" in a_data or b"\x00" in b_data:
+        return None
+    key = (hashlib.blake2b(a_data, digest_size=16).hexdigest(),
+           hashlib.blake2b(b_data, digest_size=16).hexdigest(), context)
+    with _cache_lock:
+        body = _cache.get(key)
+        if body is not None:
+            _cache.move_to_end(key)
+    if body is None:
+        a = split_lines(a_data.decode("utf-8", errors="replace"), keepends=True)
+        b = split_lines(b_data.decode("utf-8", errors="replace"), keepends=True)
+        body = diff_hunks_text(a, b, context)
+        with _cache_lock:
+            _cache[key] = body
+            while len(_cache) > PATCH_CACHE_ENTRIES:
+                _cache.popitem(last=False)
+    if not body:
+        return None
+    return f"diff --git a/{rel} b/{rel}\n--- a/{rel}\n+++ b/{rel}\n{body}"
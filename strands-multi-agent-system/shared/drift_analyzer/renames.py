@@ -0,0 +1,110 @@
+"""
+Rename Detection
+
+Exact renames pair removed/added paths with identical content in linear time.
+Similarity renames pair the remaining files whose content is near-identical,
+like git's -M<threshold>%: similarity is the share of bytes in lines common to
+both files (2 * common / (size_a + size_b)). The cost is bounded by a
+rename limit, a size cap and a size-ratio prefilter.
+
+Configuration:
+    DRIFT_RENAME_THRESHOLD  minimum similarity in percent (default 50; 100 = exact only)
+    DRIFT_RENAME_LIMIT      skip similarity matching when removed x added exceeds limit^2
+"""
+
+from __future__ import annotations
+
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+RENAME_THRESHOLD = int(os.getenv("DRIFT_RENAME_THRESHOLD", "50"))
+RENAME_LIMIT = int(os.getenv("DRIFT_RENAME_LIMIT", "1000"))
+# Larger files are never considered for similarity renames
+RENAME_MAX_BYTES = 1024 * 1024
+
+
+def exact_renames(g_files: List[Dict[str, Any]], c_files: List[Dict[str, Any]],
+                  removed: Set[str], added: Set[str],
+                  content_id: Callable[[Dict[str, Any]], Optional[str]]) -> List[Tuple[str, str]]:
+    """
+    (from, to) pairs of removed/added paths with the same content id.
+
+    Pairs in the order the old nested-loop heuristic produced: content groups in
+    first-appearance order over all golden files, then golden order zipped with
+    candidate order inside each group.
+    """
+    ch: Dict[Optional[str], List[str]] = {}
+    for f in c_files:
+        if f["path"] in added:
+            ch.setdefault(content_id(f), []).append(f["path"])
+    gh: Dict[Optional[str], List[str]] = {}
+    for f in g_files:
+        group = gh.setdefault(content_id(f), [])
+        if f["path"] in removed:
+            group.append(f["path"])
+    pairs: List[Tuple[str, str]] = []
+    for h, g_paths in gh.items():
+        pairs.extend(zip(g_paths, ch.get(h, ())))
+    return pairs
+
+
+def _signature(p: Path) -> Optional[Tuple[int, Counter]]:
+    try:
+        if p.stat().st_size > RENAME_MAX_BYTES:
+            return None
+        data = p.read_bytes()
+    except OSError:
+        return None
+    if b"\x00" in data[:8192]:
+        return None
+    return len(data), Counter(data.splitlines(keepends=True))
+
+
+def similarity(a: Tuple[int, Counter], b: Tuple[int, Counter]) -> int:
+    """Similarity percent of two signatures."""
+    size_a, lines_a = a
+    size_b, lines_b = b
+    if not size_a and not size_b:
+        return 100
+    if len(lines_a) > len(lines_b):
+        lines_a, lines_b = lines_b, lines_a
+    common = sum(min(n, lines_b[ln]) * len(ln) for ln, n in lines_a.items() if ln in lines_b)
+    return int(200 * common / (size_a + size_b))
+
+
+def similar_renames(g_root: Path, c_root: Path, removed: Iterable[str], added: Iterable[str],
+                    threshold: Optional[int] = None, limit: Optional[int] = None) -> List[Tuple[str, str, int]]:
+    """
+    (from, to, similarity) for removed/added text files at or above threshold percent.
+    Best matches are taken first; each path is used at most once.
+    """
+    threshold = RENAME_THRESHOLD if threshold is None else threshold
+    limit = RENAME_LIMIT if limit is None else limit
+    removed, added = sorted(removed), sorted(added)
+    if threshold >= 100 or not removed or not added or len(removed) * len(added) > limit * limit:
+        return []
+    g_sigs = {rel: s for rel in removed if (s := _signature(Path(g_root) / rel))}
+    c_sigs = {rel: s for rel in added if (s := _signature(Path(c_root) / rel))}
+    scored: List[Tuple[int, int, str, str]] = []
+    for gp, gs in g_sigs.items():
+        for cp, cs in c_sigs.items():
+            lo, hi = sorted((gs[0], cs[0]))
+            # upper bound of the score from sizes alone
+            if lo + hi and 200 * lo < threshold * (lo + hi):
+                continue
+            score = similarity(gs, cs)
+            if score >= threshold:
+                same_name = gp.rsplit("/", 1)[-1] == cp.rsplit("/", 1)[-1]
+                scored.append((-score, 0 if same_name else 1, gp, cp))
+    pairs: List[Tuple[str, str, int]] = []
+    used_g: Set[str] = set()
+    used_c: Set[str] = set()
+    for neg, _, gp, cp in sorted(scored):
+        if gp in used_g or cp in used_c:
+            continue
+        used_g.add(gp)
+        used_c.add(cp)
+        pairs.append((gp, cp, -neg))
+    return pairs
@@ -0,0 +1,134 @@
+"""
+Repository Index
+
+One concurrent os.scandir walk per tree, shared by the scan (_tree), the
+detectors and the collector instead of each running its own rglob. Lookups by
+glob, file name, extension and category are served from in-memory maps.
+
+Inside an analysis run (caches.begin_file_blob_run) indexes are memoized per
+root, so a tree is walked once per run.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .caches import run_memo
+except ImportError:  # executed as a script
+    from caches import run_memo
+
+# Worker threads for the walk and file classification (directory listing, stat + hashing)
+SCAN_WORKERS = int(os.getenv("DRIFT_SCAN_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+
+
+def _scan_dir(d: str) -> Tuple[List[str], List[str]]:
+    files: List[str] = []
+    dirs: List[str] = []
+    try:
+        with os.scandir(d) as it:
+            for e in it:
+                try:
+                    # like rglob(): symlinked directories are not descended into
+                    # (a link back up the tree would loop); symlinked files are kept
+                    if e.is_dir(follow_symlinks=False):
+                        dirs.append(e.path)
+                    elif e.is_file():
+                        files.append(e.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, dirs
+
+
+def _walk(root: Path, workers: int) -> List[str]:
+    """All files under root except the top-level .git directory, as sorted relpaths."""
+    root_s = os.fspath(root)
+    cut = len(root_s.rstrip(os.sep)) + 1
+    files, dirs = _scan_dir(root_s)
+    dirs = [d for d in dirs if os.path.basename(d) != ".git"]
+    # level by level; each level's directories are listed concurrently
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while dirs:
+            level = list(pool.map(_scan_dir, dirs)) if len(dirs) > 1 and workers > 1 else [_scan_dir(d) for d in dirs]
+            dirs = []
+            for fs, ds in level:
+                files.extend(fs)
+                dirs.extend(ds)
+    return sorted(f[cut:].replace("\\", "/") for f in files)
+
+
+class RepoIndex:
+    """File index of one tree: relpaths plus lookup maps by name and extension."""
+
+    def __init__(self, root: Path, all_paths: List[str]):
+        self.root = Path(root)
+        # every file (hidden ones included, .git excluded)
+        self.all_paths = all_paths
+        # scan view: top-level hidden entries skipped, as the drift scan always did
+        self.paths = [p for p in all_paths if not p.startswith(".")]
+        self.by_name: Dict[str, List[str]] = {}
+        self.by_ext: Dict[str, List[str]] = {}
+        for rel in all_paths:
+            name = rel.rsplit("/", 1)[-1]
+            self.by_name.setdefault(name, []).append(rel)
+            self.by_ext.setdefault(os.path.splitext(name)[1].lower(), []).append(rel)
+        # category -> relpaths, per classifier
+        self._categories: Dict[Callable[[Path], str], Dict[str, List[str]]] = {}
+
+    @classmethod
+    def build(cls, root: Path, workers: Optional[int] = None) -> "RepoIndex":
+        return cls(root, _walk(Path(root), workers or SCAN_WORKERS))
+
+    def glob(self, pattern: str) -> List[str]:
+        """
+        Sorted relpaths matching a glob. File-name patterns ("**/application*.yml",
+        "Jenkinsfile*") match at any depth; patterns with a "/" are matched against
+        the whole relpath with fnmatch semantics ("*" also crosses "/").
+        """
+        while pattern.startswith("**/"):
+            pattern = pattern[3:]
+        if "/" not in pattern:
+            # file-name pattern at any depth
+            return sorted(rel for name, rels in self.by_name.items() if fnmatchcase(name, pattern) for rel in rels)
+        return [rel for rel in self.all_paths if fnmatchcase(rel, pattern)]
+
+    def select(self, patterns: Iterable[str]) -> List[str]:
+        """Union of several globs, sorted."""
+        hits = set()
+        for patt in patterns:
+            hits.update(self.glob(patt))
+        return sorted(hits)
+
+    def extension(self, *exts: str) -> List[str]:
+        """Relpaths with any of the given extensions (".yml", ...), sorted."""
+        return sorted(rel for e in exts for rel in self.by_ext.get(e.lower(), []))
+
+    def category(self, name: str, classify: Optional[Callable[[Path], str]] = None) -> List[str]:
+        """Scan-view relpaths of a drift file_type category ("config", "ci", "build", ...)."""
+        if classify is None:
+            from .drift_v1 import _file_type as classify
+        cats = self._categories.get(classify)
+        if cats is None:
+            cats = {}
+            for rel in self.paths:
+                cats.setdefault(classify(Path(rel)), []).append(rel)
+            self._categories[classify] = cats
+        return list(cats.get(name, []))
+
+
+def get_repo_index(root: Path, workers: Optional[int] = None) -> RepoIndex:
+    """Index of root; built once per analysis run (always rebuilt outside a run)."""
+    memo = run_memo()
+    if memo is None:
+        return RepoIndex.build(root, workers)
+    key = ("repo_index", os.path.realpath(root))
+    index = memo.get(key)
+    if index is None:
+        index = memo[key] = RepoIndex.build(root, workers)
+    return index
@@ -0,0 +1,127 @@
+"""
+Analysis Session
+
+Everything one golden/candidate analysis needs, passed explicitly instead of
+through module globals: the two roots, the policy file (loaded once), the
+shared caches and per-analysis options. Analyses in different threads of one
+process each use their own session, so they never see each other's roots.
+
+Used as a context manager (or begin()/end()) a session also scopes the
+per-run file buffer and memo (caches.begin_file_blob_run); the run's buffer
+also counts the shared caches' hits and misses, so cache counters are
+reported per session and the process-wide counters are never reset.
+"""
+
+from __future__ import annotations
+
+import contextvars
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from .caches import (FileBlobStore, begin_file_blob_run, end_file_blob_run, get_file_blobs,
+                         get_fingerprint_cache, get_parse_cache, run_cache_stats)
+    from .bundle_io import BUNDLE_FORMAT
+except ImportError:  # executed as a script
+    from caches import (FileBlobStore, begin_file_blob_run, end_file_blob_run, get_file_blobs,
+                        get_fingerprint_cache, get_parse_cache, run_cache_stats)
+    from bundle_io import BUNDLE_FORMAT
+
+
+_COUNTERS = ("hits", "misses", "evictions")
+
+
+def _counter_sum(stats: Dict[str, Any], extra: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: (v + extra.get(k, 0) if k in _COUNTERS else v) for k, v in stats.items()}
+
+
+@dataclass
+class AnalysisSession:
+    """State of one analysis run (golden vs candidate)."""
+
+    golden_root: Path
+    candidate_root: Path
+    policies_path: Optional[Path] = None
+    # "ndjson" or "json" (see bundle_io)
+    bundle_format: str = BUNDLE_FORMAT
+    _policies: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False)
+    _blob_run: Optional[contextvars.Token] = field(default=None, init=False, repr=False)
+    _run_store: Optional[FileBlobStore] = field(default=None, init=False, repr=False)
+    # Counters of work done for this session in detector worker processes
+    _worker_stats: Dict[str, Dict[str, int]] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.golden_root = Path(self.golden_root)
+        self.candidate_root = Path(self.candidate_root)
+        if self.policies_path is not None:
+            self.policies_path = Path(self.policies_path)
+
+    @property
+    def roots(self) -> Tuple[Path, Path]:
+        """(candidate, golden): key lines are looked up in the candidate first."""
+        return self.candidate_root, self.golden_root
+
+    @property
+    def policies(self) -> Dict[str, Any]:
+        """Policy document, loaded on first use."""
+        if self._policies is None:
+            try:
+                from .drift_v1 import _policy_load
+            except ImportError:  # executed as a script
+                from drift_v1 import _policy_load
+            self._policies = _policy_load(self.policies_path)
+        return self._policies
+
+    def set_policies_path(self, path: Optional[Path]) -> None:
+        self.policies_path = Path(path) if path is not None else None
+        self._policies = None
+
+    # -- caches -------------------------------------------------------------
+    @property
+    def fingerprint_cache(self):
+        return get_fingerprint_cache()
+
+    @property
+    def parse_cache(self):
+        return get_parse_cache()
+
+    @property
+    def file_blobs(self):
+        return self._run_store if self._run_store is not None else get_file_blobs()
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Cache counters for bundle meta, including work done in detector worker
+        processes. Hits and misses are those recorded in this session's run
+        (inside begin()/end()), or in the caller's current run otherwise.
+        """
+        stats = run_cache_stats(self.file_blobs)
+        return {name: _counter_sum(s, self._worker_stats.get(name, {})) for name, s in stats.items()}
+
+    def add_worker_stats(self, stats: Dict[str, Dict[str, Any]]) -> None:
+        """Add the cache counters of one unit run in a worker process."""
+        for name, counters in stats.items():
+            total = self._worker_stats.setdefault(name, {})
+            for k in _COUNTERS:
+                total[k] = total.get(k, 0) + counters.get(k, 0)
+
+    # -- run scope ----------------------------------------------------------
+    def begin(self) -> "AnalysisSession":
+        """Start the session's run scope (fresh file buffer and memo)."""
+        if self._blob_run is None:
+            self._blob_run = begin_file_blob_run()
+            self._run_store = get_file_blobs()
+        return self
+
+    def end(self) -> None:
+        if self._blob_run is not None:
+            end_file_blob_run(self._blob_run)
+            self._blob_run = None
+            self._run_store = None
+
+    def __enter__(self) -> "AnalysisSession":
+        return self.begin()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end()
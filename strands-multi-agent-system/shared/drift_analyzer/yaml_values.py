@@ -0,0 +1,138 @@
+"""
+YAML Values
+
+Fast value parsing for config comparison. libyaml's C loader (PyYAML's
+CSafeLoader) builds plain dicts/lists with none of the comment and position
+bookkeeping of ruamel's round-trip loader, which is only needed to locate keys
+that actually drifted (drift_v1._line_index, run lazily per file).
+
+The loader resolves scalars like ruamel (YAML 1.2 core schema), so both tiers
+agree on every value: "yes"/"on" stay strings, "010" is 10, "1e3" is a float,
+"1:30" is a string. Mappings keep ruamel's key order (own keys, then merged
+keys) and duplicate keys are an error, as in ruamel.
+
+Configuration:
+    DRIFT_YAML_LOADER  "auto" (C loader if libyaml is available, else ruamel) or "ruamel"
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Any, Dict, Optional
+
+try:
+    import yaml
+    _Base = getattr(yaml, "CSafeLoader", None) or yaml.SafeLoader
+    _HAVE_LIBYAML = hasattr(yaml, "CSafeLoader")
+except Exception:
+    yaml = None
+    _Base = object
+    _HAVE_LIBYAML = False
+
+try:
+    from ruamel.yaml import YAML
+    _HAVE_RUAMEL = True
+except Exception:
+    _HAVE_RUAMEL = False
+
+YAML_LOADER = os.getenv("DRIFT_YAML_LOADER", "auto").lower()
+
+# Loader identity for parse-cache keys
+LOADER_NAME = ("libyaml" if _HAVE_LIBYAML else "pyyaml") if yaml and YAML_LOADER != "ruamel" else (
+    "ruamel" if _HAVE_RUAMEL else "pyyaml")
+
+_MERGE = "tag:yaml.org,2002:merge"
+
+# YAML 1.2 core schema as resolved by ruamel
+_RESOLVERS = [
+    ("tag:yaml.org,2002:bool", r"^(?:true|True|TRUE|false|False|FALSE)$", "tTfF"),
+    ("tag:yaml.org,2002:float", r"""^(?:
+         [-+]?(?:[0-9][0-9_]*)\.[0-9_]*(?:[eE][-+]?[0-9]+)?
+        |[-+]?(?:[0-9][0-9_]*)(?:[eE][-+]?[0-9]+)
+        |[-+]?\.[0-9_]+(?:[eE][-+][0-9]+)?
+        |[-+]?\.(?:inf|Inf|INF)
+        |\.(?:nan|NaN|NAN))$""", "-+0123456789."),
+    ("tag:yaml.org,2002:int", r"""^(?:[-+]?0b[0-1_]+
+        |[-+]?0o?[0-7_]+
+        |[-+]?[0-9_]+
+        |[-+]?0x[0-9a-fA-F_]+)$""", "-+0123456789"),
+    (_MERGE, r"^(?:<<)$", "<"),
+    ("tag:yaml.org,2002:null", r"^(?: ~ |null|Null|NULL | )$", "~nN"),
+    ("tag:yaml.org,2002:timestamp", r"""^(?:[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]
+        |[0-9][0-9][0-9][0-9] -[0-9][0-9]? -[0-9][0-9]?
+        (?:[Tt]|[ \t]+)[0-9][0-9]?
+        :[0-9][0-9] :[0-9][0-9] (?:\.[0-9]*)?
+        (?:[ \t]*(?:Z|[-+][0-9][0-9]?(?::[0-9][0-9])?))?)$""", "0123456789"),
+]
+
+
+class DuplicateKeyError(ValueError):
+    pass
+
+
+if yaml is not None:
+    class _ValuesLoader(_Base):
+        """Safe C loader with ruamel's (YAML 1.2) scalar resolution and mapping semantics."""
+
+        yaml_implicit_resolvers: Dict[Any, Any] = {}
+
+        def construct_yaml_int(self, node):
+            s = self.construct_scalar(node).replace("_", "")
+            sign = -1 if s[0] == "-" else 1
+            if s[0] in "+-":
+                s = s[1:]
+            if s.startswith("0b"): return sign * int(s[2:], 2)
+            if s.startswith("0x"): return sign * int(s[2:], 16)
+            if s.startswith("0o"): return sign * int(s[2:], 8)
+            return sign * int(s)
+
+        def construct_mapping(self, node, deep=False):
+            if not isinstance(node, yaml.MappingNode):
+                return super().construct_mapping(node, deep=deep)
+            out: Dict[Any, Any] = {}
+            merged = []
+            for key_node, value_node in node.value:
+                if key_node.tag == _MERGE:
+                    merged.extend(value_node.value if isinstance(value_node, yaml.SequenceNode) else [value_node])
+                    continue
+                key = self.construct_object(key_node, deep=True)
+                if key in out:
+                    raise DuplicateKeyError(f"duplicate key {key!r} (line {key_node.start_mark.line + 1})")
+                out[key] = self.construct_object(value_node, deep=deep)
+            for m in merged:  # earlier merge sources win, own keys win over all
+                for k, v in self.construct_mapping(m, deep=True).items():
+                    out.setdefault(k, v)
+            return out
+
+        def construct_yaml_map(self, node):
+            yield self.construct_mapping(node, deep=True)
+
+    for _tag, _regex, _first in _RESOLVERS:
+        # "" is where PyYAML looks up resolvers of empty scalars
+        _ValuesLoader.add_implicit_resolver(_tag, re.compile(_regex, re.X), list(_first) + ([""] if _tag.endswith(":null") else []))
+    _ValuesLoader.add_constructor("tag:yaml.org,2002:int", _ValuesLoader.construct_yaml_int)
+    _ValuesLoader.add_constructor("tag:yaml.org,2002:map", _ValuesLoader.construct_yaml_map)
+
+
+def load_values(txt: str) -> Optional[Any]:
+    """Values of a YAML document (no comments or positions); raises on invalid YAML."""
+    if yaml is not None and YAML_LOADER != "ruamel":
+        try:
+            return yaml.load(txt, Loader=_ValuesLoader)
+        except DuplicateKeyError:
+            raise
+        except Exception:
+            if not _HAVE_RUAMEL:
+                raise
+            # constructs libyaml rejects but ruamel accepts (e.g. complex keys)
+    if _HAVE_RUAMEL:
+        return YAML(typ="rt").load(txt)
+    return yaml.safe_load(txt)
+
+
+def load_roundtrip(txt: str) -> Optional[Any]:
+    """ruamel round-trip document (nodes carry .lc line/column), or None without ruamel."""
+    if not _HAVE_RUAMEL:
+        return None
+    return YAML(typ="rt").load(txt)
@@ -6,13 +6,19 @@ and manage Git operations for the drift detection system.
 """
 
 import os
+import queue
+import re
 import tempfile
 import shutil
+import subprocess
+import threading
+import time
 import uuid
 import fnmatch
+from contextlib import ExitStack
 from pathlib import Path
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import logging
 
 import git
@@ -29,6 +35,19 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Local-only ref namespace (in the mirror cache) holding config-only drift snapshots
+SNAPSHOT_REF_PREFIX = "refs/snapshots/"
+
+# Max delete refspecs per `git push --atomic` (keeps the command line bounded)
+GIT_PUSH_DELETE_CHUNK = int(os.getenv("GIT_PUSH_DELETE_CHUNK", "200"))
+
+# Seconds a cached `git ls-remote` listing stays valid
+GIT_REF_CACHE_TTL = float(os.getenv("GIT_REF_CACHE_TTL", "30"))
+
+# `git cat-file --batch` processes per repository, and requests in flight per process
+GIT_CAT_FILE_WORKERS = int(os.getenv("GIT_CAT_FILE_WORKERS", "4"))
+GIT_CAT_FILE_WINDOW = int(os.getenv("GIT_CAT_FILE_WINDOW", "256"))
+
 
 def log_and_print(message: str, level: str = "info"):
     """
@@ -97,9 +116,284 @@ def setup_git_auth(repo_url: str, gitlab_token: Optional[str] = None) -> str:
     return repo_url
 
 
+class RefCache:
+    """
+    TTL cache of remote branch heads, filled by one `git ls-remote --heads` per repository.
+
+    Concurrent lookups for the same repository share a single ls-remote call.
+    Callers that push or delete refs must call invalidate() afterwards; a listing
+    that was in flight during an invalidate() is returned but not cached.
+    """
+
+    def __init__(self, ttl: float = GIT_REF_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._repo_locks: Dict[str, threading.Lock] = {}
+        self._entries: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        # Bumped by invalidate(): per repository, and for all repositories
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+
+    def _generation(self, key: str) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(key, 0)
+
+    @staticmethod
+    def _key(repo_url: str) -> str:
+        return repo_url.rstrip('/')
+
+    def _cached(self, key: str) -> Optional[Dict[str, str]]:
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    def heads(self, repo_url: str, gitlab_token: Optional[str] = None, refresh: bool = False) -> Dict[str, str]:
+        """
+        Return {branch_name: commit_sha} for all remote branches.
+
+        Args:
+            repo_url: Repository URL
+            gitlab_token: Optional GitLab token for authentication
+            refresh: Ignore any cached listing
+
+        Returns:
+            Mapping of branch name to commit SHA
+        """
+        key = self._key(repo_url)
+        with self._lock:
+            repo_lock = self._repo_locks.setdefault(key, threading.Lock())
+        with repo_lock:
+            heads = None if refresh else self._cached(key)
+            if heads is not None:
+                return heads
+
+            with self._lock:
+                generation = self._generation(key)
+            auth_url = setup_git_auth(repo_url, gitlab_token)
+            output = git.cmd.Git().ls_remote('--heads', auth_url)
+            heads = {}
+            for line in output.splitlines():
+                if '\t' not in line:
+                    continue
+                sha, ref = line.split('\t', 1)
+                if ref.startswith('refs/heads/'):
+                    heads[ref[len('refs/heads/'):]] = sha
+            with self._lock:
+                if self._generation(key) == generation:
+                    self._entries[key] = (time.monotonic(), heads)
+            return heads
+
+    def invalidate(self, repo_url: Optional[str] = None) -> None:
+        """Drop the cached listing for one repository (or all repositories)."""
+        with self._lock:
+            if repo_url is None:
+                self._epoch += 1
+                self._entries.clear()
+            else:
+                key = self._key(repo_url)
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._entries.pop(key, None)
+
+
+_ref_cache = RefCache()
+
+
+def get_ref_cache() -> RefCache:
+    """Return the process-wide remote ref cache."""
+    return _ref_cache
+
+
+def _check_object_names(names: List[str]) -> None:
+    """A newline would end the request early and desync the batch protocol."""
+    for name in names:
+        if "\n" in name:
+            raise ValueError(f"object name contains a newline: {name!r}")
+
+
+class CatFileBatch:
+    """One long-lived `git cat-file --batch` process (not thread-safe; see CatFileBatchPool)."""
+
+    def __init__(self, git_dir: str):
+        self.git_dir = str(git_dir)
+        self._proc = subprocess.Popen(
+            ["git", "--git-dir", self.git_dir, "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def read_many(self, names: List[str], window: int = GIT_CAT_FILE_WINDOW) -> List[Optional[bytes]]:
+        """
+        Read object contents for OIDs (or "<rev>:<path>" names), in order.
+
+        Requests are pipelined: up to `window` names are written before their
+        responses are read, which keeps both pipes far below their buffer
+        limits. Missing objects come back as None.
+        """
+        _check_object_names(names)
+        results: List[Optional[bytes]] = []
+        stdin, stdout = self._proc.stdin, self._proc.stdout
+        for start in range(0, len(names), window):
+            chunk = names[start:start + window]
+            stdin.write("".join(f"{name}\n" for name in chunk).encode("utf-8", errors="surrogateescape"))
+            stdin.flush()
+            for _ in chunk:
+                header = stdout.readline()
+                if not header:
+                    raise BrokenPipeError("git cat-file --batch exited")
+                # the name is echoed back and may contain spaces: match the status suffix
+                if header.endswith((b" missing\n", b" ambiguous\n")):
+                    results.append(None)
+                    continue
+                parts = header.rsplit(None, 2)  # "<oid> <type> <size>"
+                if len(parts) != 3 or not parts[2].isdigit():
+                    raise ValueError(f"unexpected git cat-file --batch header {header!r}")
+                size = int(parts[2])
+                data = stdout.read(size)
+                stdout.read(1)  # trailing LF
+                if len(data) != size:
+                    raise BrokenPipeError("git cat-file --batch returned a short read")
+                results.append(data)
+        return results
+
+    def close(self) -> None:
+        try:
+            self._proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            self._proc.wait(timeout=5)
+        except Exception:
+            self._proc.kill()
+
+
+class CatFileBatchPool:
+    """
+    Thread-safe pool of `git cat-file --batch` readers for one repository.
+
+    Each call borrows one reader, so concurrent callers never interleave on a
+    pipe. A reader that dies or desyncs is replaced and the call is retried
+    once on a fresh process.
+
+    Note: in a partial (blob:none) mirror, prefetch blobs first; missing blobs
+    would otherwise be fetched lazily one by one.
+    """
+
+    def __init__(self, git_dir: str, max_workers: int = GIT_CAT_FILE_WORKERS):
+        self.git_dir = str(git_dir)
+        self.max_workers = max(1, max_workers)
+        self._lock = threading.Lock()
+        self._idle: "queue.LifoQueue[CatFileBatch]" = queue.LifoQueue()
+        self._workers: List[CatFileBatch] = []
+        self._closed = False
+
+    def _acquire(self) -> CatFileBatch:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    if self._closed:
+                        self._idle.put(None)  # wake the next waiter, it fails the same way
+                        raise RuntimeError(f"cat-file pool for {self.git_dir} is closed")
+                    if len(self._workers) < self.max_workers:
+                        worker = CatFileBatch(self.git_dir)
+                        self._workers.append(worker)
+                        return worker
+                worker = self._idle.get()
+            if worker is None:
+                # A worker was discarded (or the pool closed): look again
+                continue
+            if worker.alive:
+                return worker
+            # Died while idle: replace it
+            self._discard(worker)
+
+    def _release(self, worker: CatFileBatch) -> None:
+        if self._closed:
+            worker.close()
+        else:
+            self._idle.put(worker)
+
+    def _discard(self, worker: CatFileBatch) -> None:
+        worker.close()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        # Its slot is free now; a caller waiting for an idle worker would otherwise never wake
+        self._idle.put(None)
+
+    def read_many(self, names: List[str]) -> List[Optional[bytes]]:
+        """Read object contents for many OIDs / "<rev>:<path>" names (None if missing)."""
+        if not names:
+            return []
+        _check_object_names(names)  # before borrowing: a bad name is not a worker failure
+        last_error: Optional[Exception] = None
+        for _attempt in range(2):
+            worker = self._acquire()
+            try:
+                results = worker.read_many(names)
+            except (OSError, ValueError) as e:
+                self._discard(worker)
+                logger.warning(f"cat-file worker for {self.git_dir} failed ({e}), restarting")
+                last_error = e
+                continue
+            except BaseException:
+                # Interrupted mid-response: the pipe is out of sync, never reuse it
+                self._discard(worker)
+                raise
+            self._release(worker)
+            return results
+        raise last_error
+
+    def read_blob(self, name: str) -> Optional[bytes]:
+        """Read a single object (None if missing)."""
+        return self.read_many([name])[0]
+
+    def read_blobs(self, oids: List[str]) -> Dict[str, Optional[bytes]]:
+        """Read many objects, returned as {oid: content}."""
+        unique = list(dict.fromkeys(oids))
+        return dict(zip(unique, self.read_many(unique)))
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+        self._idle.put(None)
+
+
+_cat_file_pools: Dict[str, CatFileBatchPool] = {}
+_cat_file_pools_lock = threading.Lock()
+
+
+def get_cat_file_pool(git_dir: str) -> CatFileBatchPool:
+    """Return the process-wide cat-file reader pool for a git directory."""
+    key = os.path.realpath(str(git_dir))
+    with _cat_file_pools_lock:
+        pool = _cat_file_pools.get(key)
+        if pool is None:
+            pool = CatFileBatchPool(key)
+            _cat_file_pools[key] = pool
+        return pool
+
+
+def close_cat_file_pool(git_dir: str) -> None:
+    """Stop the reader processes of a git directory (e.g., before deleting it)."""
+    with _cat_file_pools_lock:
+        pool = _cat_file_pools.pop(os.path.realpath(str(git_dir)), None)
+    if pool:
+        pool.close()
+
+
 def check_branch_exists(repo_url: str, branch_name: str, gitlab_token: Optional[str] = None) -> bool:
     """
     Check if a branch exists on the remote repository.
+
+    Served from the ref cache (one `git ls-remote` per repository and TTL).
     
     Args:
         repo_url: Repository URL
@@ -109,24 +403,9 @@ def check_branch_exists(repo_url: str, branch_name: str, gitlab_token: Optional[
     Returns:
         True if branch exists, False otherwise
     """
-    temp_dir = None
     try:
-        # Create temporary directory for checking
-        temp_dir = tempfile.mkdtemp(prefix="git_check_")
-        
-        # Setup authentication
-        auth_url = setup_git_auth(repo_url, gitlab_token)
-        
-        # Clone with minimal depth (just to list refs)
         logger.info(f"Checking if branch {branch_name} exists in {repo_url}")
-        repo = git.Repo.clone_from(auth_url, temp_dir, depth=1, single_branch=False, no_checkout=True)
-        
-        # Fetch remote refs
-        repo.remotes.origin.fetch()
-        
-        # Check if branch exists in remote
-        remote_branches = [ref.name for ref in repo.remotes.origin.refs]
-        branch_exists = f"origin/{branch_name}" in remote_branches
+        branch_exists = branch_name in get_ref_cache().heads(repo_url, gitlab_token)
         
         logger.info(f"Branch {branch_name} exists: {branch_exists}")
         return branch_exists
@@ -137,13 +416,6 @@ def check_branch_exists(repo_url: str, branch_name: str, gitlab_token: Optional[
     except Exception as e:
         logger.error(f"Error checking branch {branch_name}: {e}")
         return False
-    finally:
-        # Cleanup temporary directory
-        if temp_dir and os.path.exists(temp_dir):
-            try:
-                shutil.rmtree(temp_dir)
-            except Exception as e:
-                logger.warning(f"Failed to cleanup temp directory {temp_dir}: {e}")
 
 
 def create_branch_from_main(
@@ -185,6 +457,7 @@ def create_branch_from_main(
         # Push the new branch to remote
         logger.info(f"Pushing branch {new_branch_name} to remote")
         repo.git.push('--set-upstream', 'origin', new_branch_name)
+        get_ref_cache().invalidate(repo_url)
         
         logger.info(f"✅ Successfully created and pushed branch {new_branch_name}")
         return True
@@ -205,6 +478,122 @@ def create_branch_from_main(
                 logger.warning(f"Failed to cleanup temp directory {temp_dir}: {e}")
 
 
+def compile_path_matcher(patterns: List[str]) -> Callable[[str], bool]:
+    """
+    Compile config path patterns into a single matcher.
+
+    Same semantics as the per-pattern fnmatch loop: a path matches if either
+    the full path or its basename matches any pattern.
+
+    Args:
+        patterns: Glob patterns (e.g., ["*.yml", "config/**"])
+
+    Returns:
+        Function taking a repo-relative path and returning True on match
+    """
+    if not patterns:
+        return lambda path: False
+    regex = re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns))
+
+    def match(path: str) -> bool:
+        return bool(regex.match(path) or regex.match(path.rsplit('/', 1)[-1]))
+    return match
+
+
+def _run_git(git_dir: str, args: List[str], input_data: Optional[bytes] = None,
+             env: Optional[Dict[str, str]] = None) -> str:
+    """Run one git command against git_dir, optionally feeding stdin. Raises GitCommandError."""
+    proc = subprocess.run(
+        ["git", "--git-dir", str(git_dir), *args],
+        input=input_data, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        env={**os.environ, **(env or {})}, check=False,
+    )
+    if proc.returncode != 0:
+        raise GitCommandError(["git", args[0]], proc.returncode, proc.stderr)
+    return proc.stdout.decode("utf-8", errors="surrogateescape")
+
+
+def commit_tree(git_dir: str, tree_sha: str, message: str, parents: Optional[List[str]] = None,
+                date: Optional[str] = None) -> str:
+    """
+    Create a commit object for a tree without touching any index or working tree.
+
+    Author/committer come from GIT_USER_NAME / GIT_USER_EMAIL when set,
+    otherwise from git config. Passing a fixed date makes the commit SHA
+    reproducible for the same tree, message and identity.
+
+    Returns:
+        The new commit SHA
+    """
+    env = {}
+    if date:
+        env.update(GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+    name, email = os.getenv('GIT_USER_NAME'), os.getenv('GIT_USER_EMAIL')
+    if name and email:
+        env.update(GIT_AUTHOR_NAME=name, GIT_COMMITTER_NAME=name,
+                   GIT_AUTHOR_EMAIL=email, GIT_COMMITTER_EMAIL=email)
+    args = ["commit-tree", tree_sha]
+    for parent in parents or []:
+        args += ["-p", parent]
+    return _run_git(git_dir, args + ["-m", message], env=env).strip()
+
+
+def build_config_only_tree(git_dir: str, source_rev: str, config_paths: List[str]) -> Tuple[Optional[str], int]:
+    """
+    Build a tree holding only the config files of source_rev, from git objects.
+
+    One `ls-tree -r` read, one compiled matcher, and a single
+    `update-index --index-info` fed over stdin into a private index, followed
+    by `write-tree`. Nothing is checked out.
+
+    Args:
+        git_dir: Path to a (bare or non-bare) git directory containing source_rev
+        source_rev: Source branch/revision
+        config_paths: Config file patterns to keep
+
+    Returns:
+        (tree SHA, number of files) - tree SHA is None if no file matched
+    """
+    matches = compile_path_matcher(config_paths)
+    index_info = []
+    for entry in _run_git(git_dir, ["ls-tree", "-r", "-z", source_rev]).split("\0"):
+        if not entry:
+            continue
+        meta, path = entry.split("\t", 1)
+        mode, obj_type, obj_hash = meta.split()
+        # Skip .git directory files - these are internal Git files, not configuration files
+        if obj_type != "blob" or path.startswith('.git/') or not matches(path):
+            continue
+        index_info.append(f"{mode} {obj_hash}\t{path}\0")
+
+    if not index_info:
+        return None, 0
+
+    index_dir = tempfile.mkdtemp(prefix="git_config_index_")
+    try:
+        env = {"GIT_INDEX_FILE": os.path.join(index_dir, "index")}
+        _run_git(git_dir, ["update-index", "--add", "-z", "--index-info"],
+                 input_data="".join(index_info).encode("utf-8", errors="surrogateescape"), env=env)
+        tree_sha = _run_git(git_dir, ["write-tree"], env=env).strip()
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+    return tree_sha, len(index_info)
+
+
+def _lease_mirror(stack: ExitStack, repo_url: str, gitlab_token: Optional[str] = None):
+    """
+    Lease the cached mirror for repo_url on stack, or return None when the
+    repository is fetched shallow (judged too large or too deep to mirror);
+    callers then use a temporary shallow fetch or clone instead.
+    """
+    from shared.repo_cache import choose_fetch_strategy, get_repo_cache
+    strategy = choose_fetch_strategy(repo_url, gitlab_token)
+    if strategy == "shallow":
+        log_and_print("📦 Fetch strategy: shallow (no mirror)")
+        return None
+    return stack.enter_context(get_repo_cache().lease(repo_url, gitlab_token, partial=strategy == "partial"))
+
+
 def create_config_only_branch(
     repo_url: str,
     main_branch: str,
@@ -213,8 +602,13 @@ def create_config_only_branch(
     gitlab_token: Optional[str] = None
 ) -> bool:
     """
-    Create a new branch containing ONLY configuration files (FAST - sparse checkout).
-    This is much faster than cloning the entire repository.
+    Create a new branch containing ONLY configuration files (FAST - no checkout).
+
+    The orphan commit is built directly from git objects in the cached bare
+    mirror (see build_config_only_tree) and pushed as refs/heads/<new_branch_name>.
+    For repositories fetched shallow (see choose_fetch_strategy), or when the
+    mirror cache is unavailable, a shallow fetch into a temporary bare
+    repository is used instead.
     
     Args:
         repo_url: Repository URL
@@ -228,156 +622,52 @@ def create_config_only_branch(
     """
     temp_dir = None
     try:
-        # Create temporary directory
-        temp_dir = tempfile.mkdtemp(prefix="git_config_branch_")
         log_and_print(f"🌿 Creating config-only branch: {new_branch_name}")
         log_and_print(f"🎯 Source branch: {main_branch}")
         
         # Setup authentication
         auth_url = setup_git_auth(repo_url, gitlab_token)
-        
-        # Initialize empty repo
-        log_and_print(f"Initializing Git repository...")
-        repo = git.Repo.init(temp_dir)
-        
-        # Add remote
-        log_and_print(f"Adding remote origin...")
-        origin = repo.create_remote('origin', auth_url)
-        
-        # Enable sparse checkout BEFORE fetching
-        log_and_print(f"Configuring sparse-checkout...")
-        with repo.config_writer() as config:
-            config.set_value('core', 'sparseCheckout', 'true')
-            config.set_value('core', 'sparseCheckoutCone', 'false')  # Use non-cone mode for patterns
-        
-        # Write sparse-checkout patterns
-        sparse_checkout_file = Path(temp_dir) / '.git' / 'info' / 'sparse-checkout'
-        sparse_checkout_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(sparse_checkout_file, 'w') as f:
-            # Explicitly exclude .git directory
-            f.write("!.git/\n")
-            for path in config_paths:
-                f.write(f"{path}\n")
-        
-        # Fetch only the main branch with depth=1 (shallow clone) and filter
-        log_and_print(f"Fetching {main_branch} with config filtering...")
-        origin.fetch(main_branch, depth=1)
-        
-        # Checkout the main branch (sparse-checkout will apply here)
-        log_and_print(f"Checking out {main_branch}...")
-        repo.git.checkout(f'origin/{main_branch}')
-        
-        # Count files in working directory
-        checked_out_files = []
-        for root, dirs, files in os.walk(temp_dir):
-            # Skip .git directory
-            if '.git' in root:
-                continue
-            for file in files:
-                rel_path = os.path.relpath(os.path.join(root, file), temp_dir)
-                checked_out_files.append(rel_path)
-        
-        log_and_print(f"Filtered {len(checked_out_files)} config files")
-        
-        # Create orphan branch with only config files
-        log_and_print(f"Creating orphan branch with config files only...")
-        
-        # Create an orphan branch (no parent commits)
-        repo.git.checkout('--orphan', new_branch_name)
-        
-        # Clear the index completely to remove any references to files from the original branch
-        repo.git.rm('-rf', '--cached', '.')
-        
-        # Use git read-tree to explicitly build tree with config files only
-        try:
-            # Start with empty index
-            repo.git.read_tree('--empty')
-            
-            # Get list of all files in the original branch
-            ls_tree_output = repo.git.ls_tree('-r', '--name-only', f'origin/{main_branch}')
-            all_files_in_original = ls_tree_output.strip().split('\n') if ls_tree_output.strip() else []
-            
-            # Filter files using our config patterns
-            import fnmatch
-            filtered_files = []
-            
-            for file_path in all_files_in_original:
-                # Skip .git directory files - these are internal Git files, not configuration files
-                if file_path.startswith('.git/'):
-                    continue
-                    
-                for pattern in config_paths:
-                    # Support both full path matching and filename matching
-                    if (fnmatch.fnmatch(file_path, pattern) or 
-                        fnmatch.fnmatch(os.path.basename(file_path), pattern)):
-                        filtered_files.append(file_path)
-                        break
-            
-            # Add each filtered file to the index from the original tree
-            files_actually_added = 0
-            for file_path in filtered_files:
-                try:
-                    # Get the full object info for this file from the original tree
-                    ls_tree_result = repo.git.ls_tree(f'origin/{main_branch}', '--', file_path)
-                    if ls_tree_result.strip():
-                        # Parse the ls-tree output: mode, type, hash, filename
-                        parts = ls_tree_result.strip().split(None, 3)  # Split on whitespace, max 4 parts
-                        if len(parts) >= 3:
-                            mode = parts[0]
-                            obj_hash = parts[2]
-                            
-                            # Add this file to the index with its original content
-                            repo.git.update_index('--add', '--cacheinfo', f'{mode},{obj_hash},{file_path}')
-                            files_actually_added += 1
-                            
-                except Exception as e:
-                    log_and_print(f"⚠️ Could not add {file_path} to index: {e}", "warning")
-                    # Continue with other files
-            
-        except Exception as e:
-            log_and_print(f"⚠️ Tree approach failed, using fallback method: {e}", "warning")
-            
-            # Fallback: Add files from working directory individually
-            files_added = 0
-            for file_path in checked_out_files:
-                full_path = Path(temp_dir) / file_path
-                if full_path.exists() and full_path.is_file():
-                    try:
-                        repo.git.add(file_path)
-                        files_added += 1
-                    except Exception as e:
-                        log_and_print(f"⚠️ Warning: Could not add {file_path}: {e}", "warning")
-            
-            files_actually_added = files_added
-        
-        # Verify staged files
-        try:
-            staged_files = repo.git.diff('--cached', '--name-only').strip().split('\n')
-            staged_files = [f for f in staged_files if f.strip()]  # Remove empty strings
-            
-            # Basic validation
-            expected_count = len(filtered_files) if 'filtered_files' in locals() else len(checked_out_files)
-            
-            if len(staged_files) > expected_count * 3:  # Flag major issues
-                log_and_print(f"🚨 WARNING: Staged {len(staged_files)} files but expected ~{expected_count}", "error")
-                log_and_print(f"The branch may contain non-config files!", "error")
-            else:
-                log_and_print(f"Staged {len(staged_files)} config files for commit")
-                
-        except Exception as e:
-            log_and_print(f"⚠️ Could not verify staged files: {e}", "warning")
-        
-        # Create commit with only config files
-        log_and_print(f"Creating commit and pushing to remote...")
-        commit_message = f"Config-only snapshot from {main_branch}\n\nContains only configuration files ({files_actually_added} files):\n- YAML configs\n- Properties files\n- Build configs\n- Container configs"
-        repo.git.commit('-m', commit_message)
-        
-        # Push the new branch to remote
-        repo.git.push('--set-upstream', 'origin', new_branch_name)
-        
-        log_and_print(f"✅ Config-only branch {new_branch_name} created with {files_actually_added} files")
-        return True
+
+        def build_and_push(git_dir: str, source_rev: str, mirror=None) -> Optional[str]:
+            tree_sha, files_added = build_config_only_tree(git_dir, source_rev, config_paths)
+            if not tree_sha:
+                log_and_print(f"❌ No files in {main_branch} match the config patterns", "error")
+                return None
+            log_and_print(f"Filtered {files_added} config files")
+
+            commit_message = f"Config-only snapshot from {main_branch}\n\nContains only configuration files ({files_added} files):\n- YAML configs\n- Properties files\n- Build configs\n- Container configs"
+            commit_sha = commit_tree(git_dir, tree_sha, commit_message)
+            if mirror is not None:
+                # Partial mirrors need the config blobs locally before they can be pushed
+                mirror.prefetch_blobs(commit_sha)
+
+            log_and_print(f"Pushing config-only commit to remote...")
+            _run_git(git_dir, ["push", auth_url, f"{commit_sha}:refs/heads/{new_branch_name}"])
+            get_ref_cache().invalidate(repo_url)
+            log_and_print(f"✅ Config-only branch {new_branch_name} created with {files_added} files")
+            return commit_sha
+
+        with ExitStack() as stack:
+            try:
+                mirror = _lease_mirror(stack, repo_url, gitlab_token)
+            except Exception as e:
+                mirror = None
+                log_and_print(f"⚠️ Mirror cache unavailable, using a temporary shallow fetch: {e}", "warning")
+
+            if mirror is not None:
+                commit_sha = build_and_push(str(mirror.path), mirror.resolve(main_branch), mirror)
+                if commit_sha:
+                    # Keep the mirror in step with what was just pushed
+                    _run_git(str(mirror.path), ["update-ref", f"refs/heads/{new_branch_name}", commit_sha])
+                return commit_sha is not None
+
+        # Fallback: shallow fetch of the source branch into a temporary bare repository
+        temp_dir = tempfile.mkdtemp(prefix="git_config_branch_")
+        repo = git.Repo.init(temp_dir, bare=True)
+        log_and_print(f"Fetching {main_branch} (depth=1)...")
+        repo.git.fetch('--depth=1', '--no-tags', auth_url,
+                       f'+refs/heads/{main_branch}:refs/remotes/origin/{main_branch}')
+        return build_and_push(repo.git_dir, f'refs/remotes/origin/{main_branch}') is not None
         
     except GitCommandError as e:
         log_and_print(f"❌ Git error creating config-only branch {new_branch_name}: {e}", "error")
@@ -394,6 +684,199 @@ def create_config_only_branch(
                 log_and_print(f"⚠️ Failed to cleanup temp directory: {e}", "warning")
 
 
+def _snapshot_message(main_branch: str, files_count: int) -> str:
+    return f"Config-only snapshot from {main_branch}\n\nContains only configuration files ({files_count} files)"
+
+
+def create_config_only_snapshot(
+    repo_url: str,
+    main_branch: str,
+    snapshot_name: str,
+    config_paths: List[str],
+    gitlab_token: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Build a config-only drift snapshot of main_branch locally, without pushing.
+
+    The commit lives only in the cached bare mirror under
+    refs/snapshots/<snapshot_name>. It can be pushed later as a real branch
+    with publish_snapshot_branch (e.g., when someone certifies from it).
+
+    Args:
+        repo_url: Repository URL
+        main_branch: Source branch name (e.g., "main", "master")
+        snapshot_name: Name of the snapshot (also the branch name if published)
+        config_paths: List of config file paths/patterns to include
+        gitlab_token: Optional GitLab token for authentication
+
+    Returns:
+        Snapshot metadata dict (name, ref, commit, source_commit, source_branch,
+        files, created_at, pushed) or None on failure
+    """
+    try:
+        from shared.repo_cache import get_repo_cache
+        log_and_print(f"📸 Creating local config-only snapshot: {snapshot_name}")
+        with get_repo_cache().lease(repo_url, gitlab_token) as mirror:
+            git_dir = str(mirror.path)
+            source_commit = mirror.resolve(main_branch)
+            tree_sha, files_count = build_config_only_tree(git_dir, source_commit, config_paths)
+            if not tree_sha:
+                log_and_print(f"❌ No files in {main_branch} match the config patterns", "error")
+                return None
+
+            created_at = datetime.now().astimezone().isoformat(timespec="seconds")
+            commit_sha = commit_tree(git_dir, tree_sha, _snapshot_message(main_branch, files_count),
+                                     date=created_at)
+            ref = f"{SNAPSHOT_REF_PREFIX}{snapshot_name}"
+            _run_git(git_dir, ["update-ref", ref, commit_sha])
+
+        log_and_print(f"✅ Snapshot {snapshot_name} at {commit_sha[:12]} ({files_count} files, source {source_commit[:12]})")
+        return {
+            "name": snapshot_name,
+            "ref": ref,
+            "commit": commit_sha,
+            "source_commit": source_commit,
+            "source_branch": main_branch,
+            "config_paths": list(config_paths),
+            "files": files_count,
+            "created_at": created_at,
+            "pushed": False,
+        }
+    except Exception as e:
+        log_and_print(f"❌ Error creating config-only snapshot {snapshot_name}: {e}", "error")
+        return None
+
+
+def publish_snapshot_branch(
+    repo_url: str,
+    snapshot: Dict[str, Any],
+    gitlab_token: Optional[str] = None
+) -> bool:
+    """
+    Push a local drift snapshot to the remote as refs/heads/<snapshot name>.
+
+    If the snapshot commit is no longer in the mirror (e.g., the mirror was
+    evicted), it is rebuilt from its source commit; the fixed commit date keeps
+    the SHA identical.
+
+    Args:
+        repo_url: Repository URL
+        snapshot: Snapshot metadata as returned by create_config_only_snapshot
+        gitlab_token: Optional GitLab token for authentication
+
+    Returns:
+        True if the branch exists on the remote afterwards, False otherwise
+    """
+    branch_name = snapshot["name"]
+    try:
+        from shared.repo_cache import get_repo_cache
+        auth_url = setup_git_auth(repo_url, gitlab_token)
+        with get_repo_cache().lease(repo_url, gitlab_token) as mirror:
+            git_dir = str(mirror.path)
+            commit_sha = snapshot["commit"]
+            try:
+                _run_git(git_dir, ["cat-file", "-e", f"{commit_sha}^{{commit}}"])
+            except GitCommandError:
+                log_and_print(f"♻️ Rebuilding snapshot {branch_name} from {snapshot['source_commit'][:12]}")
+                tree_sha, files_count = build_config_only_tree(git_dir, snapshot["source_commit"],
+                                                               snapshot["config_paths"])
+                if not tree_sha:
+                    raise ValueError(f"Snapshot {branch_name} could not be rebuilt")
+                commit_sha = commit_tree(git_dir, tree_sha,
+                                         _snapshot_message(snapshot["source_branch"], files_count),
+                                         date=snapshot["created_at"])
+                _run_git(git_dir, ["update-ref", snapshot["ref"], commit_sha])
+
+            mirror.prefetch_blobs(commit_sha)
+            log_and_print(f"📤 Publishing snapshot {branch_name} ({commit_sha[:12]}) as a remote branch...")
+            _run_git(git_dir, ["push", auth_url, f"{commit_sha}:refs/heads/{branch_name}"])
+            _run_git(git_dir, ["update-ref", f"refs/heads/{branch_name}", commit_sha])
+        get_ref_cache().invalidate(repo_url)
+        log_and_print(f"✅ Snapshot branch {branch_name} pushed")
+        return True
+    except Exception as e:
+        log_and_print(f"❌ Error publishing snapshot branch {branch_name}: {e}", "error")
+        return False
+
+
+def clone_branch_worktree(
+    auth_url: str,
+    dest: str,
+    branch: str,
+    strategy: str = "shallow",
+    config_paths: Optional[List[str]] = None
+) -> git.Repo:
+    """
+    Clone one branch into a working directory using an acquisition strategy.
+
+    - partial: `--filter=blob:none --no-checkout`, non-cone sparse-checkout of
+      config_paths, then checkout; only the config blobs are fetched
+    - anything else: depth=1 clone of the branch
+
+    Args:
+        auth_url: Authenticated repository URL
+        dest: Target directory
+        branch: Branch to check out
+        strategy: "partial", "shallow" or "mirror"
+        config_paths: Sparse-checkout patterns (required for partial clones)
+
+    Returns:
+        The cloned repository
+    """
+    if strategy == "partial" and config_paths:
+        repo = git.Repo.clone_from(auth_url, dest, branch=branch, filter="blob:none", no_checkout=True)
+        repo.git.sparse_checkout('set', '--no-cone', *config_paths)
+        repo.git.checkout('-f', branch)
+        return repo
+    return git.Repo.clone_from(auth_url, dest, branch=branch, depth=1)
+
+
+def build_selective_golden_tree(
+    git_dir: str,
+    golden_rev: str,
+    drift_rev: str,
+    approved_files: List[str]
+) -> Tuple[str, List[str], List[str]]:
+    """
+    Build the new golden tree from object IDs: the old golden tree with the
+    approved paths swapped to their drift blob OIDs.
+
+    Args:
+        git_dir: Git directory holding both revisions
+        golden_rev: Old golden commit
+        drift_rev: Drift commit (source of approved files)
+        approved_files: Paths to take from drift
+
+    Returns:
+        (tree SHA, paths applied, approved paths missing from drift)
+    """
+    wanted = set(approved_files)
+    drift_entries = {}
+    if wanted:
+        listing = _run_git(git_dir, ["ls-tree", "-r", "-z", drift_rev, "--", *sorted(wanted)])
+        for entry in listing.split("\0"):
+            if not entry:
+                continue
+            meta, path = entry.split("\t", 1)
+            mode, obj_type, obj_hash = meta.split()
+            if obj_type == "blob" and path in wanted:
+                drift_entries[path] = f"{mode} {obj_hash}\t{path}\0"
+    missing = [p for p in approved_files if p not in drift_entries]
+
+    index_dir = tempfile.mkdtemp(prefix="git_selective_index_")
+    try:
+        env = {"GIT_INDEX_FILE": os.path.join(index_dir, "index")}
+        _run_git(git_dir, ["read-tree", golden_rev], env=env)
+        if drift_entries:
+            _run_git(git_dir, ["update-index", "--add", "-z", "--index-info"],
+                     input_data="".join(drift_entries.values()).encode("utf-8", errors="surrogateescape"),
+                     env=env)
+        tree_sha = _run_git(git_dir, ["write-tree"], env=env).strip()
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+    return tree_sha, sorted(drift_entries), missing
+
+
 def create_selective_golden_branch(
     repo_url: str,
     old_golden_branch: str,
@@ -406,11 +889,14 @@ def create_selective_golden_branch(
     """
     Create a new golden branch by merging old golden branch with selected files from drift branch.
     
-    Workflow:
-    1. Clone old golden branch as base
-    2. For each approved file: Copy from drift branch (overwrite)
-    3. For each rejected file: Keep from old golden branch (no change)
-    4. Commit and push as new golden branch
+    Workflow (tree surgery in the cached mirror, no clones):
+    1. Read the old golden tree into a private index
+    2. For each approved file: Point the entry at the drift blob OID
+    3. For each rejected file: Keep the old golden entry (no change)
+    4. write-tree + commit-tree, push only the new ref
+    
+    Clones both branches instead when the repository is fetched shallow or
+    the mirror cache is unavailable.
     
     Args:
         repo_url: Repository URL
@@ -424,27 +910,94 @@ def create_selective_golden_branch(
     Returns:
         True if successful, False otherwise
     """
+    log_and_print(f"🔄 Creating selective golden branch: {new_branch_name}")
+    log_and_print(f"📦 Old Golden: {old_golden_branch}")
+    log_and_print(f"📦 Drift: {drift_branch}")
+    log_and_print(f"✅ Approved Files: {len(approved_files)}")
+    
+    with ExitStack() as stack:
+        try:
+            # None in shallow mode: certify via shallow clones without mirroring
+            mirror = _lease_mirror(stack, repo_url, gitlab_token)
+            if mirror is not None:
+                git_dir = str(mirror.path)
+                golden_rev = mirror.resolve(old_golden_branch)
+                try:
+                    drift_rev = mirror.resolve(drift_branch)
+                except GitCommandError:
+                    # Local-only drift snapshot
+                    drift_rev = mirror.resolve(f"{SNAPSHOT_REF_PREFIX}{drift_branch}")
+        except Exception as e:
+            log_and_print(f"⚠️ Mirror cache unavailable, certifying via clones: {e}", "warning")
+            mirror = None
+
+        if mirror is not None:
+            try:
+                tree_sha, applied, missing = build_selective_golden_tree(git_dir, golden_rev, drift_rev, approved_files)
+                for file_path in missing:
+                    log_and_print(f"⚠️ Warning: {file_path} not found in drift branch", "warning")
+                log_and_print(f"✅ Took {len(applied)} files from drift, rest kept from golden base")
+
+                commit_message = (
+                    f"Selective certification: {new_branch_name}\n\n"
+                    f"Base: {old_golden_branch}\n"
+                    f"Accepted {len(applied)} files from drift branch {drift_branch}\n"
+                    f"Rejected files kept from old golden branch"
+                )
+                commit_sha = commit_tree(git_dir, tree_sha, commit_message)
+                mirror.prefetch_blobs(commit_sha)
+
+                log_and_print(f"📤 Pushing new golden branch to remote...")
+                auth_url = setup_git_auth(repo_url, gitlab_token)
+                _run_git(git_dir, ["push", auth_url, f"{commit_sha}:refs/heads/{new_branch_name}"])
+                _run_git(git_dir, ["update-ref", f"refs/heads/{new_branch_name}", commit_sha])
+                get_ref_cache().invalidate(repo_url)
+
+                log_and_print(f"✅ Selective golden branch {new_branch_name} created successfully!")
+                return True
+            except GitCommandError as e:
+                log_and_print(f"❌ Git error creating selective golden branch: {e}", "error")
+                return False
+            except Exception as e:
+                log_and_print(f"❌ Error creating selective golden branch: {e}", "error")
+                return False
+
+    return _create_selective_golden_branch_by_clone(
+        repo_url, old_golden_branch, drift_branch, new_branch_name,
+        approved_files, config_paths, gitlab_token
+    )
+
+
+def _create_selective_golden_branch_by_clone(
+    repo_url: str,
+    old_golden_branch: str,
+    drift_branch: str,
+    new_branch_name: str,
+    approved_files: List[str],
+    config_paths: List[str],
+    gitlab_token: Optional[str] = None
+) -> bool:
+    """Clone-based create_selective_golden_branch (used when the mirror cache is unavailable)."""
     temp_golden_dir = None
     temp_drift_dir = None
     
     try:
-        log_and_print(f"🔄 Creating selective golden branch: {new_branch_name}")
-        log_and_print(f"📦 Old Golden: {old_golden_branch}")
-        log_and_print(f"📦 Drift: {drift_branch}")
-        log_and_print(f"✅ Approved Files: {len(approved_files)}")
-        
         # Setup authentication
         auth_url = setup_git_auth(repo_url, gitlab_token)
         
+        from shared.repo_cache import choose_fetch_strategy
+        strategy = choose_fetch_strategy(repo_url, gitlab_token)
+        log_and_print(f"📦 Fetch strategy: {strategy}")
+        
         # Step 1: Clone old golden branch as base
         log_and_print(f"📥 Cloning old golden branch as base...")
         temp_golden_dir = tempfile.mkdtemp(prefix="golden_base_")
-        golden_repo = git.Repo.clone_from(auth_url, temp_golden_dir, branch=old_golden_branch, depth=1)
+        golden_repo = clone_branch_worktree(auth_url, temp_golden_dir, old_golden_branch, strategy, config_paths)
         
         # Step 2: Clone drift branch to get new files
         log_and_print(f"📥 Cloning drift branch to get approved files...")
         temp_drift_dir = tempfile.mkdtemp(prefix="drift_source_")
-        drift_repo = git.Repo.clone_from(auth_url, temp_drift_dir, branch=drift_branch, depth=1)
+        drift_repo = clone_branch_worktree(auth_url, temp_drift_dir, drift_branch, strategy, config_paths)
         
         # Step 3: Copy approved files from drift to golden
         log_and_print(f"📝 Copying {len(approved_files)} approved files...")
@@ -498,6 +1051,7 @@ def create_selective_golden_branch(
         # Push new golden branch
         log_and_print(f"📤 Pushing new golden branch to remote...")
         golden_repo.git.push('--set-upstream', 'origin', new_branch_name)
+        get_ref_cache().invalidate(repo_url)
         
         log_and_print(f"✅ Selective golden branch {new_branch_name} created successfully!")
         return True
@@ -524,7 +1078,7 @@ def list_branches_by_pattern(
     gitlab_token: Optional[str] = None
 ) -> List[str]:
     """
-    List all branches matching a specific pattern.
+    List all branches matching a specific pattern (served from the ref cache).
     
     Args:
         repo_url: Repository URL
@@ -534,23 +1088,9 @@ def list_branches_by_pattern(
     Returns:
         List of branch names matching the pattern
     """
-    temp_dir = None
     try:
-        # Create temporary directory
-        temp_dir = tempfile.mkdtemp(prefix="git_list_")
-        
-        # Setup authentication
-        auth_url = setup_git_auth(repo_url, gitlab_token)
-        
-        # Clone with minimal depth
         logger.info(f"Listing branches matching pattern: {pattern}")
-        repo = git.Repo.clone_from(auth_url, temp_dir, depth=1, single_branch=False, no_checkout=True)
-        
-        # Fetch remote refs
-        repo.remotes.origin.fetch()
-        
-        # Get all remote branches
-        remote_branches = [ref.name.replace('origin/', '') for ref in repo.remotes.origin.refs]
+        remote_branches = get_ref_cache().heads(repo_url, gitlab_token)
         
         # Filter by pattern (simple prefix matching)
         pattern_prefix = pattern.replace('*', '')
@@ -562,13 +1102,6 @@ def list_branches_by_pattern(
     except Exception as e:
         logger.error(f"Error listing branches with pattern {pattern}: {e}")
         return []
-    finally:
-        # Cleanup temporary directory
-        if temp_dir and os.path.exists(temp_dir):
-            try:
-                shutil.rmtree(temp_dir)
-            except Exception as e:
-                logger.warning(f"Failed to cleanup temp directory {temp_dir}: {e}")
 
 
 def delete_remote_branch(
@@ -578,6 +1111,8 @@ def delete_remote_branch(
 ) -> bool:
     """
     Delete a branch from the remote repository.
+
+    Pushes the delete from an empty temporary bare repository, so nothing is cloned.
     
     Args:
         repo_url: Repository URL
@@ -587,37 +1122,66 @@ def delete_remote_branch(
     Returns:
         True if successful, False otherwise
     """
+    logger.info(f"Deleting remote branch: {branch_name}")
+    result = delete_remote_branches(repo_url, [branch_name], gitlab_token)
+    if result["deleted"]:
+        logger.info(f"✅ Successfully deleted branch {branch_name}")
+        return True
+    return False
+
+
+def delete_remote_branches(
+    repo_url: str,
+    branch_names: List[str],
+    gitlab_token: Optional[str] = None,
+    chunk_size: int = GIT_PUSH_DELETE_CHUNK
+) -> Dict[str, List[str]]:
+    """
+    Delete many remote branches with batched `git push --atomic` calls.
+
+    Each push carries up to chunk_size delete refspecs and either deletes all
+    of them or none. Pushes run from an empty temporary bare repository.
+    
+    Args:
+        repo_url: Repository URL
+        branch_names: Branch names to delete
+        gitlab_token: Optional GitLab token for authentication
+        chunk_size: Delete refspecs per push
+        
+    Returns:
+        {"deleted": [...], "failed": [...]}
+    """
+    result: Dict[str, List[str]] = {"deleted": [], "failed": []}
+    if not branch_names:
+        return result
+    
     temp_dir = None
     try:
-        # Create temporary directory
         temp_dir = tempfile.mkdtemp(prefix="git_delete_")
-        
-        # Setup authentication
         auth_url = setup_git_auth(repo_url, gitlab_token)
+        repo = git.Repo.init(temp_dir, bare=True)
         
-        # Clone repository (minimal)
-        logger.info(f"Deleting remote branch: {branch_name}")
-        repo = git.Repo.clone_from(auth_url, temp_dir, depth=1, single_branch=False, no_checkout=True)
-        
-        # Delete remote branch
-        repo.git.push('origin', '--delete', branch_name)
-        
-        logger.info(f"✅ Successfully deleted branch {branch_name}")
-        return True
-        
-    except GitCommandError as e:
-        logger.error(f"Git error deleting branch {branch_name}: {e}")
-        return False
+        for start in range(0, len(branch_names), chunk_size):
+            chunk = branch_names[start:start + chunk_size]
+            try:
+                repo.git.push('--atomic', auth_url, *[f':refs/heads/{name}' for name in chunk])
+                result["deleted"].extend(chunk)
+                logger.info(f"✅ Deleted {len(chunk)} remote branches")
+            except GitCommandError as e:
+                result["failed"].extend(chunk)
+                logger.error(f"Git error deleting {len(chunk)} branches: {e}")
     except Exception as e:
-        logger.error(f"Error deleting branch {branch_name}: {e}")
-        return False
+        logger.error(f"Error deleting remote branches: {e}")
+        done = set(result["deleted"]) | set(result["failed"])
+        result["failed"].extend(name for name in branch_names if name not in done)
     finally:
-        # Cleanup temporary directory
+        get_ref_cache().invalidate(repo_url)
         if temp_dir and os.path.exists(temp_dir):
             try:
                 shutil.rmtree(temp_dir)
             except Exception as e:
                 logger.warning(f"Failed to cleanup temp directory {temp_dir}: {e}")
+    return result
 
 
 def validate_git_credentials() -> bool:
@@ -8,7 +8,7 @@ storing the data in a JSON file for persistence.
 import json
 import os
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime
 import logging
 
@@ -179,12 +179,70 @@ def add_drift_branch(service_id: str, environment: str, branch_name: str) -> Non
     if len(drift_branches) > MAX_BRANCHES_PER_ENV:
         removed = drift_branches[:-MAX_BRANCHES_PER_ENV]
         data[service_id][environment]["drift_branches"] = drift_branches[-MAX_BRANCHES_PER_ENV:]
+        snapshots = data[service_id][environment].get("drift_snapshots", {})
+        for name in removed:
+            snapshots.pop(name, None)
         logger.info(f"Removed old drift branches for {service_id}/{environment}: {removed}")
     
     _save_branches_data(data)
     logger.info(f"Added drift branch {branch_name} for {service_id}/{environment}")
 
 
+def add_drift_snapshot(service_id: str, environment: str, snapshot: Dict) -> None:
+    """
+    Add a local-only drift snapshot for a service and environment.
+
+    The snapshot name is tracked like a drift branch (so it becomes the active
+    drift branch), and its commit SHAs are kept under "drift_snapshots" until
+    the branch is pushed on certification.
+    
+    Args:
+        service_id: Service identifier
+        environment: Environment name
+        snapshot: Snapshot metadata (name, commit, source_commit, ..., pushed)
+    """
+    data = _load_branches_data()
+    data = _ensure_service_structure(data, service_id, environment)
+    data[service_id][environment].setdefault("drift_snapshots", {})[snapshot["name"]] = snapshot
+    _save_branches_data(data)
+    
+    add_drift_branch(service_id, environment, snapshot["name"])
+
+
+def get_drift_snapshot(service_id: str, environment: str, branch_name: str) -> Optional[Dict]:
+    """
+    Get snapshot metadata for a drift branch name.
+    
+    Args:
+        service_id: Service identifier
+        environment: Environment name
+        branch_name: Drift branch (snapshot) name
+        
+    Returns:
+        Snapshot metadata, or None if the drift branch is a regular pushed branch
+    """
+    data = _load_branches_data()
+    return data.get(service_id, {}).get(environment, {}).get("drift_snapshots", {}).get(branch_name)
+
+
+def mark_snapshot_pushed(service_id: str, environment: str, branch_name: str) -> bool:
+    """
+    Record that a drift snapshot was pushed to the remote as a branch.
+    
+    Returns:
+        True if updated, False if no such snapshot is tracked
+    """
+    data = _load_branches_data()
+    snapshot = data.get(service_id, {}).get(environment, {}).get("drift_snapshots", {}).get(branch_name)
+    if snapshot is None:
+        return False
+    snapshot["pushed"] = True
+    snapshot["pushed_at"] = datetime.now().isoformat()
+    _save_branches_data(data)
+    logger.info(f"Marked drift snapshot {branch_name} as pushed for {service_id}/{environment}")
+    return True
+
+
 def get_all_branches(service_id: str, environment: str) -> Tuple[List[str], List[str]]:
     """
     Get all golden and drift branches for a service and environment.
@@ -247,6 +305,26 @@ def initialize_service(service_id: str, environments: List[str]) -> None:
     logger.info(f"Initialized service {service_id} with environments: {environments}")
 
 
+def get_tracked_branch_names(service_ids: List[str]) -> Set[str]:
+    """
+    Get every golden/drift branch (and drift snapshot) name tracked for the given services.
+    
+    Args:
+        service_ids: Service identifiers (e.g., all services sharing one repository)
+        
+    Returns:
+        Set of tracked branch names
+    """
+    data = _load_branches_data()
+    tracked: Set[str] = set()
+    for service_id in service_ids:
+        for env_data in data.get(service_id, {}).values():
+            tracked.update(env_data.get("golden_branches", []))
+            tracked.update(env_data.get("drift_branches", []))
+            tracked.update(env_data.get("drift_snapshots", {}).keys())
+    return tracked
+
+
 def get_all_services() -> Dict[str, Dict[str, Dict]]:
     """
     Get all services and their branch data.
@@ -281,6 +359,8 @@ def remove_branch(service_id: str, environment: str, branch_name: str, branch_ty
     if branch_name in branches:
         branches.remove(branch_name)
         data[service_id][environment][branch_list_key] = branches
+        if branch_type == "drift":
+            data[service_id][environment].get("drift_snapshots", {}).pop(branch_name, None)
         _save_branches_data(data)
         logger.info(f"Removed {branch_type} branch {branch_name} for {service_id}/{environment}")
         return True
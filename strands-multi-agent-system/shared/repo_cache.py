@@ -0,0 +1,544 @@
+"""
+Repository Cache Module - Persistent bare mirrors for drift analysis
+
+This module keeps one bare mirror per repository URL on local disk. Mirrors are
+fetched incrementally (only new objects are transferred) and golden/drift trees
+are materialized from them, instead of doing full clones on every run.
+
+Concurrency:
+    - Fetches are single-flight per repository: concurrent runs on the same
+      repository wait for one in-progress fetch and reuse its result.
+    - Mirrors in use are leased and never evicted while leased; a mirror being
+      evicted cannot be leased again until its directory is gone.
+
+Maintenance:
+    - gc.auto is off in mirrors, so git never starts a gc in the background
+      mid-run; instead `git gc --auto` runs after a fetch at most once per
+      REPO_MAINTENANCE_INTERVAL seconds.
+
+Disk budget:
+    - When the total cache size exceeds REPO_CACHE_MAX_BYTES, the least
+      recently used mirrors are evicted.
+
+Acquisition strategy (REPO_FETCH_STRATEGY, default "auto"):
+    - mirror:  full bare mirror (default for normal-sized repositories)
+    - partial: bare mirror cloned with --filter=blob:none; only the blobs that
+               are materialized or pushed are fetched, on demand
+    - shallow: no mirror, depth=1 clones (repositories with very long history)
+    "auto" picks one from the repository size and commit count reported by GitLab.
+"""
+
+import os
+import re
+import time
+import shutil
+import hashlib
+import subprocess
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlsplit, urlunsplit
+import logging
+
+import git
+from git.exc import GitCommandError
+
+from shared.git_operations import (setup_git_auth, log_and_print, close_cat_file_pool, get_cat_file_pool,
+                                   GIT_CAT_FILE_WINDOW)
+
+logger = logging.getLogger(__name__)
+
+# Root directory holding all mirrors
+REPO_CACHE_DIR = Path(os.getenv(
+    "REPO_CACHE_DIR",
+    str(Path(tempfile.gettempdir()) / "golden_config_drift" / "mirrors")
+))
+
+# Disk budget for all mirrors together (default 20 GB)
+REPO_CACHE_MAX_BYTES = int(os.getenv("REPO_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))
+
+# Marker file touched on every use (its mtime drives LRU eviction)
+LAST_USED_MARKER = "golden_config_last_used"
+
+# Seconds between `git gc --auto` runs on a mirror (default 1 day), and its marker file
+REPO_MAINTENANCE_INTERVAL = float(os.getenv("REPO_MAINTENANCE_INTERVAL", str(24 * 3600)))
+MAINTENANCE_MARKER = "golden_config_last_maintenance"
+
+# Only branches are mirrored (GitLab merge-request refs etc. are skipped)
+MIRROR_REFSPEC = "+refs/heads/*:refs/heads/*"
+
+# Acquisition strategy: auto, mirror, partial or shallow
+REPO_FETCH_STRATEGY = os.getenv("REPO_FETCH_STRATEGY", "auto").lower()
+FETCH_STRATEGIES = ("mirror", "partial", "shallow")
+
+# "auto" thresholds: repositories larger than this use a blob:none partial mirror (default 2 GB)
+PARTIAL_CLONE_MIN_BYTES = int(os.getenv("PARTIAL_CLONE_MIN_BYTES", str(2 * 1024 ** 3)))
+# ... and repositories with more commits than this use depth=1 clones
+SHALLOW_CLONE_MIN_COMMITS = int(os.getenv("SHALLOW_CLONE_MIN_COMMITS", "200000"))
+
+
+def _strip_credentials(repo_url: str) -> str:
+    """Remove user/password/token from a repository URL."""
+    parts = urlsplit(repo_url)
+    if not parts.netloc or "@" not in parts.netloc:
+        return repo_url
+    host = parts.netloc.rsplit("@", 1)[1]
+    return urlunsplit((parts.scheme, host, parts.path, parts.query, parts.fragment))
+
+
+def repo_cache_key(repo_url: str) -> str:
+    """
+    Build a stable, filesystem-safe cache key for a repository URL.
+
+    Args:
+        repo_url: Repository URL (credentials are ignored)
+
+    Returns:
+        Key such as "cxp-ptg-adapter_3f2a9c1d0b4e5f67"
+    """
+    clean_url = _strip_credentials(repo_url).rstrip("/")
+    digest = hashlib.sha1(clean_url.lower().encode("utf-8")).hexdigest()[:16]
+    name = clean_url.rsplit("/", 1)[-1]
+    if name.endswith(".git"):
+        name = name[:-4]
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", name) or "repo"
+    return f"{name}_{digest}"
+
+
+def _dir_size(path: Path) -> int:
+    """Total size in bytes of all files below path."""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+_stats_cache: Dict[str, Optional[Dict[str, int]]] = {}
+
+
+def gitlab_repo_stats(repo_url: str, gitlab_token: Optional[str] = None) -> Optional[Dict[str, int]]:
+    """
+    Fetch repository size and commit count from the GitLab projects API.
+
+    Args:
+        repo_url: Repository URL (https)
+        gitlab_token: Optional GitLab token (falls back to GITLAB_TOKEN)
+
+    Returns:
+        {"repository_size": bytes, "commit_count": n} or None if unavailable
+    """
+    clean_url = _strip_credentials(repo_url)
+    if clean_url in _stats_cache:
+        return _stats_cache[clean_url]
+
+    stats = None
+    parts = urlsplit(clean_url)
+    if parts.scheme in ("http", "https"):
+        project = parts.path.strip("/")
+        if project.endswith(".git"):
+            project = project[:-4]
+        try:
+            import requests
+            token = gitlab_token or os.getenv("GITLAB_TOKEN")
+            response = requests.get(
+                f"{parts.scheme}://{parts.netloc}/api/v4/projects/{quote(project, safe='')}",
+                params={"statistics": "true"},
+                headers={"PRIVATE-TOKEN": token} if token else {},
+                timeout=10,
+            )
+            response.raise_for_status()
+            raw = response.json().get("statistics") or {}
+            stats = {
+                "repository_size": int(raw.get("repository_size", 0)),
+                "commit_count": int(raw.get("commit_count", 0)),
+            }
+        except Exception as e:
+            logger.info(f"Repository statistics unavailable for {clean_url}: {e}")
+    _stats_cache[clean_url] = stats
+    return stats
+
+
+def choose_fetch_strategy(repo_url: str, gitlab_token: Optional[str] = None,
+                          cache: Optional["RepoMirrorCache"] = None) -> str:
+    """
+    Pick how to acquire a repository: "mirror", "partial" or "shallow".
+
+    REPO_FETCH_STRATEGY forces a strategy. Otherwise an existing mirror keeps
+    its kind, and new repositories are sized up via the GitLab API (full
+    mirror when statistics are unavailable).
+    """
+    if REPO_FETCH_STRATEGY in FETCH_STRATEGIES:
+        return REPO_FETCH_STRATEGY
+
+    mirror = (cache or get_repo_cache()).get_mirror(repo_url, gitlab_token)
+    if mirror.exists:
+        return "partial" if mirror.partial else "mirror"
+
+    stats = gitlab_repo_stats(repo_url, gitlab_token)
+    if not stats:
+        return "mirror"
+    if stats["commit_count"] >= SHALLOW_CLONE_MIN_COMMITS:
+        return "shallow"
+    if stats["repository_size"] >= PARTIAL_CLONE_MIN_BYTES:
+        return "partial"
+    return "mirror"
+
+
+class RepoMirror:
+    """A bare mirror of one remote repository (full, or blob:none partial)."""
+
+    def __init__(self, repo_url: str, path: Path, gitlab_token: Optional[str] = None):
+        self.repo_url = repo_url
+        self.path = path
+        self.gitlab_token = gitlab_token
+        self._fetch_lock = threading.Lock()
+        self._last_fetch_started = 0.0
+
+    @property
+    def exists(self) -> bool:
+        return (self.path / "HEAD").exists()
+
+    @property
+    def partial(self) -> bool:
+        """True for a blob:none partial mirror (blobs are fetched on demand)."""
+        if not self.exists:
+            return False
+        with self.repo.config_reader() as config:
+            return config.get_value('remote "origin"', 'promisor', False) is True
+
+    @property
+    def repo(self) -> git.Repo:
+        return git.Repo(self.path)
+
+    def touch(self) -> None:
+        """Mark the mirror as recently used."""
+        try:
+            (self.path / LAST_USED_MARKER).touch()
+        except OSError:
+            pass
+
+    def last_used(self) -> float:
+        try:
+            return (self.path / LAST_USED_MARKER).stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def _clone(self, auth_url: str, partial: bool = False) -> None:
+        """Create the bare mirror (clone into a temp dir, then rename into place)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f"{self.path.name}.", dir=self.path.parent))
+        try:
+            kind = "partial (blob:none) " if partial else ""
+            log_and_print(f"📥 Creating {kind}bare mirror for {_strip_credentials(self.repo_url)}")
+            options = {"filter": "blob:none"} if partial else {}
+            repo = git.Repo.clone_from(auth_url, staging, bare=True, no_tags=True, **options)
+            with repo.config_writer() as config:
+                # Never persist credentials in the mirror config
+                config.set_value('remote "origin"', 'url', _strip_credentials(self.repo_url))
+                config.set_value('remote "origin"', 'fetch', MIRROR_REFSPEC)
+                config.set_value('gc', 'auto', '0')
+            os.replace(staging, self.path)
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def fetch(self, partial: bool = False) -> None:
+        """
+        Bring the mirror up to date with the remote (single-flight).
+
+        If another thread started a fetch after this call was made, that fetch
+        already covers everything this caller needs, so it is reused instead of
+        issuing a second one.
+
+        Args:
+            partial: Create a blob:none partial mirror if it does not exist yet
+        """
+        requested_at = time.monotonic()
+        with self._fetch_lock:
+            if self._last_fetch_started >= requested_at:
+                logger.info(f"Reusing concurrent fetch for {self.path.name}")
+                return
+
+            started_at = time.monotonic()
+            auth_url = setup_git_auth(self.repo_url, self.gitlab_token)
+            if not self.exists:
+                self._clone(auth_url, partial)
+            else:
+                log_and_print(f"🔄 Fetching mirror updates for {_strip_credentials(self.repo_url)}")
+                filter_args = ['--filter=blob:none'] if self.partial else []
+                self.repo.git.fetch('--prune', '--no-tags', *filter_args, auth_url, MIRROR_REFSPEC)
+            self._last_fetch_started = started_at
+            self.maintain()
+        self.touch()
+
+    def maintain(self, force: bool = False) -> bool:
+        """
+        Repack and prune the mirror if git thinks it is due (`git gc --auto`),
+        at most once per REPO_MAINTENANCE_INTERVAL unless forced.
+
+        Returns:
+            True if gc was run
+        """
+        marker = self.path / MAINTENANCE_MARKER
+        if not force:
+            try:
+                if time.time() - marker.stat().st_mtime < REPO_MAINTENANCE_INTERVAL:
+                    return False
+            except OSError:
+                pass
+        # gc.auto=0 in the mirror config would make --auto a no-op: use git's default threshold
+        proc = subprocess.run(
+            ["git", "--git-dir", str(self.path), "-c", "gc.auto=6700", "gc", "--auto", "--quiet"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False,
+        )
+        if proc.returncode != 0:
+            logger.warning(f"git gc failed for {self.path.name}: {proc.stderr.decode(errors='replace').strip()}")
+            return False
+        try:
+            marker.touch()
+        except OSError:
+            pass
+        return True
+
+    def resolve(self, rev: str) -> str:
+        """Resolve a branch name or revision to a commit SHA."""
+        return self.repo.git.rev_parse('--verify', f'{rev}^{{commit}}')
+
+    def _blob_entries(self, rev: str, paths: Optional[List[str]] = None) -> List[Tuple[str, str, str]]:
+        """(mode, oid, path) of the blobs of a revision, optionally only some paths."""
+        wanted = set(paths) if paths is not None else None
+        entries = []
+        for entry in self.repo.git.ls_tree('-r', '-z', rev).split('\0'):
+            if not entry:
+                continue
+            meta, path = entry.split('\t', 1)
+            mode, obj_type, oid = meta.split()
+            if obj_type == 'blob' and (wanted is None or path in wanted):
+                entries.append((mode, oid, path))
+        return entries
+
+    def prefetch_blobs(self, rev: str, paths: Optional[List[str]] = None) -> int:
+        """
+        Fetch the blobs of a revision (optionally only some paths) into a partial mirror.
+
+        All wanted blobs go in one authenticated fetch, instead of git's lazy
+        one-by-one fetches (which would also lack credentials). No-op for full mirrors.
+
+        Returns:
+            Number of blobs requested
+        """
+        if not self.partial:
+            return 0
+        return self._fetch_blobs([oid for _mode, oid, _path in self._blob_entries(rev, paths)])
+
+    def _fetch_blobs(self, oids: List[str]) -> int:
+        if oids:
+            auth_url = setup_git_auth(self.repo_url, self.gitlab_token)
+            proc = subprocess.run(
+                ["git", "--git-dir", str(self.path), "-c", "fetch.negotiationAlgorithm=noop",
+                 "fetch", "--no-tags", "--no-write-fetch-head", "--recurse-submodules=no",
+                 "--filter=blob:none", "--stdin", auth_url],
+                input="\n".join(oids).encode("utf-8") + b"\n",
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False,
+            )
+            if proc.returncode != 0:
+                raise GitCommandError("fetch --stdin", proc.returncode, proc.stderr)
+        return len(oids)
+
+    def materialize(self, rev: str, dest: Path, paths: Optional[List[str]] = None) -> Path:
+        """
+        Write the tree of a revision into a plain directory (no .git, no clone).
+
+        The whole tree is checked out with a private index file, so concurrent
+        materializations from the same mirror do not interfere with each other.
+        A subset of paths (the changed files of a tree scan) is written from
+        blob contents read through the mirror's `git cat-file --batch` pool,
+        without an index. The tree SHA is recorded in the destination
+        (caches.mark_tree_source), so file digests computed for it are reused
+        by later runs materializing the same tree anywhere on disk.
+
+        Args:
+            rev: Branch name or commit SHA
+            dest: Target directory
+            paths: Optional subset of paths to write (default: the whole tree)
+
+        Returns:
+            The destination directory
+        """
+        from shared.drift_analyzer.caches import mark_tree_source
+        dest.mkdir(parents=True, exist_ok=True)
+        repo = self.repo
+        if paths is not None:
+            entries = self._blob_entries(rev, paths)
+            if self.partial:
+                self._fetch_blobs([oid for _mode, oid, _path in entries])
+            self._write_blobs(dest, entries)
+        else:
+            index_dir = tempfile.mkdtemp(prefix="mirror_index_")
+            env = {
+                "GIT_INDEX_FILE": os.path.join(index_dir, "index"),
+                "GIT_WORK_TREE": str(dest),
+            }
+            try:
+                self.prefetch_blobs(rev)
+                repo.git.read_tree(self.resolve(rev), env=env)
+                repo.git.checkout_index('-a', '-f', env=env)
+            finally:
+                shutil.rmtree(index_dir, ignore_errors=True)
+        mark_tree_source(dest, repo.git.rev_parse(f'{rev}^{{tree}}'))
+        self.touch()
+        return dest
+
+    def _write_blobs(self, dest: Path, entries: List[Tuple[str, str, str]]) -> None:
+        """Write (mode, oid, path) entries under dest, reading blobs in pipelined batches."""
+        pool = get_cat_file_pool(str(self.path))
+        for start in range(0, len(entries), GIT_CAT_FILE_WINDOW):
+            chunk = entries[start:start + GIT_CAT_FILE_WINDOW]
+            for (mode, oid, rel), data in zip(chunk, pool.read_many([oid for _mode, oid, _rel in chunk])):
+                if data is None:
+                    raise GitCommandError("cat-file", 1, f"blob {oid} of {rel} is not in the mirror")
+                target = dest / rel
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if target.is_symlink() or target.exists():
+                    target.unlink()
+                if mode == "120000":
+                    os.symlink(os.fsdecode(data), target)
+                else:
+                    target.write_bytes(data)
+                    if mode == "100755":
+                        target.chmod(0o755)
+
+
+class RepoMirrorCache:
+    """Registry of bare mirrors with leasing and LRU eviction under a disk budget."""
+
+    def __init__(self, cache_dir: Path = REPO_CACHE_DIR, max_bytes: int = REPO_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._mirrors: Dict[str, RepoMirror] = {}
+        self._leases: Dict[str, int] = {}
+        # Mirrors whose directory is being deleted; set once it is gone
+        self._evicting: Dict[str, threading.Event] = {}
+
+    def get_mirror(self, repo_url: str, gitlab_token: Optional[str] = None) -> RepoMirror:
+        """Return the (possibly not yet cloned) mirror object for a repository."""
+        return self._get_mirror(repo_url, gitlab_token, lease=False)
+
+    def _get_mirror(self, repo_url: str, gitlab_token: Optional[str], lease: bool) -> RepoMirror:
+        # Waits out an eviction of the same mirror, so nothing fetches into a directory being deleted
+        key = repo_cache_key(repo_url)
+        while True:
+            with self._lock:
+                evicting = self._evicting.get(f"{key}.git")
+                if evicting is None:
+                    mirror = self._mirrors.get(key)
+                    if mirror is None:
+                        mirror = RepoMirror(repo_url, self.cache_dir / f"{key}.git", gitlab_token)
+                        self._mirrors[key] = mirror
+                    elif gitlab_token:
+                        mirror.gitlab_token = gitlab_token
+                    if lease:
+                        # taken under the same lock evict() checks leases with
+                        self._leases[mirror.path.name] = self._leases.get(mirror.path.name, 0) + 1
+                    return mirror
+            evicting.wait()
+
+    @contextmanager
+    def lease(self, repo_url: str, gitlab_token: Optional[str] = None,
+              refresh: bool = True, partial: Optional[bool] = None) -> Iterator[RepoMirror]:
+        """
+        Lease a mirror for the duration of a with-block.
+
+        Args:
+            repo_url: Repository URL
+            gitlab_token: Optional GitLab token for authentication
+            refresh: Fetch from the remote before yielding (clones on first use)
+            partial: Clone as a blob:none partial mirror on first use
+                     (default: decided by choose_fetch_strategy; raises
+                     ValueError for repositories it assigns to "shallow")
+
+        Yields:
+            RepoMirror ready for materialization
+        """
+        mirror = self._get_mirror(repo_url, gitlab_token, lease=True)
+        key = mirror.path.name
+        try:
+            if not mirror.exists and partial is None:
+                strategy = choose_fetch_strategy(repo_url, gitlab_token, self)
+                if strategy == "shallow":
+                    # too large/deep to mirror: callers fetch shallow instead
+                    raise ValueError(f"{repo_url} is fetched shallow, not mirrored")
+                partial = strategy == "partial"
+            if refresh or not mirror.exists:
+                mirror.fetch(partial=bool(partial))
+            mirror.touch()
+            yield mirror
+        finally:
+            with self._lock:
+                self._leases[key] -= 1
+                if not self._leases[key]:
+                    del self._leases[key]
+            self.evict()
+
+    def evict(self) -> List[str]:
+        """
+        Evict least recently used mirrors until the cache fits the disk budget.
+
+        Returns:
+            Names of the evicted mirror directories
+        """
+        if not self.cache_dir.exists():
+            return []
+
+        entries = []
+        for path in self.cache_dir.glob("*.git"):
+            if path.is_dir():
+                entries.append((path, _dir_size(path)))
+        total = sum(size for _, size in entries)
+        if total <= self.max_bytes:
+            return []
+
+        evicted = []
+        entries.sort(key=lambda e: RepoMirror("", e[0]).last_used())
+        for path, size in entries:
+            if total <= self.max_bytes:
+                break
+            with self._lock:
+                if self._leases.get(path.name) or path.name in self._evicting:
+                    continue
+                mirror = self._mirrors.pop(path.name[:-len(".git")], None)
+                done = self._evicting[path.name] = threading.Event()
+            try:
+                # Hold the fetch lock so no fetch can run against a half-deleted mirror
+                lock = mirror._fetch_lock if mirror else threading.Lock()
+                with lock:
+                    close_cat_file_pool(str(path))
+                    shutil.rmtree(path, ignore_errors=True)
+            finally:
+                with self._lock:
+                    del self._evicting[path.name]
+                done.set()
+            total -= size
+            evicted.append(path.name)
+            logger.info(f"Evicted repository mirror {path.name} ({size} bytes)")
+        return evicted
+
+
+_default_cache: Optional[RepoMirrorCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_repo_cache() -> RepoMirrorCache:
+    """Return the process-wide repository mirror cache."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = RepoMirrorCache()
+        return _default_cache
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pipeline artifact encodings (size, save and load time).
+
+Builds an enhanced-analysis-like document with N analyzed deltas and compares
+the pretty JSON the pipeline writes by default with every compact
+codec/compression pair installed here.
+
+Usage:
+    python tests/benchmark_artifact_io.py [--deltas 20000] [--repeat 3]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared import artifact_io
+from shared.artifact_io import load_artifact, read_header, save_artifact
+
+
+def make_document(n: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    deltas = []
+    for i in range(n):
+        svc = f"svc{i % 40}"
+        key = f"spring.datasource.hikari.pool{i % 17}.timeout"
+        deltas.append({
+            "id": f"cfg~{svc}/application-prod.yml.{key}.{i}",
+            "category": rng.choice(["config", "spring_profile", "dependency", "code_hunk"]),
+            "file": f"{svc}/src/main/resources/application-prod.yml",
+            "locator": {"type": "yamlpath", "value": f"{svc}/application-prod.yml.{key}",
+                        "line_start": rng.randrange(1, 400), "line_end": rng.randrange(400, 800)},
+            "old": str(rng.randrange(1000, 60000)),
+            "new": str(rng.randrange(1000, 60000)),
+            "risk_hint": rng.choice(["low", "med", "high"]),
+            "policy": {"tag": rng.choice(["invariant_breach", "allowed_variance", "suspect"]), "rule": None},
+            "ai_analysis": {
+                "risk_level": rng.choice(["low", "medium", "high"]),
+                "why": "Connection pool timeout changed; may cause request stalls under load.",
+                "remediation": {"snippet": f"{key}: {rng.randrange(1000, 60000)}"},
+            },
+        })
+    return {"summary": {"total_drifts": n}, "analyzed_deltas_with_ai": deltas, "clusters": []}
+
+
+def _encodings():
+    yield "json (pretty)", "json", None, None
+    codecs = ["json", "orjson", "msgpack"]
+    compressions = ["none", "zlib", "zstd"]
+    for codec in codecs:
+        if codec == "orjson" and not artifact_io.orjson or codec == "msgpack" and not artifact_io.msgpack:
+            continue
+        for comp in compressions:
+            if comp == "zstd" and not artifact_io.zstandard:
+                continue
+            yield f"compact {codec}+{comp}", "compact", codec, comp
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--deltas", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    doc = make_document(args.deltas)
+    print(f"{args.deltas} deltas")
+    print(f"{'encoding':28} {'size KB':>10} {'save ms':>10} {'load ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "enhanced_analysis_bench.json"
+        for label, fmt, codec, comp in _encodings():
+            if codec:
+                artifact_io.ARTIFACT_CODEC, artifact_io.ARTIFACT_COMPRESSION = codec, comp
+            save_t = load_t = float("inf")
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                save_artifact(path, doc, fmt=fmt)
+                save_t = min(save_t, time.perf_counter() - t)
+                t = time.perf_counter()
+                loaded = load_artifact(path)
+                load_t = min(load_t, time.perf_counter() - t)
+            assert loaded == doc
+            if codec:
+                header, _ = read_header(path.read_bytes())
+                assert (header["codec"], header["compression"]) == (codec, comp)
+            print(f"{label:28} {path.stat().st_size / 1024:>10.0f} {save_t * 1000:>10.1f} {load_t * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: YAML parsing for config comparison on large Helm values files.
+
+Compares ruamel's round-trip loader (what every YAML file used to go through)
+with the C-loader value parse, and the two-tier pipeline: values for every
+file, round-trip positions only for the files that drifted.
+
+Usage:
+    python tests/benchmark_yaml_parse.py [--services 200] [--files 10] [--drifted 2] [--repeat 3]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.drift_analyzer import drift_v1
+from shared.drift_analyzer.yaml_values import LOADER_NAME, load_roundtrip, load_values
+
+
+def make_values(services: int, seed: int) -> str:
+    """Helm umbrella-chart values.yaml: one block per subchart."""
+    rng = random.Random(seed)
+    out = ["global:\n  imageRegistry: registry.example.com\n  pullPolicy: IfNotPresent\n"]
+    for i in range(services):
+        out.append(
+            f"svc{i}:\n"
+            f"  enabled: {rng.choice(['true', 'false'])}\n"
+            f"  replicaCount: {rng.randrange(1, 6)}\n"
+            f"  image:\n    repository: team/svc{i}\n    tag: \"1.{rng.randrange(40)}.{rng.randrange(10)}\"\n"
+            f"  # resources tuned for prod\n"
+            f"  resources:\n    limits: {{cpu: {rng.randrange(100, 2000)}m, memory: {rng.randrange(128, 4096)}Mi}}\n"
+            f"    requests:\n      cpu: {rng.randrange(50, 500)}m\n      memory: {rng.randrange(64, 1024)}Mi\n"
+            f"  env:\n" + "".join(f"    - name: VAR_{j}\n      value: \"{rng.randrange(10 ** 6)}\"\n" for j in range(4)) +
+            f"  ingress:\n    enabled: {rng.choice(['true', 'false'])}\n"
+            f"    hosts: [svc{i}.example.com, svc{i}.internal]\n"
+            f"    annotations:\n      nginx.ingress.kubernetes.io/proxy-body-size: {rng.randrange(1, 64)}m\n"
+        )
+    return "".join(out)
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--services", type=int, default=200, help="subcharts per values file")
+    ap.add_argument("--files", type=int, default=10, help="values files per side")
+    ap.add_argument("--drifted", type=int, default=2, help="files whose candidate side differs")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    golden = [make_values(args.services, seed) for seed in range(args.files)]
+    candidate = [txt.replace("replicaCount: 1\n", "replicaCount: 9\n", 1) if i < args.drifted else txt
+                 for i, txt in enumerate(golden)]
+    texts = golden + candidate
+    size = sum(len(t) for t in texts)
+    lines = sum(t.count("\n") for t in texts)
+    print(f"{len(texts)} files, {lines} lines, {size / 1024 / 1024:.1f} MB; value loader: {LOADER_NAME}")
+
+    for g, c in zip(golden, candidate):
+        assert load_values(g) == load_roundtrip(g) and load_values(c) == load_roundtrip(c)
+
+    def roundtrip_all():
+        for t in texts:
+            drift_v1._yaml_lines(load_roundtrip(t), "", {})
+
+    def two_tier():
+        for t in texts:
+            load_values(t)
+        for g, c in zip(golden, candidate):
+            if g != c:  # stands in for "produced deltas"
+                drift_v1._yaml_lines(load_roundtrip(c), "", {})
+
+    rt = _best(lambda: [load_roundtrip(t) for t in texts], args.repeat)
+    fast = _best(lambda: [load_values(t) for t in texts], args.repeat)
+    before = _best(roundtrip_all, args.repeat)
+    after = _best(two_tier, args.repeat)
+    print(f"{'':34} {'seconds':>10} {'speedup':>9}")
+    print(f"{'values: ruamel round-trip':34} {rt:>10.3f} {1:>8.1f}x")
+    print(f"{'values: ' + LOADER_NAME:34} {fast:>10.3f} {rt / fast:>8.1f}x")
+    print(f"{'pipeline: round-trip everything':34} {before:>10.3f} {1:>8.1f}x")
+    print(f"{'pipeline: two-tier':34} {after:>10.3f} {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Unit tests for AnalysisSession: concurrent analyses in one process keep
+their own roots, line numbers and policies.
+"""
+
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.drift_analyzer import AnalysisSession, emit_context_bundle, semantic_config_diff
+
+
+def _make_pair(base: Path, n: int):
+    """Golden/candidate pair whose changed key sits on line n + 1."""
+    golden, drift = base / "golden", base / "drift"
+    for root, port in ((golden, 8080), (drift, 9090 + n)):
+        root.mkdir(parents=True)
+        filler = "".join(f"k{i}: v{i}\n" for i in range(n))
+        (root / "app.yml").write_text(f"{filler}port: {port}\n")
+    return golden, drift
+
+
+def _analyze(base: Path, n: int):
+    golden, drift = _make_pair(base, n)
+    conf = semantic_config_diff(golden, drift, ["app.yml"])
+    out = base / "out"
+    out.mkdir()
+    with AnalysisSession(golden, drift) as session:
+        bundle = emit_context_bundle(out, golden, drift, {}, {}, conf, {}, session=session)
+    return bundle
+
+
+def test_concurrent_sessions_keep_their_own_line_numbers(tmp_path):
+    sizes = [i * 7 for i in range(16)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        bundles = list(pool.map(lambda n: _analyze(tmp_path / f"run{n}", n), sizes))
+
+    for n, bundle in zip(sizes, bundles):
+        (delta,) = [d for d in bundle.iter_deltas() if d["category"] == "config"]
+        assert delta["locator"]["line_start"] == n + 1
+        assert delta["new"] == 9090 + n
+        assert bundle.get("meta")["candidate"] == str(tmp_path / f"run{n}" / "drift")
+
+
+def test_session_scopes_policies_and_cache_counters(tmp_path):
+    golden, drift = _make_pair(tmp_path, 3)
+    session = AnalysisSession(str(golden), str(drift))
+    assert session.roots == (drift, golden)
+    assert session.policies is session.policies
+
+    with session:
+        stats = session.cache_stats()
+        assert stats["parse_cache"]["hits"] == stats["parse_cache"]["misses"] == 0
+        semantic_config_diff(golden, drift, ["app.yml"])
+        stats = session.cache_stats()["parse_cache"]
+        assert stats["hits"] + stats["misses"] >= 2
+
+
+def test_concurrent_sessions_count_only_their_own_cache_lookups(tmp_path):
+    both_started = threading.Barrier(2)
+    both_counted = threading.Barrier(2)
+
+    def run(n: int):
+        with AnalysisSession(tmp_path, tmp_path) as session:
+            pc = session.parse_cache
+            both_started.wait()
+            for i in range(n):
+                pc.get(pc.key(f"never-stored-{n}-{i}".encode(), ".yml", "test"))
+            both_counted.wait()
+            return session.cache_stats()["parse_cache"]
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        stats = list(pool.map(run, [3, 5]))
+
+    assert [(s["hits"], s["misses"]) for s in stats] == [(0, 3), (0, 5)]
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Unit tests for pipeline artifact encodings (shared/artifact_io.py).
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared import artifact_io
+from shared.artifact_io import ArtifactFormatError, load_artifact, read_header, save_artifact
+
+DOC = {
+    "summary": {"total_drifts": 2, "high_risk": 1},
+    "high": [{"id": "cfg~a", "file": "app.yml", "why": "Passwört geändert", "old": None, "new": 1.5}],
+    "low": [{"id": "cfg~b", "file": "b.properties", "old": "x", "new": ["y", True]}],
+}
+
+
+def test_pretty_json_is_unchanged(tmp_path):
+    # validation/aggregated results were written with json.dump's defaults, LLM outputs unescaped
+    path = save_artifact(tmp_path / "validation_1.json", DOC, fmt="json")
+    assert path.read_text(encoding="utf-8") == json.dumps(DOC, indent=2, default=str)
+    path = save_artifact(tmp_path / "llm_output_1.json", DOC, fmt="json", ensure_ascii=False)
+    assert path.read_text(encoding="utf-8") == json.dumps(DOC, indent=2, ensure_ascii=False)
+    assert load_artifact(path) == DOC
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_concurrent_saves_of_one_artifact(tmp_path):
+    import threading
+    path = tmp_path / "aggregated_1.json"
+    docs = [{"writer": i, "rows": list(range(20000))} for i in range(8)]
+    errors = []
+
+    def save(doc):
+        try:
+            for _ in range(5):
+                save_artifact(path, doc, fmt="json")
+        except Exception as e:  # surfaced below
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(d,)) for d in docs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert load_artifact(path) in docs
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+@pytest.mark.parametrize("codec", ["json", "orjson", "msgpack"])
+@pytest.mark.parametrize("compression", ["zlib", "none", "zstd"])
+def test_compact_round_trip(tmp_path, monkeypatch, codec, compression):
+    monkeypatch.setattr(artifact_io, "ARTIFACT_CODEC", codec)
+    monkeypatch.setattr(artifact_io, "ARTIFACT_COMPRESSION", compression)
+    path = save_artifact(tmp_path / "aggregated_1.json", DOC, fmt="compact")
+    raw = path.read_bytes()
+    header, offset = read_header(raw)
+    assert header["schema"] == artifact_io.SCHEMA_VERSION and header["container"] == 1
+    # unavailable codecs and compressors fall back to ones that are installed
+    assert header["codec"] in ("json", "orjson", "msgpack") and header["compression"] in ("zlib", "none", "zstd")
+    assert offset < len(raw)
+    assert load_artifact(path) == DOC
+
+
+def test_newer_schema_is_rejected_and_plain_json_still_loads(tmp_path, monkeypatch):
+    newer = tmp_path / "newer.json"
+    newer.write_bytes(b'GCPA1\n{"schema": 99, "codec": "json", "compression": "none"}\n{}')
+    with pytest.raises(ArtifactFormatError):
+        load_artifact(newer)
+    legacy = tmp_path / "validation_1.json"
+    legacy.write_text('{"result": {"score": NaN, "ok": true}}')
+    assert load_artifact(legacy)["result"]["ok"] is True
+
+
+def test_single_document_bundle_in_compact_encoding(tmp_path, monkeypatch):
+    from shared.drift_analyzer import open_bundle
+    from shared.drift_analyzer.bundle_io import write_bundle_json
+
+    monkeypatch.setattr(artifact_io, "ARTIFACT_FORMAT", "compact")
+    bundle = {"meta": {}, "overview": {"total_files": 1}, "file_changes": {}, "dependencies": {},
+              "configs": {}, "deltas": [{"id": "d", "file": "f"}], "git_patches": {}}
+    write_bundle_json(tmp_path / "context_bundle.json", bundle)
+    reader = open_bundle(tmp_path)
+    assert not reader.segmented
+    assert reader.sections()["overview"] == {"total_files": 1}
+    assert reader.summary()["deltas"] == 1
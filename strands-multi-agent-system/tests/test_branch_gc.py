@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Unit tests for stale branch garbage collection.
+
+Uses a throwaway local bare repository as the remote and a temporary
+tracker file (no network access required).
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import shared.golden_branch_tracker as tracker
+from shared.branch_gc import gc_stale_branches
+
+
+def _git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, stdout=subprocess.PIPE, text=True
+    ).stdout.strip()
+
+
+def test_gc_deletes_only_untracked_generated_branches(tmp_path, monkeypatch):
+    remote = tmp_path / "remote.git"
+    _git(tmp_path, "init", "-q", "--bare", "-b", "main", str(remote))
+    work = tmp_path / "work"
+    _git(tmp_path, "init", "-q", "-b", "main", str(work))
+    (work / "application.yml").write_text("a: 1\n")
+    _git(work, "add", ".")
+    _git(work, "commit", "-qm", "initial")
+
+    branches = {
+        "golden_prod_20240101_000000_aaaaaa": "tracked golden",
+        "golden_prod_20240102_000000_bbbbbb": "stale golden",
+        "drift_prod_20240103_000000_cccccc": "stale drift",
+        "drift_prod_20240104_000000_dddddd": "tracked drift",
+        "drift_dev_20240105_000000_eeeeee": "other environment",
+        "drift_prod_29990101_000000_ffffff": "too recent",
+        "release/1.0": "not generated",
+    }
+    _git(work, "push", "-q", str(remote), "main", *[f"main:refs/heads/{b}" for b in branches])
+
+    branches_file = tmp_path / "golden_branches.json"
+    branches_file.write_text(json.dumps({"svc": {"prod": {
+        "golden_branches": ["golden_prod_20240101_000000_aaaaaa"],
+        "drift_branches": ["drift_prod_20240104_000000_dddddd"],
+    }}}))
+    monkeypatch.setattr(tracker, "BRANCHES_FILE", branches_file)
+
+    report = gc_stale_branches(str(remote), ["svc"], ["prod"], dry_run=True)
+    assert report["stale"]["prod"] == {
+        "golden": ["golden_prod_20240102_000000_bbbbbb"],
+        "drift": ["drift_prod_20240103_000000_cccccc"],
+    }
+    assert report["deleted"] == []
+
+    report = gc_stale_branches(str(remote), ["svc"], ["prod"], dry_run=False)
+    assert sorted(report["deleted"]) == ["drift_prod_20240103_000000_cccccc", "golden_prod_20240102_000000_bbbbbb"]
+    remaining = _git(remote, "for-each-ref", "--format=%(refname:short)", "refs/heads").splitlines()
+    assert sorted(remaining) == sorted(set(branches) - set(report["deleted"]) | {"main"})
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Unit tests for segmented context bundles and the reader for both formats.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.drift_analyzer import (
+    extract_repo_tree,
+    classify_files,
+    diff_structural,
+    run_detectors,
+    emit_context_bundle,
+    bundle_path,
+    open_bundle,
+    BundleReader,
+    BundleWriter,
+    AnalysisSession,
+)
+from shared.drift_analyzer import bundle_io
+
+
+def _write(root: Path, rel: str, text: str) -> None:
+    p = root / rel
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(text)
+
+
+def _emit(tmp_path: Path, out: Path, bundle_format: str = "ndjson"):
+    golden, drift = tmp_path / "golden", tmp_path / "drift"
+    for i in range(5):
+        _write(golden, f"svc{i}/app.properties", f"timeout={i + 1}\n")
+        _write(drift, f"svc{i}/app.properties", f"timeout={(i + 1) * 2}\n")
+    _write(golden, "main.py", "print(1)\n")
+    _write(drift, "main.py", "print(2)\n")
+    _write(drift, "extra.yml", "a: 1\n")
+    g = classify_files(golden, extract_repo_tree(golden))
+    c = classify_files(drift, extract_repo_tree(drift))
+    fc = diff_structural(g, c)
+    res = run_detectors(golden, drift, fc, workers=1)
+    out.mkdir()
+    return emit_context_bundle(out, golden, drift, {"total_files": 7}, res["dep_diff"], res["config_diff"], fc,
+                               extra_deltas=res["code_hunks"],
+                               session=AnalysisSession(golden, drift, bundle_format=bundle_format))
+
+
+def test_segmented_bundle_matches_single_document(tmp_path):
+    seg_dir, doc_dir = tmp_path / "seg", tmp_path / "doc"
+    bundle = _emit(tmp_path, seg_dir)
+    _emit(tmp_path, doc_dir, bundle_format="json")
+    # emit returns a reader over what it wrote; the deltas are not kept in memory
+    assert isinstance(bundle, BundleReader) and bundle.path == bundle_path(seg_dir)
+    deltas = list(bundle.iter_deltas())
+
+    assert bundle_path(seg_dir).name == "context_bundle.ndjson"
+    assert bundle_path(doc_dir).name == "context_bundle.json"
+    seg, doc = open_bundle(seg_dir), open_bundle(doc_dir)
+    assert seg.segmented and not doc.segmented
+
+    drop_meta = lambda d: {k: v for k, v in d.items() if k != "meta"}
+    assert drop_meta(seg.sections()) == drop_meta(doc.sections())
+    assert list(seg.iter_deltas()) == list(doc.iter_deltas()) == deltas
+    assert seg.summary() == doc.summary() == bundle.summary()
+    assert seg.summary()["deltas"] == len(deltas) > 0
+    assert seg.summary()["files_with_drift"] == len({d.get("file", "") for d in deltas})
+    assert drop_meta(seg.to_dict()) == drop_meta(json.loads((doc_dir / "context_bundle.json").read_text()))
+
+
+def test_reader_is_lazy_and_writer_is_atomic(tmp_path, monkeypatch):
+    path = tmp_path / "b.ndjson"
+    with BundleWriter(path) as w:
+        w.write_section("overview", {"environment": "prod"})
+        for i in range(1000):
+            w.write_delta({"id": f"d{i}", "file": f"f{i % 10}", "category": "config"})
+        w.write_patch("f0", "diff --git a/f0 b/f0\n")
+    reader = open_bundle(path)
+
+    parsed = []
+    real_loads = json.loads
+    monkeypatch.setattr(bundle_io.json, "loads", lambda s: parsed.append(s) or real_loads(s))
+    assert reader.sections() == {"overview": {"environment": "prod"}}
+    # header already read; the section plus the first delta that ends the section block
+    assert len(parsed) == 2
+    assert reader.summary() == {"deltas": 1000, "files_with_drift": 10, "patches": 1, "categories": {"config": 1000}}
+    assert len(parsed) == 3
+    assert next(reader.iter_deltas())["id"] == "d0"
+    assert dict(reader.iter_patches()) == {"f0": "diff --git a/f0 b/f0\n"}
+
+    failed = tmp_path / "failed.ndjson"
+    try:
+        with BundleWriter(failed) as w:
+            w.write_delta({"id": "x"})
+            raise RuntimeError("detector crashed")
+    except RuntimeError:
+        pass
+    assert not failed.exists() and not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the drift detector process pool.
+
+The pooled run must produce exactly the same JSON as the in-process run.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.drift_analyzer import (
+    extract_repo_tree,
+    classify_files,
+    diff_structural,
+    run_detectors,
+)
+from shared.drift_analyzer.detector_executor import shutdown_detector_pool
+
+
+def _write(root: Path, rel: str, text: str) -> None:
+    p = root / rel
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(text)
+
+
+def _make_pair(tmp_path: Path):
+    golden, drift = tmp_path / "golden", tmp_path / "drift"
+    for i in range(20):
+        _write(golden, f"svc{i}/application-prod.yml", f"server:\n  port: {8000 + i}\nspring:\n  profiles: prod\n")
+        _write(drift, f"svc{i}/application-prod.yml", f"server:\n  port: {9000 + i}\nspring:\n  profiles: prod\n")
+        _write(golden, f"svc{i}/app.properties", f"timeout={i + 1}\n")
+        _write(drift, f"svc{i}/app.properties", f"timeout={(i + 1) * 2}\nretries=3\n")
+    _write(golden, "Jenkinsfile", "pipeline { agent any }\n")
+    _write(drift, "Jenkinsfile", "pipeline { agent { label 'x' } }\n")
+    _write(golden, "requirements.txt", "requests==2.0\n")
+    _write(drift, "requirements.txt", "requests==2.31\nflask==3.0\n")
+    (golden / "lib.bin").write_bytes(b"\x00\x01" * 10)
+    (drift / "lib.bin").write_bytes(b"\x00\x02" * 10)
+    g = classify_files(golden, extract_repo_tree(golden))
+    c = classify_files(drift, extract_repo_tree(drift))
+    return golden, drift, diff_structural(g, c)
+
+
+def test_pooled_detectors_match_sequential(tmp_path):
+    golden, drift, file_changes = _make_pair(tmp_path)
+    sequential = run_detectors(golden, drift, file_changes, workers=1)
+    try:
+        pooled = run_detectors(golden, drift, file_changes, workers=2)
+    finally:
+        shutdown_detector_pool()
+
+    assert json.dumps(pooled, default=str) == json.dumps(sequential, default=str)
+    assert len(sequential["config_diff"]["changed"]) == 40
+    assert sequential["code_hunks"] and sequential["binary_deltas"]
+
+
+def test_detectors_only_parse_changed_files(tmp_path, monkeypatch):
+    from shared.drift_analyzer import drift_v1
+
+    golden, drift, file_changes = _make_pair(tmp_path)
+    for i in range(30):
+        # unchanged profiles on both sides
+        _write(golden, f"static{i}/application-dev.yml", "a: 1\n")
+        _write(drift, f"static{i}/application-dev.yml", "a: 1\n")
+    _write(golden, "old/application-qa.yml", "q: 1\n")
+    _write(drift, "new/application-qa.yml", "q: 1\n")
+    g = classify_files(golden, extract_repo_tree(golden))
+    c = classify_files(drift, extract_repo_tree(drift))
+    file_changes = diff_structural(g, c)
+    changed = drift_v1._changed_set(file_changes)
+    assert "old/application-qa.yml" in changed and "new/application-qa.yml" in changed
+
+    full = drift_v1.detector_spring_profiles(golden, drift)
+    parsed = []
+    real_parse = drift_v1._parse_config
+    monkeypatch.setattr(drift_v1, "_parse_config", lambda p: parsed.append(p) or real_parse(p))
+    driven = drift_v1.detector_spring_profiles(golden, drift, changed)
+
+    assert driven == full
+    assert not any("static" in str(p) for p in parsed)
+    assert drift_v1.detector_jenkinsfiles(golden, drift, changed) == drift_v1.detector_jenkinsfiles(golden, drift)
+
+
+def test_pooled_units_run_scoped_and_report_cache_counters(tmp_path, monkeypatch):
+    from shared.drift_analyzer import AnalysisSession, caches, detector_executor
+
+    golden, drift, file_changes = _make_pair(tmp_path)
+
+    # A unit reads through its own blob run, never the process-wide store
+    monkeypatch.setattr(caches, "_default_file_blobs", None)
+    monkeypatch.setattr(caches, "_parse_cache", caches.ParseCache(None))
+    rels = [f"svc{i}/app.properties" for i in range(3)]
+    res, stats = detector_executor._run_unit(detector_executor._semantic_config_diff, (golden, drift, rels))
+    assert len(res["changed"]) == 3
+    assert stats["file_blobs"]["misses"] == 6
+    assert stats["parse_cache"]["misses"] == 6
+    assert caches.get_file_blobs().stats()["files"] == 0
+
+    session = AnalysisSession(golden, drift)
+    try:
+        with session:
+            run_detectors(golden, drift, file_changes, workers=2, session=session)
+            pooled = session.cache_stats()
+        first_pool = detector_executor._get_pool(2)
+        assert detector_executor._get_pool(3) is not first_pool
+        assert detector_executor._pool_workers == 3
+    finally:
+        shutdown_detector_pool()
+    # 40 changed config files, two sides, parsed in the workers
+    assert pooled["parse_cache"]["hits"] + pooled["parse_cache"]["misses"] >= 80
+    assert pooled["file_blobs"]["misses"] >= 80
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the drift scanner caches (file fingerprints, per-run file blobs).
+"""
+
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.drift_analyzer.caches import (
+    FingerprintCache,
+    FileBlobStore,
+    begin_file_blob_run,
+    end_file_blob_run,
+    get_file_blobs,
+)
+from shared.drift_analyzer.drift_v1 import _is_text, _load_text, _parse_config
+
+
+def _age(p: Path, seconds: int = 60) -> None:
+    # push mtime out of the racy window so the digest is cacheable
+    t = time.time() - seconds
+    os.utime(p, (t, t))
+
+
+def test_fingerprint_cache_hits_survive_reopen(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    (root / "a.yml").write_text("a: 1\n")
+    (root / "b.properties").write_text("b=2\n")
+    for p in root.iterdir():
+        _age(p)
+    db = str(tmp_path / "fp.sqlite3")
+
+    fc = FingerprintCache(db)
+    tid = fc.tree_id(root)
+    first = {rel: fc.digest(tid, root, rel, (root / rel).stat()) for rel in ("a.yml", "b.properties")}
+    fc.flush()
+    assert fc.stats()["misses"] == 2
+    assert first["a.yml"] == hashlib.sha256(b"a: 1\n").hexdigest()
+
+    # A fresh instance reads digests back from sqlite
+    fc2 = FingerprintCache(db)
+    again = {rel: fc2.digest(tid, root, rel, (root / rel).stat()) for rel in first}
+    assert again == first
+    assert fc2.stats() == {"algo": "sha256", "hits": 2, "misses": 0, "persistent": True}
+
+    # Content change -> new (size, mtime) key -> re-hashed
+    (root / "a.yml").write_text("a: 22\n")
+    _age(root / "a.yml", 30)
+    changed = fc2.digest(tid, root, "a.yml", (root / "a.yml").stat())
+    assert changed == hashlib.sha256(b"a: 22\n").hexdigest()
+    assert fc2.stats(reset=True)["misses"] == 1
+    assert fc2.stats()["hits"] == 0
+
+
+def test_fingerprint_cache_skips_racy_files(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    (root / "fresh.yml").write_text("x: 1\n")
+
+    fc = FingerprintCache(None)
+    tid = fc.tree_id(root)
+    fc.digest(tid, root, "fresh.yml", (root / "fresh.yml").stat())
+    fc.digest(tid, root, "fresh.yml", (root / "fresh.yml").stat())
+    # just-written file is never served from the cache
+    assert fc.stats()["hits"] == 0
+
+
+def test_fast_mode_uses_non_sha_digest(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    (root / "a.yml").write_text("a: 1\n")
+    fc = FingerprintCache(None, mode="fast")
+    d = fc.digest(fc.tree_id(root), root, "a.yml", (root / "a.yml").stat())
+    assert fc.algo != "sha256"
+    assert len(d) == 32
+
+
+def test_blob_store_reads_each_file_once(tmp_path):
+    cfg = tmp_path / "application.yml"
+    cfg.write_bytes(b"server:\r\n  port: 8080\r\n")
+
+    outer = get_file_blobs()
+    token = begin_file_blob_run()
+    run_store = get_file_blobs()
+    try:
+        assert run_store is not outer
+        assert _is_text(cfg)
+        assert _load_text(cfg) == "server:\n  port: 8080\n"
+        assert _parse_config(cfg) == {"server": {"port": 8080}}
+        stats = run_store.stats()
+        assert stats["misses"] == 1 and stats["hits"] >= 2
+    finally:
+        end_file_blob_run(token)
+    assert run_store.stats()["files"] == 0
+    assert get_file_blobs() is outer
+
+
+def test_blob_store_bounds_and_invalidation(tmp_path):
+    store = FileBlobStore(max_bytes=64, max_file_bytes=32)
+    small = [tmp_path / f"f{i}.txt" for i in range(4)]
+    for i, p in enumerate(small):
+        p.write_bytes(bytes([65 + i]) * 20)
+    for p in small:
+        store.read(p)
+    stats = store.stats()
+    assert stats["bytes_used"] <= 64 and stats["evictions"] >= 1
+
+    big = tmp_path / "big.bin"
+    big.write_bytes(b"\x00" * 1000)
+    assert store.head(big, 8) == b"\x00" * 8
+    assert store.stats()["files"] == stats["files"]  # large files are never buffered
+
+    small[-1].write_bytes(b"changed")
+    assert store.read(small[-1]) == b"changed"
+
+
+def test_parse_cache_parses_each_content_once(tmp_path, monkeypatch):
+    from shared.drift_analyzer import caches, drift_v1
+
+    db = str(tmp_path / "parsed.sqlite3")
+    monkeypatch.setattr(caches, "_parse_cache", caches.ParseCache(db))
+    golden, drift = tmp_path / "golden", tmp_path / "drift"
+    for root, port in ((golden, 8080), (drift, 9090)):
+        (root / "config").mkdir(parents=True)
+        (root / "config" / "application-prod.yml").write_text(f"server:\n  port: {port}\n  hosts: [a, b]\n")
+
+    parsed = []
+    real_parse = drift_v1._parse_config
+    monkeypatch.setattr(drift_v1, "_parse_config", lambda p: parsed.append(p) or real_parse(p))
+
+    rel = "config/application-prod.yml"
+    conf = drift_v1._semantic_config_diff(golden, drift, [rel])
+    spring = drift_v1.detector_spring_profiles(golden, drift, [rel])
+    assert conf["changed"] == {f"{rel}.server.port": {"from": 8080, "to": 9090}}
+    assert [d["id"] for d in spring] == [f"spring~{rel}.server.port"]
+    assert len(parsed) == 2  # one parse per side, shared by both detectors
+
+    # Persisted: a new process-wide cache answers from sqlite without parsing
+    monkeypatch.setattr(caches, "_parse_cache", caches.ParseCache(db))
+    parsed.clear()
+    assert drift_v1._semantic_config_diff(golden, drift, [rel]) == conf
+    assert parsed == []
+    assert caches.get_parse_cache().stats()["hits"] == 2
+
+
+def test_fingerprints_carry_over_between_run_directories(tmp_path, monkeypatch):
+    """Collector flow: each run materializes the branch into a fresh directory, then classifies it."""
+    import subprocess
+    from shared.drift_analyzer import caches, classify_files, extract_repo_tree
+    from shared.repo_cache import RepoMirrorCache
+
+    src = tmp_path / "service-repo"
+    (src / "config").mkdir(parents=True)
+    (src / "config" / "application.yml").write_text("server:\n  port: 8080\n")
+    (src / "Dockerfile").write_text("FROM python:3.11\n")
+    git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.run(git + ["init", "-q", "-b", "main", str(src)], check=True)
+    subprocess.run(git + ["add", "."], cwd=src, check=True)
+    subprocess.run(git + ["commit", "-qm", "initial"], cwd=src, check=True)
+
+    db = str(tmp_path / "fp.sqlite3")
+    cache = RepoMirrorCache(tmp_path / "mirrors", max_bytes=10 ** 9)
+    runs = []
+    for run in ("run1", "run2"):
+        # each run is a new process in production: fresh cache object, same sqlite file
+        monkeypatch.setattr(caches, "_fingerprint_cache", FingerprintCache(db))
+        dest = tmp_path / run / "golden"
+        with cache.lease(str(src)) as mirror:
+            mirror.materialize("main", dest)
+        paths = extract_repo_tree(dest)
+        assert paths == ["Dockerfile", "config/application.yml"]
+        runs.append((classify_files(dest, paths), caches.get_fingerprint_cache().stats()))
+        caches.get_fingerprint_cache().flush()
+
+    (first, first_stats), (second, second_stats) = runs
+    assert [f["sha256"] for f in first] == [f["sha256"] for f in second]
+    assert first[0]["sha256"] == hashlib.sha256(b"FROM python:3.11\n").hexdigest()
+    assert (first_stats["hits"], first_stats["misses"]) == (0, 2)
+    assert (second_stats["hits"], second_stats["misses"]) == (2, 0)
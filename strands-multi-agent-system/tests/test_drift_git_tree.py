@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Unit tests for tree-to-tree change detection from git objects.
+
+Checks that diff_git_trees() agrees with the checkout-based diff_structural().
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.drift_analyzer import (
+    extract_repo_tree,
+    classify_files,
+    diff_structural,
+    extract_git_tree,
+    diff_git_trees,
+    changed_paths_by_side,
+)
+
+
+def _git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, stdout=subprocess.PIPE, text=True
+    ).stdout.strip()
+
+
+def _checkout(src: Path, rev: str, dest: Path) -> Path:
+    _git(src, "worktree", "add", "-q", "--detach", str(dest), rev)
+    return dest
+
+
+def test_git_tree_diff_matches_checkout_diff(tmp_path):
+    src = tmp_path / "repo"
+    (src / "config").mkdir(parents=True)
+    (src / "config" / "application.yml").write_text("server:\n  port: 8080\n")
+    (src / "config" / "old-name.properties").write_text("a=1\n")
+    (src / "obsolete.txt").write_text("gone\n")
+    (src / ".hidden").write_text("skip\n")
+    _git(tmp_path, "init", "-q", "-b", "main", str(src))
+    _git(src, "add", ".")
+    _git(src, "commit", "-qm", "golden")
+    golden = _git(src, "rev-parse", "HEAD")
+
+    (src / "config" / "application.yml").write_text("server:\n  port: 9090\n")
+    _git(src, "mv", "config/old-name.properties", "config/new-name.properties")
+    _git(src, "rm", "-q", "obsolete.txt")
+    (src / "Dockerfile").write_text("FROM alpine\n")
+    (src / ".hidden").write_text("changed\n")
+    _git(src, "add", ".")
+    _git(src, "commit", "-qm", "drift")
+    drift = _git(src, "rev-parse", "HEAD")
+
+    git_dir = src / ".git"
+    git_changes = diff_git_trees(git_dir, golden, drift)
+
+    g_root = _checkout(src, golden, tmp_path / "golden")
+    c_root = _checkout(src, drift, tmp_path / "drift")
+    fs_changes = diff_structural(
+        classify_files(g_root, extract_repo_tree(g_root)),
+        classify_files(c_root, extract_repo_tree(c_root)),
+    )
+
+    for kind in ("added", "removed", "modified", "renamed"):
+        assert sorted(map(str, git_changes[kind])) == sorted(map(str, fs_changes[kind])), kind
+
+    records = {f["path"]: f for f in extract_git_tree(git_dir, drift)}
+    assert ".hidden" not in records
+    assert records["config/application.yml"]["file_type"] == "config"
+
+    golden_needed, drift_needed = changed_paths_by_side(git_changes)
+    assert set(golden_needed) == {"config/application.yml", "config/old-name.properties", "obsolete.txt"}
+    assert set(drift_needed) == {"config/application.yml", "config/new-name.properties", "Dockerfile"}
+
+
+def test_parallel_scan_matches_sequential(tmp_path):
+    from shared.drift_analyzer.drift_v1 import _tree, _classify
+
+    root = tmp_path / "tree"
+    for d in range(6):
+        for sub in ("config", "src/main/resources", ".hidden"):
+            (root / f"svc{d}" / sub).mkdir(parents=True)
+            for i in range(60):
+                (root / f"svc{d}" / sub / f"f{i}.yml").write_text(f"k{i}: {d}\n")
+    (root / ".git").mkdir()
+    (root / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    (root / ".env").write_text("X=1\n")
+
+    expected = sorted(
+        str(p.relative_to(root)).replace("\\", "/") for p in root.rglob("*")
+        if p.is_file() and not str(p.relative_to(root)).startswith(".")
+    )
+    assert _tree(root, workers=1) == expected
+    assert _tree(root, workers=8) == expected
+
+    seq = _classify(root, expected, workers=1)
+    par = _classify(root, expected, workers=8)
+    assert par == seq
+    assert [r["path"] for r in par] == expected
+
+
+def test_exact_renames_linear_on_identical_files():
+    import time
+
+    # thousands of identical (empty) files moved: the old heuristic was quadratic here
+    g_files = [{"path": f"old/pkg{i}/__init__.py", "sha256": "e3b0"} for i in range(3000)]
+    c_files = [{"path": f"new/pkg{i}/__init__.py", "sha256": "e3b0"} for i in range(3000)]
+    start = time.time()
+    changes = diff_structural(g_files, c_files)
+    assert time.time() - start < 2
+    assert changes["added"] == [] and changes["removed"] == []
+    assert changes["renamed"][0] == {"from": "old/pkg0/__init__.py", "to": "new/pkg0/__init__.py"}
+    assert len(changes["renamed"]) == 3000
+
+
+def test_moved_and_edited_file_is_a_rename(tmp_path):
+    body = "".join(f"key{i}=value{i}\n" for i in range(20))
+    src = tmp_path / "repo"
+    (src / "config").mkdir(parents=True)
+    (src / "config" / "app.properties").write_text(body)
+    (src / "unrelated.txt").write_text("something else entirely\n")
+    _git(tmp_path, "init", "-q", "-b", "main", str(src))
+    _git(src, "add", ".")
+    _git(src, "commit", "-qm", "golden")
+    golden = _git(src, "rev-parse", "HEAD")
+
+    _git(src, "mv", "config/app.properties", "config/app-prod.properties")
+    (src / "config" / "app-prod.properties").write_text(body.replace("value3\n", "changed\n"))
+    _git(src, "rm", "-q", "unrelated.txt")
+    (src / "brand-new.txt").write_text("nothing in common\n")
+    _git(src, "add", ".")
+    _git(src, "commit", "-qm", "drift")
+    drift = _git(src, "rev-parse", "HEAD")
+
+    g_root = _checkout(src, golden, tmp_path / "golden")
+    c_root = _checkout(src, drift, tmp_path / "drift")
+    fs_changes = diff_structural(
+        classify_files(g_root, extract_repo_tree(g_root)),
+        classify_files(c_root, extract_repo_tree(c_root)),
+        g_root, c_root,
+    )
+    git_changes = diff_git_trees(src / ".git", golden, drift)
+
+    for changes in (fs_changes, git_changes):
+        (rn,) = changes["renamed"]
+        assert (rn["from"], rn["to"]) == ("config/app.properties", "config/app-prod.properties")
+        assert 50 <= rn["similarity"] < 100
+        assert changes["added"] == ["brand-new.txt"] and changes["removed"] == ["unrelated.txt"]
+
+    # the moved file is diffed against its golden path, keys reported under the new path
+    from shared.drift_analyzer import run_detectors
+    conf = run_detectors(g_root, c_root, fs_changes, workers=1)["config_diff"]
+    assert conf["changed"] == {"config/app-prod.properties.key3": {"from": "value3", "to": "changed"}}
+    assert conf["added"] == {} and conf["removed"] == {}
+
+    # exact-only mode keeps the old add + remove
+    exact = diff_git_trees(src / ".git", golden, drift, "100%")
+    assert exact["renamed"] == [] and "config/app-prod.properties" in exact["added"]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for key -> line-range locators of config deltas.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.drift_analyzer import AnalysisSession, drift_v1
+
+
+YAML_TEXT = """\
+server:
+  port: 8080
+management:
+  server:
+    port: 9090   # same leaf key, different path
+  endpoints:
+    - health
+    - info
+"""
+
+
+def test_yaml_index_maps_full_paths_to_exact_lines(tmp_path):
+    p = tmp_path / "application.yml"
+    p.write_text(YAML_TEXT)
+    lines = drift_v1._key_index(p)
+    assert lines["server.port"] == [2, 2]
+    assert lines["management.server.port"] == [5, 5]
+    assert lines["management.endpoints"] == [6, 8]
+    assert lines["management"] == [3, 8]
+
+
+def test_properties_toml_xml_indexes(tmp_path):
+    props = tmp_path / "app.properties"
+    props.write_text("# c\na.b=1\n\nc=2\n")
+    assert drift_v1._key_index(props) == {"a.b": [2, 2], "c": [4, 4]}
+
+    toml = tmp_path / "pyproject.toml"
+    toml.write_text('[tool.x]\nname = "a"\nitems = [\n  1,\n  2,\n]\n')
+    lines = drift_v1._key_index(toml)
+    assert lines["tool.x.name"] == [2, 2]
+    assert lines["tool.x.items"] == [3, 6]
+
+    xml = tmp_path / "pom.xml"
+    xml.write_text('<project>\n  <version>1</version>\n  <build id="b">\n    <dir>x</dir>\n  </build>\n</project>\n')
+    lines = drift_v1._key_index(xml)
+    assert set(drift_v1._parsed(xml)["flat"]) <= set(lines)
+    assert lines["project.version"] == [2, 2]
+    assert lines["project.build[@id]"] == [3, 3]
+    assert lines["project.build"] == [3, 5]
+
+
+def test_config_deltas_carry_file_and_line_range(tmp_path):
+    golden, drift = tmp_path / "golden", tmp_path / "drift"
+    for root, port in ((golden, 9090), (drift, 9191)):
+        (root / "config").mkdir(parents=True)
+        (root / "config" / "application.yml").write_text(YAML_TEXT.replace("9090", str(port)))
+    rel = "config/application.yml"
+    conf = drift_v1._semantic_config_diff(golden, drift, [rel])
+
+    (delta,) = drift_v1._build_config_deltas(conf, AnalysisSession(golden, drift))
+    assert delta["file"] == rel
+    assert delta["locator"]["value"] == f"{rel}.management.server.port"
+    assert (delta["locator"]["line_start"], delta["locator"]["line_end"]) == (5, 5)
+
+
+def test_merge_matches_hunks_by_line_interval(tmp_path):
+    golden, drift = tmp_path / "golden", tmp_path / "drift"
+    base = [f"key{i}: v{i}\n" for i in range(40)]
+    edited = list(base)
+    edited[2] = "key2: changed\n"
+    edited[30] = "key30: changed\n"
+    golden.mkdir(); drift.mkdir()
+    (golden / "app.yml").write_text("".join(base))
+    (drift / "app.yml").write_text("".join(edited))
+    (golden / "notes.txt").write_text("a\n")
+    (drift / "notes.txt").write_text("b\n")
+
+    conf = drift_v1._semantic_config_diff(golden, drift, ["app.yml"])
+    hunks = []
+    for rel in ("app.yml", "notes.txt"):
+        hunks += drift_v1._hunks_for_file(golden / rel, drift / rel, rel)[0]
+    merged = drift_v1._merge_deltas(drift_v1._build_config_deltas(conf, AnalysisSession(golden, drift)) + hunks)
+
+    by_id = {d["id"]: d for d in merged}
+    k2, k30 = by_id["cfg~app.yml.key2"], by_id["cfg~app.yml.key30"]
+    assert k2["hunk_info"]["old_start"] <= 3 <= k2["hunk_info"]["old_start"] + k2["hunk_info"]["old_lines"]
+    assert k30["hunk_info"]["old_start"] <= 31 <= k30["hunk_info"]["old_start"] + k30["hunk_info"]["old_lines"]
+    assert k2["code_snippet"] != k30["code_snippet"]
+    # the unrelated text hunk stays a separate delta
+    assert [d["file"] for d in merged if d["detection_sources"] == ["code_hunk"]] == ["notes.txt"]
+
+
+def test_merge_scales_to_many_hunks():
+    import time
+
+    hunks = [{"id": f"h{i}", "category": "code_hunk", "file": "big.yml", "snippet": f"@@ {i}",
+              "locator": {"old_start": i * 10 + 1, "old_lines": 3, "new_start": i * 10 + 1, "new_lines": 3}}
+             for i in range(3000)]
+    deltas = [{"id": f"cfg~big.yml.k{i}", "category": "config", "file": "big.yml", "old": 1, "new": 2,
+               "locator": {"type": "yamlpath", "value": f"big.yml.k{i}", "line_start": i * 10 + 2}}
+              for i in range(3000)]
+    start = time.time()
+    merged = drift_v1._merge_deltas(deltas + hunks)
+    assert time.time() - start < 2
+    assert all(d["code_snippet"] == f"@@ {i}" for i, d in enumerate(merged[:3000]))
+    assert len(merged) == 3000
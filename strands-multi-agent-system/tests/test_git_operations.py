@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Unit tests for git object-level branch operations.
+
+Uses throwaway local repositories as the "remote" (no network access required).
+"""
+
+import fnmatch
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import shared.git_operations as git_operations
+import shared.repo_cache as repo_cache
+from shared.git_operations import (
+    CatFileBatchPool,
+    RefCache,
+    check_branch_exists,
+    clone_branch_worktree,
+    compile_path_matcher,
+    create_config_only_branch,
+    create_config_only_snapshot,
+    create_selective_golden_branch,
+    delete_remote_branch,
+    list_branches_by_pattern,
+    publish_snapshot_branch,
+)
+
+CONFIG_PATTERNS = ["*.yml", "*.properties", "Dockerfile", "config/**"]
+
+
+def _git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, stdout=subprocess.PIPE, text=True
+    ).stdout.strip()
+
+
+def _make_remote(root: Path) -> Path:
+    src = root / "work"
+    (src / "src" / "main" / "resources").mkdir(parents=True)
+    (src / "config").mkdir()
+    (src / "src" / "main" / "resources" / "application.yml").write_text("server:\n  port: 8080\n")
+    (src / "src" / "main" / "App.java").write_text("class App {}\n")
+    (src / "config" / "settings.json").write_text("{}\n")
+    (src / "Dockerfile").write_text("FROM alpine\n")
+    (src / "README.md").write_text("readme\n")
+    _git(root, "init", "-q", "-b", "main", str(src))
+    _git(src, "add", ".")
+    _git(src, "commit", "-qm", "initial")
+    remote = root / "remote.git"
+    _git(root, "clone", "-q", "--bare", str(src), str(remote))
+    return remote
+
+
+def test_compiled_matcher_agrees_with_fnmatch_loop():
+    paths = ["a.yml", "deep/dir/b.yml", "config/x/y.json", "Dockerfile", "src/Dockerfile",
+             "README.md", "app.properties.bak", "configs/z.json"]
+    matches = compile_path_matcher(CONFIG_PATTERNS)
+    for path in paths:
+        expected = any(fnmatch.fnmatch(path, p) or fnmatch.fnmatch(os.path.basename(path), p)
+                       for p in CONFIG_PATTERNS)
+        assert matches(path) == expected, path
+    assert not compile_path_matcher([])("a.yml")
+
+
+def test_create_config_only_branch_without_checkout(tmp_path, monkeypatch):
+    remote = _make_remote(tmp_path)
+    monkeypatch.setenv("GIT_USER_NAME", "drift-bot")
+    monkeypatch.setenv("GIT_USER_EMAIL", "drift-bot@example.com")
+    monkeypatch.setattr(repo_cache, "_default_cache",
+                        repo_cache.RepoMirrorCache(tmp_path / "mirrors", max_bytes=10 ** 9))
+
+    assert create_config_only_branch(str(remote), "main", "drift_prod_1", CONFIG_PATTERNS)
+
+    files = _git(remote, "ls-tree", "-r", "--name-only", "drift_prod_1").splitlines()
+    assert sorted(files) == ["Dockerfile", "config/settings.json", "src/main/resources/application.yml"]
+    # Orphan commit, identity from env
+    assert _git(remote, "rev-list", "--count", "drift_prod_1") == "1"
+    assert _git(remote, "log", "-1", "--format=%an", "drift_prod_1") == "drift-bot"
+
+    # The mirror ref is updated alongside the push
+    mirror = repo_cache.get_repo_cache().get_mirror(str(remote))
+    assert mirror.resolve("drift_prod_1") == _git(remote, "rev-parse", "drift_prod_1")
+
+
+def test_ref_cache_serves_lookups_and_invalidates_after_push(tmp_path, monkeypatch):
+    remote = _make_remote(tmp_path)
+    _git(remote, "branch", "drift_prod_1", "main")
+    _git(remote, "branch", "drift_prod_2", "main")
+    cache = RefCache(ttl=3600)
+    monkeypatch.setattr(git_operations, "_ref_cache", cache)
+
+    assert check_branch_exists(str(remote), "drift_prod_1")
+    assert not check_branch_exists(str(remote), "golden_prod_1")
+    assert list_branches_by_pattern(str(remote), "drift_prod_*") == ["drift_prod_1", "drift_prod_2"]
+
+    # Changes made behind our back are not seen until the TTL expires
+    _git(remote, "branch", "drift_prod_3", "main")
+    assert not check_branch_exists(str(remote), "drift_prod_3")
+
+    # Our own delete invalidates the cache, so the next lookup sees the new state
+    assert delete_remote_branch(str(remote), "drift_prod_1")
+    assert list_branches_by_pattern(str(remote), "drift_prod_*") == ["drift_prod_2", "drift_prod_3"]
+
+
+
+def test_ref_cache_drops_listing_that_raced_an_invalidate(monkeypatch):
+    cache = RefCache(ttl=3600)
+    listings = ["aaa\trefs/heads/drift_prod_1\n", "bbb\trefs/heads/drift_prod_2\n"]
+    calls = []
+
+    def ls_remote(self, *args):
+        calls.append(args)
+        if len(calls) == 1:
+            # a push lands (and invalidates) while this listing is in flight
+            cache.invalidate("https://gitlab.example.com/team/svc.git")
+        return listings[len(calls) - 1]
+
+    monkeypatch.setattr(git_operations.git.cmd.Git, "ls_remote", ls_remote, raising=False)
+    monkeypatch.setattr(git_operations, "setup_git_auth", lambda url, token=None: url)
+
+    url = "https://gitlab.example.com/team/svc.git"
+    assert cache.heads(url) == {"drift_prod_1": "aaa"}
+    # the stale listing was not stored: the next lookup lists again
+    assert cache.heads(url) == {"drift_prod_2": "bbb"}
+    assert cache.heads(url) == {"drift_prod_2": "bbb"}
+    assert len(calls) == 2
+
+def test_snapshot_is_local_until_published(tmp_path, monkeypatch):
+    remote = _make_remote(tmp_path)
+    monkeypatch.setenv("GIT_USER_NAME", "drift-bot")
+    monkeypatch.setenv("GIT_USER_EMAIL", "drift-bot@example.com")
+    monkeypatch.setattr(repo_cache, "_default_cache",
+                        repo_cache.RepoMirrorCache(tmp_path / "mirrors", max_bytes=10 ** 9))
+
+    snapshot = create_config_only_snapshot(str(remote), "main", "drift_prod_1", CONFIG_PATTERNS)
+    assert snapshot and not snapshot["pushed"]
+    assert snapshot["source_commit"] == _git(remote, "rev-parse", "main")
+    assert not check_branch_exists(str(remote), "drift_prod_1")
+
+    # Mirror evicted: publishing rebuilds the identical commit from the source commit
+    monkeypatch.setattr(repo_cache, "_default_cache",
+                        repo_cache.RepoMirrorCache(tmp_path / "mirrors2", max_bytes=10 ** 9))
+    assert publish_snapshot_branch(str(remote), snapshot)
+    assert _git(remote, "rev-parse", "drift_prod_1") == snapshot["commit"]
+    assert check_branch_exists(str(remote), "drift_prod_1")
+
+
+def test_partial_worktree_clone_checks_out_config_files_only(tmp_path):
+    remote = _make_remote(tmp_path)
+    _git(remote, "config", "uploadpack.allowFilter", "true")
+
+    repo = clone_branch_worktree(f"file://{remote}", str(tmp_path / "wt"), "main", "partial", CONFIG_PATTERNS)
+    root = Path(repo.working_tree_dir)
+    assert (root / "src" / "main" / "resources" / "application.yml").exists()
+    assert (root / "Dockerfile").exists()
+    assert not (root / "src" / "main" / "App.java").exists()
+    missing = _git(root, "rev-list", "--objects", "--missing=print", "HEAD")
+    assert missing.count("?") == 2  # App.java and README.md blobs never fetched
+
+
+def test_selective_certification_by_tree_surgery(tmp_path, monkeypatch):
+    remote = _make_remote(tmp_path)
+    work = tmp_path / "work"
+    monkeypatch.setenv("GIT_USER_NAME", "drift-bot")
+    monkeypatch.setenv("GIT_USER_EMAIL", "drift-bot@example.com")
+    monkeypatch.setattr(repo_cache, "_default_cache",
+                        repo_cache.RepoMirrorCache(tmp_path / "mirrors", max_bytes=10 ** 9))
+    assert create_config_only_branch(str(remote), "main", "golden_prod_1", CONFIG_PATTERNS)
+
+    (work / "src" / "main" / "resources" / "application.yml").write_text("server:\n  port: 9090\n")
+    (work / "Dockerfile").write_text("FROM ubuntu\n")
+    _git(work, "commit", "-qam", "drift")
+    _git(work, "push", "-q", str(remote), "main")
+    snapshot = create_config_only_snapshot(str(remote), "main", "drift_prod_1", CONFIG_PATTERNS)
+    assert snapshot
+
+    # Drift snapshot was never pushed: certification reads it from the mirror
+    approved = ["src/main/resources/application.yml", "does/not/exist.yml"]
+    assert create_selective_golden_branch(str(remote), "golden_prod_1", "drift_prod_1", "golden_prod_2",
+                                          approved, CONFIG_PATTERNS)
+
+    def show(path):
+        return _git(remote, "show", f"golden_prod_2:{path}")
+    assert show("src/main/resources/application.yml") == "server:\n  port: 9090"
+    assert show("Dockerfile") == "FROM alpine"  # rejected: kept from old golden
+    assert sorted(_git(remote, "ls-tree", "-r", "--name-only", "golden_prod_2").splitlines()) == \
+        sorted(_git(remote, "ls-tree", "-r", "--name-only", "golden_prod_1").splitlines())
+    assert not check_branch_exists(str(remote), "drift_prod_1")
+
+
+def test_cat_file_pool_reads_concurrently_and_restarts_dead_workers(tmp_path):
+    import threading
+    remote = _make_remote(tmp_path)
+    entries = [line.split() for line in _git(remote, "ls-tree", "-r", "main").splitlines()]
+    oids = {path: oid for _mode, _type, oid, path in entries}
+    expected = {oid: _git(remote, "cat-file", "blob", oid) for oid in oids.values()}
+
+    pool = CatFileBatchPool(str(remote), max_workers=2)
+    names = list(expected) * 200 + ["0" * 40]
+    errors = []
+
+    def read():
+        try:
+            results = pool.read_many(names)
+            assert results[-1] is None
+            assert [r.decode().strip() for r in results[:-1]] == [expected[n] for n in names[:-1]]
+        except Exception as e:  # surfaced below
+            errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(pool._workers) <= 2
+
+    for worker in pool._workers:
+        worker._proc.kill()
+        worker._proc.wait()
+    assert pool.read_blob("main:Dockerfile") == b"FROM alpine\n"
+    pool.close()
+
+
+
+
+def test_cat_file_names_with_spaces_and_newlines(tmp_path):
+    import pytest
+    remote = _make_remote(tmp_path)
+    pool = CatFileBatchPool(str(remote), max_workers=1)
+    # "main:no pe missing" has three tokens like "<oid> <type> <size>"
+    assert pool.read_many(["main:no pe", "main:Dockerfile"]) == [None, b"FROM alpine\n"]
+    worker = pool._workers[0]
+    with pytest.raises(ValueError):
+        pool.read_many(["main:Dockerfile\nmain:README.md"])
+    # rejected before reaching the worker, which stays in service
+    assert pool._workers == [worker] and pool.read_blob("main:README.md") == b"readme\n"
+    pool.close()
+
+
+def test_subset_materialize_reads_blobs_through_the_pool(tmp_path, monkeypatch):
+    remote = _make_remote(tmp_path)
+    cache = repo_cache.RepoMirrorCache(tmp_path / "mirrors", max_bytes=10 ** 9)
+    reads = []
+    real_read_many = CatFileBatchPool.read_many
+    monkeypatch.setattr(CatFileBatchPool, "read_many", lambda self, names: reads.append(names) or real_read_many(self, names))
+
+    with cache.lease(str(remote)) as mirror:
+        dest = mirror.materialize("main", tmp_path / "drift", ["Dockerfile", "src/main/App.java"])
+    assert sorted(str(p.relative_to(dest)) for p in dest.rglob("*") if p.is_file()) == [
+        ".drift-source", "Dockerfile", "src/main/App.java"]
+    assert (dest / "src" / "main" / "App.java").read_text() == "class App {}\n"
+    assert len(reads) == 1 and len(reads[0]) == 2
+    git_operations.close_cat_file_pool(str(mirror.path))
+
+def test_cat_file_pool_waiter_wakes_when_a_worker_is_discarded(tmp_path):
+    import threading
+    remote = _make_remote(tmp_path)
+    pool = CatFileBatchPool(str(remote), max_workers=1)
+    busy = pool._acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.read_blob("main:Dockerfile")))
+    waiter.start()
+    waiter.join(timeout=0.2)
+    assert waiter.is_alive()  # every worker is checked out
+
+    # the borrower's worker desynced: its slot goes to the waiter
+    pool._discard(busy)
+    waiter.join(timeout=5)
+    assert got == [b"FROM alpine\n"]
+
+    # closing the pool fails waiters instead of leaving them blocked
+    busy = pool._acquire()
+    errors = []
+
+    def wait_closed():
+        try:
+            pool._acquire()
+        except RuntimeError as e:
+            errors.append(e)
+
+    waiters = [threading.Thread(target=wait_closed) for _ in range(3)]
+    for t in waiters:
+        t.start()
+    pool.close()
+    for t in waiters:
+        t.join(timeout=5)
+    assert len(errors) == 3
+    busy.close()
+
+def test_shallow_strategy_never_clones_a_mirror(tmp_path, monkeypatch):
+    remote = _make_remote(tmp_path)
+    work = tmp_path / "work"
+    monkeypatch.setenv("GIT_USER_NAME", "drift-bot")
+    monkeypatch.setenv("GIT_USER_EMAIL", "drift-bot@example.com")
+    for var in ("GIT_AUTHOR", "GIT_COMMITTER"):  # the clone path commits in a worktree
+        monkeypatch.setenv(f"{var}_NAME", "drift-bot")
+        monkeypatch.setenv(f"{var}_EMAIL", "drift-bot@example.com")
+    monkeypatch.setattr(repo_cache, "REPO_FETCH_STRATEGY", "shallow")
+    cache = repo_cache.RepoMirrorCache(tmp_path / "mirrors", max_bytes=10 ** 9)
+    monkeypatch.setattr(repo_cache, "_default_cache", cache)
+    fetches = []
+    monkeypatch.setattr(repo_cache.RepoMirror, "fetch", lambda self, **kw: fetches.append(kw))
+
+    assert create_config_only_branch(f"file://{remote}", "main", "golden_prod_1", CONFIG_PATTERNS)
+    (work / "Dockerfile").write_text("FROM ubuntu\n")
+    _git(work, "commit", "-qam", "drift")
+    _git(work, "push", "-q", str(remote), "main")
+    assert create_config_only_branch(f"file://{remote}", "main", "drift_prod_1", CONFIG_PATTERNS)
+    assert create_selective_golden_branch(f"file://{remote}", "golden_prod_1", "drift_prod_1", "golden_prod_2",
+                                          ["Dockerfile"], CONFIG_PATTERNS)
+
+    assert _git(remote, "show", "golden_prod_2:Dockerfile") == "FROM ubuntu"
+    assert fetches == []
+    assert not cache.cache_dir.exists() or not any(cache.cache_dir.iterdir())
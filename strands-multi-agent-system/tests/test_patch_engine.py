@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the in-process patch engine.
+
+Patches must apply with `git apply` and be served from the cache for content
+pairs that were already diffed.
+"""
+
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.drift_analyzer import drift_v1, patch_engine
+from shared.drift_analyzer.patch_engine import diff_hunks_text, unified_patch
+
+
+def _git(cwd: Path, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+
+
+def _assert_applies(tmp_path: Path, before: str, after: str, name: str = "f.txt") -> str:
+    repo = tmp_path / "repo"
+    repo.mkdir(exist_ok=True)
+    _git(repo, "init", "-q")
+    target = repo / name
+    target.write_bytes(before.encode())
+    other = tmp_path / ("after-" + name)
+    other.write_bytes(after.encode())
+    patch = unified_patch(target, other, name)
+    assert patch is not None
+    (tmp_path / "p.diff").write_text(patch)
+    res = _git(repo, "apply", "--whitespace=nowarn", str(tmp_path / "p.diff"))
+    assert res.returncode == 0, res.stderr + patch
+    assert target.read_bytes() == after.encode()
+    return patch
+
+
+def test_patches_apply_with_git(tmp_path):
+    rng = random.Random(7)
+    base = [f"line {i % 17}\n" if i % 5 else "}\n" for i in range(300)]
+    for n in range(10):
+        lines = list(base)
+        for _ in range(rng.randint(1, 25)):
+            i = rng.randrange(len(lines))
+            op = rng.random()
+            if op < 0.4:
+                lines[i] = f"edit {n}-{i}\n"
+            elif op < 0.7:
+                del lines[i]
+            else:
+                lines.insert(i, "}\n" if op < 0.8 else f"new {i}\n")
+        sub = tmp_path / f"case{n}"
+        sub.mkdir()
+        _assert_applies(sub, "".join(base), "".join(lines))
+
+
+def test_missing_final_newline_and_hunk_format(tmp_path):
+    patch = _assert_applies(tmp_path, "a\nb\nc", "a\nB\nc\nd\n")
+    assert patch.startswith("diff --git a/f.txt b/f.txt\n--- a/f.txt\n+++ b/f.txt\n@@ -1,3 +1,4 @@\n")
+    assert "\\ No newline at end of file" in patch
+    assert diff_hunks_text(["x\n"], ["x\n"]) == ""
+    assert diff_hunks_text([], ["x\n"]) == "@@ -0,0 +1 @@\n+x\n"
+
+
+def test_patches_are_cached_by_content(tmp_path, monkeypatch):
+    a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+    a.write_text("k: 1\n" * 3 + "port: 80\n")
+    b.write_text("k: 1\n" * 3 + "port: 81\n")
+    first = unified_patch(a, b, "x.yml")
+    calls = []
+    monkeypatch.setattr(patch_engine, "diff_hunks_text", lambda *args: calls.append(args) or "")
+    # same contents under another name: served from the cache, headers follow rel
+    assert unified_patch(a, b, "y.yml") == first.replace("x.yml", "y.yml")
+    assert not calls
+    (tmp_path / "bin").write_bytes(b"\x00\x01")
+    assert unified_patch(a, tmp_path / "bin", "bin") is None
+
+
+def test_hunks_for_file_uses_engine_without_subprocess(tmp_path, monkeypatch):
+    g, c = tmp_path / "g.py", tmp_path / "c.py"
+    g.write_text("def f():\n    return 1\n")
+    c.write_text("def f():\n    return 2\n")
+    monkeypatch.setattr(subprocess, "run", lambda *a, **k: (_ for _ in ()).throw(AssertionError("spawned")))
+    hunks, patch = drift_v1._hunks_for_file(g, c, "src/c.py")
+    assert patch.startswith("diff --git a/src/c.py b/src/c.py\n")
+    assert len(hunks) == 1
+    assert hunks[0]["locator"]["value"] == "src/c.py#1-2-1-2"
+    assert "-    return 2\n+    return 1" in hunks[0]["snippet"]
+
+
+def _lcs(a, b):
+    prev = [0] * (len(b) + 1)
+    for x in a:
+        cur = [0]
+        for j, y in enumerate(b):
+            cur.append(prev[j] + 1 if x == y else max(prev[j + 1], cur[j]))
+        prev = cur
+    return prev[-1]
+
+
+def test_myers_is_minimal_and_budget_keeps_patches_valid(tmp_path, monkeypatch):
+    rng = random.Random(3)
+    for _ in range(300):
+        a = [rng.randrange(4) for _ in range(rng.randrange(40))]
+        b = [rng.randrange(4) for _ in range(rng.randrange(40))]
+        assert len(patch_engine.line_matches(a, b, "myers", 10 ** 6)) == _lcs(a, b)
+        for i, j in patch_engine.line_matches(a, b, "patience", 1):
+            assert a[i] == b[j]
+    before = "".join(f"{rng.randrange(3)}\n" for _ in range(400))
+    after = "".join(f"{rng.randrange(3)}\n" for _ in range(400))
+    monkeypatch.setattr(patch_engine, "DIFF_MAX_EDITS", 2)
+    _assert_applies(tmp_path, before, after)
+
+
+def test_oversized_files_get_summary_only_delta(tmp_path, monkeypatch):
+    monkeypatch.setattr(patch_engine, "DIFF_MAX_LINES", 50)
+    g, c = tmp_path / "g.xml", tmp_path / "c.xml"
+    lines = [f"<e id='{i}'/>\n" for i in range(100)]
+    g.write_text("".join(lines))
+    lines[10] = "<e id='x'/>\n"
+    del lines[70:72]
+    c.write_text("".join(lines))
+    hunks, patch = drift_v1._hunks_for_file(g, c, "big.xml")
+    assert patch == "" and len(hunks) == 1
+    loc = hunks[0]["locator"]
+    assert hunks[0]["summary_only"] and loc["type"] == "diff_summary"
+    # candidate -> golden
+    assert (loc["old_total"], loc["new_total"]) == (98, 100)
+    assert loc["regions"] == [{"old_start": 11, "old_lines": 1, "new_start": 11, "new_lines": 1},
+                              {"old_start": 71, "old_lines": 0, "new_start": 71, "new_lines": 2}]
+    assert patch_engine.diff_summary(tmp_path / "g.xml", tmp_path / "g.xml")["changed_regions"] == 0
+
+
+def test_lines_split_on_newline_only_like_git(tmp_path, monkeypatch):
+    # form feed, bare CR, U+2028 and NEL are not line breaks for git
+    for n, sep in enumerate(("\x0c", "\r", "\u2028", "\x85")):
+        before = f"a: 1\nb: x{sep}y\nc: 3\nd: 4\n"
+        after = f"a: 1\nb: x{sep}y\nc: 30\nd: 4"
+        sub = tmp_path / f"case{n}"
+        sub.mkdir()
+        patch = _assert_applies(sub, before, after, "values.yml")
+        assert "@@ -1,4 +1,4 @@\n" in patch
+
+    monkeypatch.setattr(patch_engine, "DIFF_MAX_LINES", 5)
+    g, c = tmp_path / "g.txt", tmp_path / "c.txt"
+    g.write_bytes(b"".join(b"l%d\r\n" % i if i % 2 else b"l%d\rx\n" % i for i in range(10)))
+    c.write_bytes(g.read_bytes().replace(b"l5\r\n", b"l5!\r\n"))
+    summary = patch_engine.diff_summary(g, c)
+    assert (summary["old_total"], summary["new_total"]) == (10, 10)
+    assert summary["regions"] == [{"old_start": 6, "old_lines": 1, "new_start": 6, "new_lines": 1}]
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the single-walk repository index.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.drift_analyzer import RepoIndex, get_repo_index, begin_file_blob_run, end_file_blob_run
+
+
+def _touch(root: Path, rel: str) -> None:
+    p = root / rel
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text("x\n")
+
+
+def _rglob(root: Path, pattern: str):
+    return sorted(str(p.relative_to(root)).replace("\\", "/") for p in root.rglob(pattern)
+                  if p.is_file() and not str(p.relative_to(root)).startswith(".git/"))
+
+
+def test_index_lookups_match_rglob(tmp_path):
+    for rel in ("application.yml", "svc/application-prod.yaml", "svc/src/application.properties",
+                "Jenkinsfile", "ci/Jenkinsfile.release", "docker/Dockerfile", ".github/workflows/ci.yml",
+                ".env", "src/Main.java", ".git/config"):
+        _touch(tmp_path, rel)
+
+    index = RepoIndex.build(tmp_path)
+    for patt in ("application*.yml", "application*.yaml", "application*.properties", "Jenkinsfile*", "Dockerfile*", "*.yml"):
+        assert index.glob(f"**/{patt}") == _rglob(tmp_path, patt), patt
+
+    assert ".git/config" not in index.all_paths
+    assert ".github/workflows/ci.yml" in index.all_paths
+    assert all(not p.startswith(".") for p in index.paths)
+    assert index.extension(".yml", ".yaml") == [".github/workflows/ci.yml", "application.yml", "svc/application-prod.yaml"]
+    assert index.category("ci") == ["Jenkinsfile", "ci/Jenkinsfile.release"]
+    # a different classifier gets its own grouping, not the cached default one
+    by_dir = lambda p: p.parts[0] if len(p.parts) > 1 else "top"
+    assert index.category("svc", by_dir) == ["svc/application-prod.yaml", "svc/src/application.properties"]
+    assert index.category("ci") == ["Jenkinsfile", "ci/Jenkinsfile.release"]
+
+
+def test_index_is_walked_once_per_run(tmp_path):
+    _touch(tmp_path, "a.yml")
+    token = begin_file_blob_run()
+    try:
+        first = get_repo_index(tmp_path)
+        assert get_repo_index(tmp_path) is first
+    finally:
+        end_file_blob_run(token)
+    # outside a run the index is rebuilt (trees may change between runs)
+    assert get_repo_index(tmp_path) is not first
+
+
+def test_symlinked_directories_are_not_followed(tmp_path):
+    _touch(tmp_path, "a/f.yml")
+    _touch(tmp_path, "b/target.yml")
+    (tmp_path / "a" / "loop").symlink_to("..", target_is_directory=True)
+    (tmp_path / "a" / "link.yml").symlink_to(tmp_path / "b" / "target.yml")
+
+    index = RepoIndex.build(tmp_path)
+    assert index.all_paths == _rglob(tmp_path, "*") == ["a/f.yml", "a/link.yml", "b/target.yml"]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Unit tests for two-tier YAML parsing: C-loader values that match ruamel's
+round-trip loader, and round-trip positions only for files with deltas.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.drift_analyzer import AnalysisSession, caches, drift_v1, yaml_values
+from shared.drift_analyzer.yaml_values import DuplicateKeyError, load_roundtrip, load_values
+
+ruamel = pytest.importorskip("ruamel.yaml")
+
+SCALARS = ["yes", "no", "on", "Off", "y", "true", "FALSE", "null", "~", "", "010", "0o10", "0x1F", "1_000",
+           "1:30", "+12", "-0", "1.5", "1e3", "12e03", ".5", "1.", "-.Inf", "0b101", "09", "2020-01-01",
+           "2020-01-01 10:00:00", "'yes'", '"010"', "0x", "_1", "12:30:00"]
+
+
+@pytest.mark.parametrize("scalar", SCALARS)
+def test_values_match_roundtrip_loader(scalar):
+    doc = f"k: {scalar}\n"
+    fast, rt = load_values(doc)["k"], load_roundtrip(doc)["k"]
+    assert fast == rt
+    assert isinstance(rt, type(fast))
+
+
+def test_mapping_order_merges_and_duplicates():
+    doc = "a: &x {b: 1}\nz: &y {b: 3, e: 4}\nc:\n  <<: [*x, *y]\n  d: 9\n"
+    fast, rt = load_values(doc), load_roundtrip(doc)
+    assert fast == rt
+    assert list(fast["c"]) == list(rt["c"]) == ["d", "b", "e"]
+    with pytest.raises(DuplicateKeyError):
+        load_values("a: 1\na: 2\n")
+
+
+def test_roundtrip_parse_only_for_drifted_files(tmp_path, monkeypatch):
+    golden, drift = tmp_path / "golden", tmp_path / "drift"
+    for root in (golden, drift):
+        root.mkdir()
+        (root / "same.yml").write_text("replicas: 3\nimage: {tag: v1}\n")
+    (golden / "values.yml").write_text("replicas: 3\nimage:\n  tag: v1\n")
+    (drift / "values.yml").write_text("replicas: 3\nimage:\n  tag: v2\n")
+
+    monkeypatch.setattr(caches, "_parse_cache", caches.ParseCache(None))
+    calls = []
+    monkeypatch.setattr(drift_v1, "load_roundtrip", lambda txt: calls.append(txt) or load_roundtrip(txt))
+    conf = drift_v1._semantic_config_diff(golden, drift, ["same.yml", "values.yml"])
+    assert calls == []
+
+    (delta,) = drift_v1._build_config_deltas(conf, AnalysisSession(golden, drift))
+    assert (delta["locator"]["line_start"], delta["locator"]["line_end"]) == (3, 3)
+    assert calls == [(drift / "values.yml").read_text()]
+
+
+def test_ruamel_loader_setting(monkeypatch):
+    monkeypatch.setattr(yaml_values, "YAML_LOADER", "ruamel")
+    assert load_values("k: yes\n") == {"k": "yes"}
+    assert hasattr(load_values("k: {a: 1}\n"), "lc")